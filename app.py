@@ -1,17 +1,50 @@
 import os
-import time
-import threading
 import json
-from flask import Flask, render_template, request, redirect, url_for, send_file, flash, jsonify
+import threading
+from concurrent.futures import TimeoutError as FuturesTimeout
+from flask import Flask, Response, render_template, request, redirect, url_for, send_file, flash, jsonify
 
-from config import DEFAULT_BRAND, DEFAULT_TIME_WINDOW_DAYS, OUTPUT_DIR
+from config import (
+    DEFAULT_BRAND, DEFAULT_TIME_WINDOW_DAYS, MONITOR_ENABLED, MONITOR_INTERVAL_SECONDS,
+    REPORT_PDF_WAIT_SECONDS, REPORT_CACHE_MAX_AGE, RETENTION_ENABLED,
+)
 from src.pipeline import run_analysis_pipeline
+from src.agents.report_agent import request_pdf
+from src.jobs import JobQueue, QueueFull, DONE, FAILED
+from src.monitor import monitor
+from src.retention import retention
+from src.services.doc_store import get_store
+from src.services.report_files import get_index, COMPRESSIBLE, MIMETYPES
+from src.utils.events import bus
+from src.utils import metrics
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("APP_SECRET", "dev-secret")
 UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def _jobs() -> JobQueue:
+    # 首次使用时再启动工作池，避免调试模式下 reloader 父进程也消费队列
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(run_analysis_pipeline)
+            _job_queue.start()
+        return _job_queue
+
+
+@app.before_request
+def _start_background():
+    # 与任务队列相同，首次请求时再启动调度线程与报告目录清理线程
+    if MONITOR_ENABLED:
+        monitor.start()
+    if RETENTION_ENABLED:
+        retention.start()
+
 
 @app.route("/")
 def index():
@@ -26,30 +59,17 @@ def analyze():
     except Exception:
         window_days = DEFAULT_TIME_WINDOW_DAYS
 
-    # 异步任务：立即返回处理中页面，后台生成报告
-    ts = time.strftime("%Y%m%d-%H%M%S")
-
-    # 预写入状态文件，供任务页展示基本信息
-    status_path = os.path.join(OUTPUT_DIR, f"status_{ts}.json")
+    # 异步任务：入队后立即返回处理中页面，由工作池生成报告；相同品牌+时间窗的进行中任务会被复用。
+    # 监控中的品牌同样入队（流水线直接从文档库渲染，不重新检索抓取），不在请求线程内做分析
     try:
-        with open(status_path, "w", encoding="utf-8") as f:
-            json.dump({"ts": ts, "brand": brand, "window_days": window_days, "done": False}, f, ensure_ascii=False)
-    except Exception:
-        pass
-
-    def _bg_task():
-        try:
-            run_analysis_pipeline(brand=brand, time_window_days=window_days, timestamp=ts)
-        finally:
-            # 标记完成（报告生成由 pipeline 负责），这里仅更新状态
-            try:
-                with open(status_path, "w", encoding="utf-8") as f:
-                    json.dump({"ts": ts, "brand": brand, "window_days": window_days, "done": True}, f, ensure_ascii=False)
-            except Exception:
-                pass
-
-    threading.Thread(target=_bg_task, daemon=True).start()
-    return redirect(url_for("task", ts=ts))
+        job = _jobs().submit(brand, window_days)
+    except QueueFull:
+        flash("当前排队任务较多，请稍后再试")
+        resp = app.make_response(render_template("index.html", default_brand=brand, default_window=window_days))
+        resp.status_code = 429
+        resp.headers["Retry-After"] = "30"
+        return resp
+    return redirect(url_for("task", ts=job["ts"]))
 
 
 @app.route("/upload", methods=["POST"])
@@ -68,58 +88,164 @@ def upload():
     return redirect(url_for("index"))
 
 
+def _send_report(ts: str, fmt: str, entry: dict, as_attachment: bool = False):
+    """发送报告文件：按 Accept-Encoding 选用预压缩版本，强 ETag + 长缓存，支持条件请求与 Range。"""
+    path, encoding = entry["path"], None
+    # Range 请求按原始字节计算区间，始终发送未压缩文件
+    if "Range" not in request.headers:
+        for enc in ("br", "gzip"):
+            if enc in entry["variants"] and request.accept_encodings[enc]:
+                path, encoding = entry["variants"][enc], enc
+                break
+    # 不同编码的字节不同，强 ETag 需区分
+    etag = entry["etag"] + (f"-{encoding}" if encoding else "")
+    resp = send_file(
+        path,
+        mimetype=MIMETYPES.get(fmt),
+        as_attachment=as_attachment,
+        download_name=os.path.basename(entry["path"]),
+        conditional=True,
+        etag=etag,
+        max_age=REPORT_CACHE_MAX_AGE,
+    )
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    if fmt in COMPRESSIBLE:
+        resp.vary.add("Accept-Encoding")
+    # 报告写入后不再变化
+    resp.cache_control.immutable = True
+    return resp
+
+
 @app.route("/report/<ts>")
 def report(ts):
-    html_path = os.path.join(OUTPUT_DIR, f"report_{ts}.html")
-    md_path = os.path.join(OUTPUT_DIR, f"report_{ts}.md")
-    pdf_path = os.path.join(OUTPUT_DIR, f"report_{ts}.pdf")
-    if not os.path.exists(html_path):
+    entry = get_index().get(ts, "html")
+    if entry is None:
         flash("报告不存在或尚未生成")
         return redirect(url_for("index"))
     # 直接返回静态报告文件，避免将完整 HTML 嵌入到 base 模板导致样式或脚本失效
-    return send_file(html_path)
+    return _send_report(ts, "html", entry)
 
 
 @app.route("/download/<ts>/<fmt>")
 def download(ts, fmt):
-    path = os.path.join(OUTPUT_DIR, f"report_{ts}.{fmt}")
-    if not os.path.exists(path):
+    if fmt not in MIMETYPES:
         flash("文件不存在")
         return redirect(url_for("report", ts=ts))
-    return send_file(path, as_attachment=True)
+    index = get_index()
+    entry = index.get(ts, fmt)
+    if fmt == "pdf" and entry is None:
+        # PDF 按需生成：首次下载时交给后台线程池，等待片刻仍未完成则提示稍后重试
+        html = index.get(ts, "html")
+        if html is None:
+            flash("文件不存在")
+            return redirect(url_for("index"))
+        # PDF 与 HTML 放在同一日期分片目录
+        pdf_path = os.path.splitext(html["path"])[0] + ".pdf"
+        fut = request_pdf(html["path"], pdf_path)
+        try:
+            fut.result(timeout=REPORT_PDF_WAIT_SECONDS)
+        except FuturesTimeout:
+            flash("PDF 正在生成，请稍后再次点击下载")
+            return redirect(url_for("report", ts=ts))
+        except Exception:
+            flash("PDF 生成失败（需安装 wkhtmltopdf）")
+            return redirect(url_for("report", ts=ts))
+        index.add(pdf_path)
+        entry = index.get(ts, fmt)
+    if entry is None:
+        flash("文件不存在")
+        return redirect(url_for("report", ts=ts))
+    return _send_report(ts, fmt, entry, as_attachment=True)
 
 
 @app.route("/task/<ts>")
 def task(ts):
-    # 加载初始状态，展示“处理中”页面
-    status_path = os.path.join(OUTPUT_DIR, f"status_{ts}.json")
-    brand = DEFAULT_BRAND
-    window_days = DEFAULT_TIME_WINDOW_DAYS
-    if os.path.exists(status_path):
-        try:
-            with open(status_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                brand = data.get("brand", brand)
-                window_days = data.get("window_days", window_days)
-        except Exception:
-            pass
+    # 加载任务信息，展示“处理中”页面
+    job = _jobs().get(ts) or {}
+    brand = job.get("brand", DEFAULT_BRAND)
+    window_days = job.get("window_days", DEFAULT_TIME_WINDOW_DAYS)
     return render_template("task.html", ts=ts, brand=brand, window_days=window_days)
 
+
 @app.route("/status/<ts>")
 def status(ts):
-    # 完成判断：报告文件是否存在 或 状态文件标记完成
-    html_path = os.path.join(OUTPUT_DIR, f"report_{ts}.html")
-    status_path = os.path.join(OUTPUT_DIR, f"status_{ts}.json")
-    done = os.path.exists(html_path)
-    info = {"ts": ts, "done": done}
-    if os.path.exists(status_path):
+    job = _jobs().get(ts)
+    if job is None:
+        # 非队列提交的历史报告：以报告文件是否存在判断
+        done = get_index().exists(ts)
+        return jsonify({"ts": ts, "done": done, "state": "done" if done else "unknown"})
+    return jsonify({
+        "ts": ts,
+        "done": job["state"] == DONE,
+        "failed": job["state"] == FAILED,
+        "state": job["state"],
+        "error": job.get("error"),
+        "brand": job["brand"],
+        "window_days": job["window_days"],
+    })
+
+
+@app.route("/events/<ts>")
+def events(ts):
+    """Server-Sent Events：实时推送任务的阶段、检索、抓取事件与任务状态，任务结束后关闭连接。"""
+    try:
+        since = int(request.headers.get("Last-Event-ID") or request.args.get("since", 0))
+    except ValueError:
+        since = 0
+    job = _jobs().get(ts)
+
+    def _stream():
+        if job is None or (job["state"] in (DONE, FAILED) and not bus.known(ts)):
+            # 历史任务或进程重启后：事件已不在内存中，只推送最终状态
+            state = job["state"] if job else ("done" if get_index().exists(ts) else "unknown")
+            yield f"event: state\ndata: {json.dumps({'type': 'state', 'state': state}, ensure_ascii=False)}\n\n"
+            return
+        last = since
+        while True:
+            batch = bus.wait(ts, since=last, timeout=15)
+            if not batch:
+                yield ": keepalive\n\n"
+                continue
+            for e in batch:
+                last = e["id"]
+                yield f"id: {e['id']}\nevent: {e.get('type', 'log')}\ndata: {json.dumps(e, ensure_ascii=False)}\n\n"
+            if any(e.get("type") == "state" and e.get("state") in (DONE, FAILED) for e in batch):
+                return
+
+    return Response(_stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/monitor", methods=["GET", "POST"])
+def monitor_list():
+    """GET：列出监控中的品牌；POST（brand, window_days, interval_seconds）：登记或更新监控。"""
+    if request.method == "POST":
+        data = request.get_json(silent=True) or request.form
+        brand = (data.get("brand") or "").strip()
+        if not brand:
+            return jsonify({"error": "brand is required"}), 400
         try:
-            with open(status_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                info.update({"brand": data.get("brand"), "window_days": data.get("window_days")})
-        except Exception:
-            pass
-    return jsonify(info)
+            window_days = int(data.get("window_days", DEFAULT_TIME_WINDOW_DAYS))
+            interval = int(data.get("interval_seconds", MONITOR_INTERVAL_SECONDS))
+        except (TypeError, ValueError):
+            return jsonify({"error": "window_days/interval_seconds must be integers"}), 400
+        return jsonify(monitor.register(brand, window_days, interval)), 201
+    return jsonify({"monitors": get_store().monitors()})
+
+
+@app.route("/monitor/<brand>", methods=["DELETE"])
+def monitor_delete(brand):
+    if not monitor.unregister(brand):
+        return jsonify({"error": "not monitored"}), 404
+    return jsonify({"brand": brand, "removed": True})
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus 文本格式指标：阶段耗时、检索/抓取/LLM 请求耗时与结果、下载字节数、缓存命中等。"""
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,81 @@
+"""近重复去重基准：原线性比较 vs SimhashIndex 分块索引。
+
+用法：python benchmarks/bench_dedup.py [规模 ...]
+指纹为随机 64 位整数，其中约 30% 为已有指纹翻转 1~6 位得到的近重复。
+另检查索引的扩展性：规模 ≥ 10000 时，最大规模的单条耗时不得超过最小规模的 SCALING_LIMIT 倍，
+否则以非零状态退出（近似线性；二次增长时 10 倍规模约慢 10 倍）。
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.dedup import SimhashIndex  # noqa: E402
+
+SCALING_LIMIT = 4.0
+
+
+def make_fingerprints(n: int, seed: int = 42):
+    rnd = random.Random(seed)
+    fps = []
+    for _ in range(n):
+        if fps and rnd.random() < 0.3:
+            fp = rnd.choice(fps)
+            for b in rnd.sample(range(64), rnd.randint(1, 6)):
+                fp ^= 1 << b
+        else:
+            fp = rnd.getrandbits(64)
+        fps.append(fp)
+    return fps
+
+
+def linear_dedup(fps, threshold: int = 8):
+    """旧实现：与每个已保留指纹逐一比较。"""
+    kept = []
+    for fp in fps:
+        if not any(bin(fp ^ prev).count("1") <= threshold for prev in kept):
+            kept.append(fp)
+    return kept
+
+
+def indexed_dedup(fps, threshold: int = 8):
+    index = SimhashIndex(threshold=threshold)
+    kept = []
+    for fp in fps:
+        if index.find(fp) is None:
+            kept.append(fp)
+            index.add(fp)
+    return kept
+
+
+def main(sizes) -> bool:
+    per_item = {}
+    for n in sizes:
+        fps = make_fingerprints(n)
+        t0 = time.perf_counter()
+        new = indexed_dedup(fps)
+        t_new = time.perf_counter() - t0
+        per_item[n] = t_new / n
+        if n <= 20000:
+            t0 = time.perf_counter()
+            old = linear_dedup(fps)
+            t_old = time.perf_counter() - t0
+            same = "yes" if old == new else "NO"
+            print(f"n={n:>7} kept={len(new):>7} linear={t_old:8.3f}s indexed={t_new:8.3f}s speedup={t_old / max(t_new, 1e-9):6.1f}x same={same}")
+        else:
+            print(f"n={n:>7} kept={len(new):>7} linear=   (skipped) indexed={t_new:8.3f}s")
+    large = sorted(n for n in per_item if n >= 10000)
+    if len(large) < 2:
+        return True
+    lo, hi = large[0], large[-1]
+    ratio = per_item[hi] / per_item[lo]
+    ok = ratio <= SCALING_LIMIT
+    print(f"scaling n={lo}->{hi}: per-item {per_item[lo] * 1e6:.1f}us -> {per_item[hi] * 1e6:.1f}us "
+          f"({ratio:.2f}x, limit {SCALING_LIMIT}x) {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main([int(x) for x in sys.argv[1:]] or [1000, 10000, 100000]) else 1)
@@ -0,0 +1,65 @@
+"""HTML 抽取基准：原 BeautifulSoup(html.parser) 流程 vs 各解析后端（单次解析 + 正文抽取）。
+
+用法：python benchmarks/bench_extract.py [重复次数]
+样本为 benchmarks/fixtures/*.html（文章页 / 知乎回答页 / 论坛列表页 / 跳转中转页）。
+"""
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from src.utils.html_extract import parse, main_text, find_meta_refresh, _available  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def legacy_extract(html: str) -> str:
+    """旧实现：html.parser 完整解析，查找 meta refresh，去除脚本/样式后取整页文本。"""
+    soup = BeautifulSoup(html, "html.parser")
+    meta_refresh = soup.find("meta", attrs={"http-equiv": lambda v: v and v.lower() == "refresh"})
+    if meta_refresh and meta_refresh.get("content"):
+        m = re.search(r"url\s*=?\s*([^;]+)", meta_refresh["content"], flags=re.I)
+        if m:
+            return m.group(1).strip().strip("'\"`")
+    for tag in soup(["script", "style", "noscript"]):
+        tag.extract()
+    return soup.get_text("\n")
+
+
+def new_extract(html: str, backend: str) -> str:
+    tgt = find_meta_refresh(html)
+    if tgt:
+        return tgt
+    return main_text(parse(html, backend))
+
+
+def bench(fn, html: str, repeat: int) -> float:
+    fn(html)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(html)
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main(repeat: int):
+    backends = [b for b in ("selectolax", "lxml", "bs4") if _available(b)]
+    print(f"backends: {', '.join(backends)}; repeat={repeat}")
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        base = bench(legacy_extract, html, repeat)
+        line = f"{os.path.basename(path):<20} {len(html.encode('utf-8')) // 1024:>5}KB legacy={base:8.2f}ms"
+        for b in backends:
+            t = bench(lambda h: new_extract(h, b), html, repeat)
+            chars = len(new_extract(html, b))
+            line += f" {b}={t:7.2f}ms({base / max(t, 1e-9):5.1f}x,{chars}c)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
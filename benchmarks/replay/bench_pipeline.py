@@ -0,0 +1,244 @@
+"""离线回放基准：通过 httpx.MockTransport 回放录制（或合成）的检索结果页与落地页，逐阶段测量耗时与内存。
+
+用法：
+  python benchmarks/replay/bench_pipeline.py [--corpus 语料.jsonl.gz] [--scales 10,1000,100000] [--repeat 5]
+                                            [--out 基线.json] [--compare 旧基线.json]
+未指定 --corpus 时使用 synth.py 生成的合成语料。
+
+阶段：
+- search：web_search_cn_first（每个查询一次，逐次计时；首轮另记为 search_cold）
+- fetch：QueryAgent._fetch_and_extract（检索命中的每个 URL 一次，含跳转/中转页；首轮另记为 fetch_cold）
+- pipeline：run_analysis_pipeline 端到端
+- near_dedup / insight / report：按 --scales 扩增抓取到的文档后分别测量
+每项输出 p50/p95/均值（毫秒）、吞吐（条/秒）与 tracemalloc 峰值内存（KB，单独一轮测得，不影响计时）。
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from benchmarks.replay.env import isolate  # noqa: E402
+
+ORIG_CWD = isolate(prefix="replay-bench-")
+
+from config import OUTPUT_DIR  # noqa: E402
+from benchmarks.replay.corpus import Corpus  # noqa: E402
+from benchmarks.replay import synth  # noqa: E402
+from src.agents import report_agent as report_mod  # noqa: E402
+from src.agents.insight_agent import InsightAgent  # noqa: E402
+from src.agents.query_agent import QueryAgent  # noqa: E402
+from src.pipeline import run_analysis_pipeline  # noqa: E402
+from src.services import http_client  # noqa: E402
+from src.services.search_searx import web_search_cn_first  # noqa: E402
+from src.utils.channel import classify  # noqa: E402
+from src.utils.dedup import near_dedup  # noqa: E402
+from src.utils.html_extract import _backend  # noqa: E402
+
+# 扩增文档的正文长度（字符），控制 10 万条规模下的内存占用
+DOC_CHARS = 600
+# 扩增文档中近重复（在已有文档上做少量改动）的比例
+NEAR_DUP_RATIO = 0.3
+
+
+def percentile(values, p: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, max(0, int(round(p / 100 * len(s) + 0.5)) - 1))]
+
+
+def _result(stage: str, scale, items: int, latencies, total_s: float, peak: int) -> dict:
+    return {
+        "stage": stage,
+        "scale": scale,
+        "items": items,
+        "runs": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "throughput_per_s": round(items / total_s, 2) if total_s > 0 else None,
+        "peak_mem_kb": peak // 1024,
+    }
+
+
+def _peak(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_calls(stage: str, fn, args, repeat: int) -> dict:
+    """逐次调用计时（检索/抓取）：延迟为单次调用，吞吐为 调用数 / 总耗时。"""
+    latencies = []
+    for _ in range(repeat):
+        for a in args:
+            t0 = time.perf_counter()
+            fn(a)
+            latencies.append(time.perf_counter() - t0)
+    total = sum(latencies)
+    peak = _peak(lambda: [fn(a) for a in args])
+    return _result(stage, "corpus", len(args) * repeat, latencies, total, peak)
+
+
+def bench_batch(stage: str, scale, items: int, setup, fn, repeat: int) -> dict:
+    """整批计时（流水线/去重/分析/报告）：setup 生成每轮的独立输入，不计入耗时；吞吐为 每轮条数 / 单轮耗时。"""
+    latencies = []
+    for _ in range(repeat):
+        data = setup()
+        t0 = time.perf_counter()
+        fn(data)
+        latencies.append(time.perf_counter() - t0)
+    data = setup()
+    peak = _peak(lambda: fn(data))
+    res = _result(stage, scale, items * repeat, latencies, sum(latencies), peak)
+    res["items"] = items
+    return res
+
+
+def scale_docs(base, n: int, seed: int = 11):
+    """把抓取到的文档扩增到 n 条：截取不同窗口作为正文，约 30% 为已有文档的近重复，发布时间分布在近 30 天。"""
+    rnd = random.Random(seed)
+    now = datetime.now()
+    texts = [d["text"] for d in base if len(d.get("text") or "") >= 50] or ["续航 拍照 发热 系统 屏幕" * 40]
+    docs = []
+    for i in range(n):
+        if docs and rnd.random() < NEAR_DUP_RATIO:
+            src = rnd.choice(docs)
+            text = src["text"][:-8] + f"（补充{i % 97}）"
+        else:
+            t = texts[i % len(texts)]
+            start = rnd.randrange(max(1, len(t) - DOC_CHARS))
+            text = t[start:start + DOC_CHARS] + f" #{i}"
+        url = base[i % len(base)]["url"] + f"#d{i}" if base else f"https://example.com/{i}"
+        docs.append({
+            "url": url,
+            "text": text,
+            "language": "zh",
+            "published": now - timedelta(days=rnd.randint(0, 29), hours=rnd.randint(0, 23)),
+            "channel": classify(url),
+        })
+    return docs
+
+
+def run(corpus: Corpus, scales, repeat: int, baseline=None):
+    """依次执行各阶段基准，每完成一项即输出一行；各阶段自身的日志输出被屏蔽。"""
+    brand = corpus.meta.get("brand") or synth.BRAND
+    http_client.set_transport(corpus.transport())
+    results = _Results(baseline)
+
+    queries = QueryAgent(brand=brand)._build_queries()
+    hits = {}
+    # 首轮单独记为冷启动（引擎健康度、解析器与模板初始化）
+    results.append(bench_calls("search_cold", lambda q: hits.setdefault(q, web_search_cn_first(q, max_results=6)),
+                               queries, 1))
+    urls = list(dict.fromkeys(h["url"] for q in queries for h in hits.get(q) or [] if h.get("url")))
+    results.append(bench_calls("search", lambda q: web_search_cn_first(q, max_results=6), queries, repeat))
+
+    agent = QueryAgent(brand=brand)
+    docs = []
+    results.append(bench_calls("fetch_cold", lambda u: docs.append(agent._fetch_and_extract(u)), urls, 1))
+    base = [d for d in docs if d]
+    results.append(bench_calls("fetch", agent._fetch_and_extract, urls, repeat))
+
+    counter = iter(range(10 ** 9))
+    results.append(bench_batch(
+        "pipeline", "corpus", 1, lambda: f"bench-{next(counter)}",
+        lambda ts: run_analysis_pipeline(brand, 30, ts), max(1, min(repeat, 3)),
+    ))
+
+    insight = InsightAgent()
+    for n in scales:
+        docs_n = scale_docs(base, n)
+        runs = repeat if n <= 1000 else max(1, repeat // 3)
+        results.append(bench_batch("near_dedup", n, n, lambda: [dict(d) for d in docs_n],
+                                   lambda d: near_dedup(d, key=lambda x: x["text"]), runs))
+        results.append(bench_batch("insight", n, n, lambda: docs_n, insight.analyze, runs))
+        insights = insight.analyze(docs_n)
+        synthesis = {"core_points": ["基准"], "risk": [], "advice": []}
+        agent_r = report_mod.ReportAgent(OUTPUT_DIR)
+
+        def _report(_):
+            # 每轮清空报告主体缓存，测量冷渲染
+            report_mod._render_cache.clear()
+            agent_r.generate_full(f"bench-{n}-{next(counter)}", brand, 30, docs_n, insights, synthesis,
+                                  logs=["bench"] * 50, timings=[])
+
+        results.append(bench_batch("report", n, n, lambda: None, _report, runs))
+    http_client.set_transport(None)
+    return results
+
+
+class _Results(list):
+    """结果列表：追加时立即打印一行（含与基线 p50 的比值）。"""
+
+    HEADER = (f"{'stage':<12}{'scale':>8}{'items':>8}{'runs':>6}{'p50ms':>11}{'p95ms':>11}{'items/s':>12}"
+              f"{'peakKB':>10}")
+
+    def __init__(self, baseline=None):
+        super().__init__()
+        self.base = {(r["stage"], str(r["scale"])): r for r in (baseline or {}).get("results", [])}
+        print(self.HEADER + ("  p50 vs base" if self.base else ""), file=sys.__stdout__, flush=True)
+
+    def append(self, r):
+        super().append(r)
+        line = (f"{r['stage']:<12}{str(r['scale']):>8}{r['items']:>8}{r['runs']:>6}{r['p50_ms']:>11.2f}"
+                f"{r['p95_ms']:>11.2f}{(r['throughput_per_s'] or 0):>12.1f}{r['peak_mem_kb']:>10}")
+        old = self.base.get((r["stage"], str(r["scale"])))
+        if old and old["p50_ms"]:
+            line += f"  {r['p50_ms'] / old['p50_ms']:.2f}x"
+        print(line, file=sys.__stdout__, flush=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--corpus", help="录制语料路径（record.py 生成）；缺省使用合成语料")
+    ap.add_argument("--scales", default="10,1000,100000", help="扩增文档规模，逗号分隔")
+    ap.add_argument("--repeat", type=int, default=5, help="每项重复次数（10 万级规模按 1/3 执行）")
+    ap.add_argument("--out", help="输出 JSON 基线路径")
+    ap.add_argument("--compare", help="与已有 JSON 基线比较 p50")
+    args = ap.parse_args()
+
+    path = lambda p: os.path.join(ORIG_CWD, p)  # noqa: E731
+    corpus = Corpus.load(path(args.corpus)) if args.corpus else synth.build()
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    baseline = None
+    if args.compare:
+        with open(path(args.compare), "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    t0 = time.time()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(corpus, scales, max(1, args.repeat), baseline)
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "html_parser": _backend(None).__name__,
+            "corpus": corpus.meta,
+            "corpus_responses": len(corpus),
+            "corpus_misses": len(corpus.misses),
+            "scales": scales,
+            "repeat": args.repeat,
+            "wall_seconds": round(time.time() - t0, 1),
+        },
+        "results": list(results),
+    }
+    if corpus.misses:
+        print(f"unrecorded requests: {len(corpus.misses)} (e.g. {corpus.misses[0]})")
+    if args.out:
+        with open(path(args.out), "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"baseline -> {path(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""录制语料：请求 -> 响应（状态码、响应头、响应体）的集合，保存为 gzip 压缩的 JSON Lines。
+
+- RecordingTransport：包装真实网络传输，透传请求的同时记录响应
+- Corpus.transport()：返回 httpx.MockTransport，按 方法 + 规范化 URL（+ 请求体哈希）回放；未录制的请求返回 404
+"""
+import base64
+import gzip
+import hashlib
+import json
+import threading
+from typing import Optional
+from urllib.parse import urlsplit, parse_qsl, urlencode, urlunsplit
+
+import httpx
+
+# 响应体已解码保存，回放时不再带压缩/分块相关的响应头
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+
+
+def canonical_url(url: str) -> str:
+    """查询参数排序后的 URL，使参数顺序不同的同一请求命中同一条录制。"""
+    parts = urlsplit(str(url))
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+def _body_hash(body: bytes) -> str:
+    return hashlib.sha1(body or b"").hexdigest() if body else ""
+
+
+class Corpus:
+    def __init__(self, meta: Optional[dict] = None):
+        self.meta = dict(meta or {})
+        self.entries = {}
+        self.misses = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(method: str, url: str, body: bytes = b"") -> tuple:
+        return method.upper(), canonical_url(url), _body_hash(body)
+
+    def add(self, method: str, url: str, status: int, headers: dict, content: bytes, body: bytes = b""):
+        headers = {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+        with self._lock:
+            self.entries[self._key(method, url, body)] = {"status": status, "headers": headers, "content": content}
+
+    def add_html(self, url: str, html: str, status: int = 200):
+        """直接加入一条 GET 文本响应（合成语料使用）。"""
+        self.add("GET", url, status, {"content-type": "text/html; charset=utf-8"}, html.encode("utf-8"))
+
+    def lookup(self, method: str, url: str, body: bytes = b"") -> Optional[dict]:
+        key = self._key(method, url, body)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None and body:
+                # 请求体不同（如 LLM 提示中含时间）：退回同一 URL 的任意一条录制
+                entry = next((v for k, v in self.entries.items() if k[:2] == key[:2]), None)
+        return entry
+
+    def transport(self) -> httpx.MockTransport:
+        def handler(request: httpx.Request) -> httpx.Response:
+            entry = self.lookup(request.method, str(request.url), request.content)
+            if entry is None:
+                with self._lock:
+                    self.misses.append(f"{request.method} {request.url}")
+                return httpx.Response(404, content=b"not recorded")
+            return httpx.Response(entry["status"], headers=entry["headers"], content=entry["content"])
+
+        return httpx.MockTransport(handler)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def save(self, path: str):
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"meta": self.meta}, ensure_ascii=False) + "\n")
+            for (method, url, body), e in sorted(self.entries.items()):
+                f.write(json.dumps({
+                    "method": method,
+                    "url": url,
+                    "body_sha1": body,
+                    "status": e["status"],
+                    "headers": e["headers"],
+                    "content": base64.b64encode(e["content"]).decode("ascii"),
+                }, ensure_ascii=False) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "Corpus":
+        corpus = cls()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                if "meta" in row:
+                    corpus.meta = row["meta"]
+                    continue
+                corpus.entries[(row["method"], row["url"], row["body_sha1"])] = {
+                    "status": row["status"],
+                    "headers": row["headers"],
+                    "content": base64.b64decode(row["content"]),
+                }
+        return corpus
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """透传到真实网络并把每个响应（含重定向的每一跳）写入语料。"""
+
+    def __init__(self, corpus: Corpus, inner: Optional[httpx.BaseTransport] = None):
+        self.corpus = corpus
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        resp = self.inner.handle_request(request)
+        try:
+            # 传输层响应体尚未解码，包成 Response 读取后得到解压后的内容
+            content = httpx.Response(resp.status_code, headers=resp.headers, stream=resp.stream).read()
+        finally:
+            resp.close()
+        self.corpus.add(request.method, str(request.url), resp.status_code, dict(resp.headers), content, body)
+        headers = {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS}
+        return httpx.Response(resp.status_code, headers=headers, content=content)
+
+    def close(self):
+        self.inner.close()
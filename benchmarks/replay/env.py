@@ -0,0 +1,27 @@
+"""录制/回放运行环境：须在导入 config 与 src 之前调用。
+
+- 切换到临时工作目录（报告、缓存、任务库、引擎健康度都落在其中，不污染仓库），模板目录以软链接引入
+- 关闭内容缓存，保证每次请求都经过（录制或回放的）传输层
+- 关闭品牌监控与报告清理后台线程
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def isolate(prefix: str = "replay-") -> str:
+    """返回原工作目录（用于解析命令行中的相对路径）。"""
+    orig = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    os.symlink(os.path.join(ROOT, "templates"), os.path.join(workdir, "templates"))
+    os.chdir(workdir)
+    atexit.register(shutil.rmtree, workdir, True)
+    for key, value in (("ENABLE_CACHE_SAVE", "false"), ("MONITOR_ENABLED", "false"), ("RETENTION_ENABLED", "false")):
+        os.environ.setdefault(key, value)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return orig
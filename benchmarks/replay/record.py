@@ -0,0 +1,37 @@
+"""录制回放语料：联网执行一次完整分析流水线（检索、抓取、LLM），把经过共享 HTTP 客户端的全部响应写入语料。
+
+用法：python benchmarks/replay/record.py 品牌 [输出路径，默认 benchmarks/replay/corpus_<品牌>.jsonl.gz]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from benchmarks.replay.env import isolate  # noqa: E402
+
+ORIG_CWD = isolate(prefix="replay-record-")
+
+from benchmarks.replay.corpus import Corpus, RecordingTransport  # noqa: E402
+from src.pipeline import run_analysis_pipeline  # noqa: E402
+from src.services import http_client  # noqa: E402
+
+
+def main(brand: str, out: str):
+    corpus = Corpus(meta={"brand": brand, "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+    http_client.set_transport(RecordingTransport(corpus))
+    t0 = time.perf_counter()
+    try:
+        run_analysis_pipeline(brand)
+    finally:
+        http_client.set_transport(None)
+    corpus.save(out)
+    print(f"recorded {len(corpus)} responses in {time.perf_counter() - t0:.1f}s -> {out}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    name = sys.argv[1]
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"corpus_{name.replace(' ', '_')}.jsonl.gz")
+    main(name, os.path.join(ORIG_CWD, sys.argv[2]) if len(sys.argv) > 2 else default)
@@ -0,0 +1,108 @@
+"""合成回放语料：用 benchmarks/fixtures 的页面生成检索结果页与落地页，无需录制即可离线运行基准。
+
+- 每个查询在 Baidu / Sogou / 360 / Bing / DuckDuckGo 都有结果页，命中链接在查询之间大量重叠
+- Baidu 结果为 302 跳转链接，Sogou 结果为 meta refresh 中转页，其余为直链
+- 落地页为文章 / 论坛列表 / 知乎回答模板，注入近期发布时间与每页不同的段落
+- 不含 LLM 响应：回放时 Ark 请求返回 404，整合阶段走规则化回退
+"""
+import os
+import random
+from datetime import datetime, timedelta
+from html import escape
+from urllib.parse import urlencode
+
+from benchmarks.replay.corpus import Corpus
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+BRAND = "vivo X100"
+
+_PHRASES = [
+    "续航表现超出预期", "拍照夜景进步明显", "快充时机身有些发热", "系统动画更流畅", "屏幕亮度户外够用",
+    "售后响应速度一般", "价格相比上代略高", "扬声器音质中规中矩", "信号在地铁里偶尔断流", "手感比上一代更轻",
+]
+
+
+def _read(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _landing(template: str, brand: str, rnd: random.Random, i: int) -> str:
+    published = datetime.now() - timedelta(days=rnd.randint(0, 20), hours=rnd.randint(0, 23))
+    meta = f'<meta property="article:published_time" content="{published.strftime("%Y-%m-%dT%H:%M:%S")}">'
+    para = "".join(f"<p>{escape(brand)} {rnd.choice(_PHRASES)}，第 {i} 位用户反馈。</p>" for _ in range(6))
+    html = template.replace("<head>", "<head>" + meta, 1)
+    # 变化段落放在正文第一个段落之前，保证正文抽取能取到
+    pos = html.find("<p")
+    return html[:pos] + para + html[pos:] if pos >= 0 else html + para
+
+
+def _serp(engine: str, hits) -> str:
+    if engine == "baidu":
+        items = "".join(f'<div class="result c-container"><h3><a href="{escape(u)}">{escape(t)}</a></h3></div>'
+                        for u, t in hits)
+    elif engine == "sogou":
+        items = "".join(f'<div class="vrwrap"><h3 class="vrTitle"><a href="{escape(u)}">{escape(t)}</a></h3></div>'
+                        for u, t in hits)
+    elif engine == "360so":
+        items = "".join(f'<ul class="result"><li class="res-list"><h3><a href="{escape(u)}">{escape(t)}</a></h3></li></ul>'
+                        for u, t in hits)
+    elif engine == "bing":
+        items = "<ol>" + "".join(f'<li class="b_algo"><h2><a href="{escape(u)}">{escape(t)}</a></h2></li>'
+                                 for u, t in hits) + "</ol>"
+    else:
+        items = "".join(f'<div class="result"><a class="result__a" href="{escape(u)}">{escape(t)}</a></div>'
+                        for u, t in hits)
+    return f"<!doctype html><html><head><meta charset='utf-8'></head><body>{items}</body></html>"
+
+
+_ENGINES = [
+    ("baidu", "https://www.baidu.com/s", "wd"),
+    ("sogou", "https://www.sogou.com/web", "query"),
+    ("360so", "https://www.so.com/s", "q"),
+    ("bing", "https://www.bing.com/search", "q"),
+    ("duckduckgo", "https://duckduckgo.com/html/", "q"),
+]
+
+
+def build(brand: str = BRAND, pages: int = 60, per_serp: int = 8, seed: int = 7) -> Corpus:
+    from src.agents.query_agent import QueryAgent
+
+    rnd = random.Random(seed)
+    templates = {
+        "article": _read("article.html"),
+        "forum": _read("forum_list.html"),
+        "zhihu": _read("zhihu_answer.html"),
+    }
+    transit = _read("transit.html")
+    corpus = Corpus(meta={"brand": brand, "synthetic": True})
+    landing = []
+    for i in range(pages):
+        kind = ("article", "forum", "zhihu")[i % 3]
+        if kind == "article":
+            url = f"https://www.ithome.com/0/{700 + i}/{rnd.randint(100, 999)}.htm"
+        elif kind == "forum":
+            url = f"https://tieba.baidu.com/p/{8000000000 + i}"
+        else:
+            url = f"https://www.zhihu.com/question/{600000000 + i}/answer/{3000000000 + i}"
+        corpus.add_html(url, _landing(templates[kind], brand, rnd, i))
+        landing.append((url, f"{brand} 使用体验 #{i}"))
+
+    for q in QueryAgent(brand=brand)._build_queries():
+        hits = rnd.sample(landing, min(per_serp, len(landing)))
+        for engine, base, param in _ENGINES:
+            links = []
+            for url, title in hits:
+                if engine == "baidu":
+                    link = f"https://www.baidu.com/link?url={rnd.randrange(10 ** 12)}"
+                    corpus.add("GET", link, 302, {"location": url}, b"")
+                elif engine == "sogou":
+                    token = rnd.randrange(10 ** 12)
+                    link = f"/link?url={token}"
+                    corpus.add_html(f"https://www.sogou.com/link?url={token}",
+                                    transit.replace("https://www.zhihu.com/question/123456", url))
+                else:
+                    link = url
+                links.append((link, title))
+            corpus.add_html(f"{base}?{urlencode({param: q})}", _serp(engine, links))
+    return corpus
@@ -10,7 +10,13 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # 是否启用关键词扩展/保存缓存
 ENABLE_KEYWORD_EXPANSION = True
-ENABLE_CACHE_SAVE = True
+ENABLE_CACHE_SAVE = os.environ.get("ENABLE_CACHE_SAVE", "true").lower() in ("1", "true", "yes")
+
+# 内容缓存（SQLite）：检索结果 / 页面 / 抽取文档的有效期（秒）与总大小上限（字节，超出按 LRU 淘汰）
+CACHE_PATH = os.path.join(OUTPUT_DIR, "cache.sqlite3")
+CACHE_SEARCH_TTL = int(os.environ.get("CACHE_SEARCH_TTL", 3600))
+CACHE_PAGE_TTL = int(os.environ.get("CACHE_PAGE_TTL", 6 * 3600))
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 512 * 1024 * 1024))
 
 # SearXNG公共实例（按顺序尝试，若失败自动切换）
 SEARXNG_INSTANCES = [
@@ -47,4 +53,133 @@ DEMO_MODE = os.environ.get("DEMO_MODE", "true").lower() in ("1", "true", "yes")
 # 总时长预算（秒），到达后会提前结束检索并进入 DEMO 或已有结果渲染
 TIME_BUDGET_SECONDS = int(os.environ.get("TIME_BUDGET_SECONDS", 25))
 # 单次分析最大抓取文档数（包含失败尝试），防止过多请求导致阻塞
-MAX_FETCHES_PER_ANALYSIS = int(os.environ.get("MAX_FETCHES_PER_ANALYSIS", 50))
\ No newline at end of file
+MAX_FETCHES_PER_ANALYSIS = int(os.environ.get("MAX_FETCHES_PER_ANALYSIS", 50))
+
+# 并发抓取：全局并发上限与单主机并发上限（避免同一站点被打爆触发反爬）
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", 8))
+FETCH_PER_HOST_LIMIT = int(os.environ.get("FETCH_PER_HOST_LIMIT", 2))
+
+# 并发检索：同时在途的查询数；引擎对冲延迟（秒），首选引擎超过该时间未返回则并行启用下一个引擎
+SEARCH_CONCURRENCY = int(os.environ.get("SEARCH_CONCURRENCY", 8))
+SEARCH_HEDGE_DELAY = float(os.environ.get("SEARCH_HEDGE_DELAY", 1.5))
+
+# HTTP 客户端：进程级连接池（keep-alive，可选 HTTP/2，需安装 h2），统一请求头与超时
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Safari/537.36",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+}
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 15))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", 40))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_ENABLE_HTTP2 = os.environ.get("HTTP_ENABLE_HTTP2", "true").lower() in ("1", "true", "yes")
+HTTP_PER_HOST_LIMIT = int(os.environ.get("HTTP_PER_HOST_LIMIT", 6))
+# 各类请求的超时（秒）
+SEARCH_TIMEOUT = float(os.environ.get("SEARCH_TIMEOUT", 15))
+FETCH_TIMEOUT = float(os.environ.get("FETCH_TIMEOUT", 8))
+ZHIHU_TIMEOUT = float(os.environ.get("ZHIHU_TIMEOUT", 12))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 20))
+
+# 话题聚类：最终样本分配使用的进程数（1 表示在当前进程内完成；大语料时可调高）
+CLUSTER_WORKERS = int(os.environ.get("CLUSTER_WORKERS", 1))
+# 话题聚类：每篇文档用于提取特征的最大字符数（特征提取成本随之有上界）
+CLUSTER_FEATURE_CHARS = int(os.environ.get("CLUSTER_FEATURE_CHARS", 1000))
+
+# 任务队列：工作者数量、最大排队数（超出返回 429）、执行方式（thread/process）
+JOB_DB_PATH = os.path.join(OUTPUT_DIR, "jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_QUEUE_MAX = int(os.environ.get("JOB_QUEUE_MAX", 20))
+JOB_WORKER_MODE = os.environ.get("JOB_WORKER_MODE", "thread")
+
+# 实时进度事件：每个任务保留的事件条数、任务结束后事件保留时长（秒）
+EVENT_HISTORY = int(os.environ.get("EVENT_HISTORY", 1000))
+EVENT_TTL_SECONDS = int(os.environ.get("EVENT_TTL_SECONDS", 3600))
+
+
+# 翻译阶段：每批文档数与字符上限（译文需在单次输出上限内返回）、单篇截断长度、并发数、翻译缓存有效期、阶段时间预算（秒）
+TRANSLATE_BATCH_SIZE = int(os.environ.get("TRANSLATE_BATCH_SIZE", 8))
+TRANSLATE_BATCH_CHARS = int(os.environ.get("TRANSLATE_BATCH_CHARS", 3000))
+TRANSLATE_MAX_CHARS = int(os.environ.get("TRANSLATE_MAX_CHARS", 4000))
+TRANSLATE_CONCURRENCY = int(os.environ.get("TRANSLATE_CONCURRENCY", 4))
+TRANSLATE_CACHE_TTL = int(os.environ.get("TRANSLATE_CACHE_TTL", 30 * 24 * 3600))
+TRANSLATE_BUDGET_SECONDS = float(os.environ.get("TRANSLATE_BUDGET_SECONDS", 15))
+
+# LLM 客户端：失败重试（429/5xx，指数退避）、对冲请求延迟（秒，0 关闭）、流式读取、响应缓存有效期、并发与速率上限、
+# 模型单次输出 token 上限（按输入估算 max_tokens 时不超过此值）
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 3))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", 0.5))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", 8))
+LLM_HEDGE_DELAY = float(os.environ.get("LLM_HEDGE_DELAY", 0))
+LLM_STREAM = os.environ.get("LLM_STREAM", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 24 * 3600))
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", 4))
+LLM_RATE_PER_MIN = float(os.environ.get("LLM_RATE_PER_MIN", 60))
+LLM_TOKENS_PER_MIN = float(os.environ.get("LLM_TOKENS_PER_MIN", 200000))
+LLM_MAX_OUTPUT_TOKENS = int(os.environ.get("LLM_MAX_OUTPUT_TOKENS", 4096))
+
+# 检索引擎健康度：滑动平均系数、连续失败熔断阈值、熔断冷却时间（秒，半开探测失败后翻倍至上限）、持久化路径
+ENGINE_HEALTH_PATH = os.path.join(OUTPUT_DIR, "engine_health.json")
+ENGINE_HEALTH_ALPHA = float(os.environ.get("ENGINE_HEALTH_ALPHA", 0.3))
+ENGINE_FAILURE_THRESHOLD = int(os.environ.get("ENGINE_FAILURE_THRESHOLD", 3))
+ENGINE_OPEN_SECONDS = float(os.environ.get("ENGINE_OPEN_SECONDS", 60))
+ENGINE_OPEN_MAX_SECONDS = float(os.environ.get("ENGINE_OPEN_MAX_SECONDS", 900))
+
+# HTML 解析：auto（selectolax -> lxml -> bs4 依次选择可用者）/ selectolax / lxml / bs4；是否只保留正文区块
+HTML_PARSER = os.environ.get("HTML_PARSER", "auto")
+HTML_MAIN_CONTENT = os.environ.get("HTML_MAIN_CONTENT", "true").lower() in ("1", "true", "yes")
+
+# 发布时间抽取：正文中匹配日期的扫描长度（字符）；结构化信号与正则都失败时是否再用 dateparser 兜底
+DATE_SCAN_CHARS = int(os.environ.get("DATE_SCAN_CHARS", 3000))
+DATE_USE_DATEPARSER = os.environ.get("DATE_USE_DATEPARSER", "true").lower() in ("1", "true", "yes")
+
+# 品牌监控：文档库路径、文档保留天数（由报告清理线程执行，监控中的品牌至少保留其时间窗；0 不清理）、
+# 是否启用调度器、调度检查间隔与默认刷新间隔（秒）
+DOC_STORE_PATH = os.path.join(OUTPUT_DIR, "docs.sqlite3")
+DOC_STORE_RETENTION_DAYS = int(os.environ.get("DOC_STORE_RETENTION_DAYS", 30))
+MONITOR_ENABLED = os.environ.get("MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+MONITOR_TICK_SECONDS = int(os.environ.get("MONITOR_TICK_SECONDS", 60))
+MONITOR_INTERVAL_SECONDS = int(os.environ.get("MONITOR_INTERVAL_SECONDS", 3600))
+
+# 报告渲染：模板字节码缓存目录、报告主体渲染缓存条数、PDF 后台生成线程数与下载时最长等待（秒）
+REPORT_TEMPLATE_CACHE_DIR = os.path.join(OUTPUT_DIR, ".jinja_cache")
+REPORT_RENDER_CACHE_SIZE = int(os.environ.get("REPORT_RENDER_CACHE_SIZE", 64))
+REPORT_PDF_WORKERS = int(os.environ.get("REPORT_PDF_WORKERS", 1))
+REPORT_PDF_WAIT_SECONDS = float(os.environ.get("REPORT_PDF_WAIT_SECONDS", 30))
+# 报告分发：预压缩级别（gzip；安装 brotli 时同时生成 .br）、浏览器/代理缓存时间（秒，报告写入后不再变化）、
+# 报告索引内存缓存条数
+REPORT_COMPRESS_LEVEL = int(os.environ.get("REPORT_COMPRESS_LEVEL", 9))
+REPORT_CACHE_MAX_AGE = int(os.environ.get("REPORT_CACHE_MAX_AGE", 7 * 24 * 3600))
+REPORT_INDEX_CACHE_SIZE = int(os.environ.get("REPORT_INDEX_CACHE_SIZE", 4096))
+
+# 报告保留策略：是否启用后台清理、执行间隔（秒）、保留天数（0 不按时间淘汰）、报告目录总大小上限（字节，0 不限，含归档），
+# 淘汰前是否按日期打包归档（tar.gz）、归档目录及归档保留天数（0 不按时间删除）
+RETENTION_ENABLED = os.environ.get("RETENTION_ENABLED", "true").lower() in ("1", "true", "yes")
+RETENTION_INTERVAL_SECONDS = int(os.environ.get("RETENTION_INTERVAL_SECONDS", 3600))
+REPORT_RETENTION_DAYS = int(os.environ.get("REPORT_RETENTION_DAYS", 30))
+REPORT_MAX_BYTES = int(os.environ.get("REPORT_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+REPORT_ARCHIVE = os.environ.get("REPORT_ARCHIVE", "true").lower() in ("1", "true", "yes")
+REPORT_ARCHIVE_DIR = os.path.join(OUTPUT_DIR, "archive")
+REPORT_ARCHIVE_RETENTION_DAYS = int(os.environ.get("REPORT_ARCHIVE_RETENTION_DAYS", 365))
+
+# URL 规范化：额外要去除的跟踪参数（逗号分隔，不区分大小写）、跨任务记忆的 跳转链接->落地页 条数
+URL_STRIP_PARAMS = os.environ.get("URL_STRIP_PARAMS", "")
+URL_RECENT_SIZE = int(os.environ.get("URL_RECENT_SIZE", 20000))
+
+# 跳转链接解析：只读响应头（及中转页开头）得到落地地址；解析结果缓存时间（秒）、最多跟随跳数、
+# 中转页最多读取字节数（识别 meta refresh）、并发数
+REDIRECT_CACHE_TTL = int(os.environ.get("REDIRECT_CACHE_TTL", 7 * 24 * 3600))
+REDIRECT_MAX_HOPS = int(os.environ.get("REDIRECT_MAX_HOPS", 5))
+REDIRECT_PEEK_BYTES = int(os.environ.get("REDIRECT_PEEK_BYTES", 16384))
+REDIRECT_CONCURRENCY = int(os.environ.get("REDIRECT_CONCURRENCY", 8))
+
+# 页面下载：单页最多读取字节数（解压后，超出截断）、允许的 Content-Type（逗号分隔，缺省响应头时按 HTML 处理）
+FETCH_MAX_BYTES = int(os.environ.get("FETCH_MAX_BYTES", 2 * 1024 * 1024))
+FETCH_ALLOWED_TYPES = os.environ.get(
+    "FETCH_ALLOWED_TYPES", "text/html,application/xhtml+xml,text/plain,text/markdown"
+)
+
+# 语言识别：CJK 汉字占字母类字符的比例达到该值直接判为中文；比例判断与 langdetect 均只取正文开头若干字符
+LANG_CJK_RATIO = float(os.environ.get("LANG_CJK_RATIO", 0.3))
+LANG_SAMPLE_CHARS = int(os.environ.get("LANG_SAMPLE_CHARS", 1000))
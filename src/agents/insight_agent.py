@@ -1,14 +1,39 @@
-from collections import Counter
+from collections import Counter, defaultdict
 import re
 
+from config import CLUSTER_WORKERS, CLUSTER_FEATURE_CHARS
+from src.utils.cluster import cluster_texts
+
+try:
+    from src.utils.channel import classify
+except Exception:
+    def classify(_):
+        return "其他"
+
+# 只保留长度 ≥ 2 的词：单字不计入关键词，中文长片段在聚类特征中另行切分
+_TOKEN_RE = re.compile(r"[\u4e00-\u9fffA-Za-z0-9]{2,}")
+
+# 情感（占位）：简单按词典规则估计（LLM Key提供后可替换）
+POS_WORDS = {"好", "优秀", "点赞", "满意", "推荐", "不错", "很棒"}
+NEG_WORDS = {"差", "糟糕", "投诉", "失望", "不行", "问题", "吐槽", "差评"}
+
+
+def _lexicon_pattern(words):
+    """把词典编译为一个多模式正则（由正则引擎在 C 层单次扫描匹配，长词优先），
+    命中任意一个即可提前结束，代替逐词 `in` 扫描全文。"""
+    return re.compile("|".join(re.escape(w) for w in sorted(words, key=len, reverse=True)))
+
+
+_POS_RE = _lexicon_pattern(POS_WORDS)
+_NEG_RE = _lexicon_pattern(NEG_WORDS)
+
 
 class InsightAgent:
     def __init__(self, n_clusters: int = 5):
         self.n_clusters = n_clusters
 
     def analyze(self, docs):
-        texts = [d["text"] for d in docs]
-        if not texts:
+        if not docs:
             return {
                 "clusters": [],
                 "keywords": [],
@@ -17,68 +42,39 @@ class InsightAgent:
                 "channels": {},
             }
 
-        # 关键词（粗略）：基于简单分词规则统计高频词
-        tokens_list = []
+        # 单次遍历：分词、关键词计数、情感命中、日趋势与渠道分布一并完成
         word_counter = Counter()
-        for t in texts:
-            tokens = re.findall(r"[\u4e00-\u9fffA-Za-z0-9]+", t)
-            tokens_list.append(tokens)
-            for w in tokens:
-                if len(w) >= 2:
-                    word_counter[w] += 1
-        keywords = [w for w, _ in word_counter.most_common(20)]
-
-        # 简易聚类：按关键词命中进行粗分组
-        key_set = set(keywords[:min(10, len(keywords))])
-        clusters_map = {}
-        for idx, tokens in enumerate(tokens_list):
-            hit = key_set.intersection(tokens)
-            label = next(iter(hit), None)
-            if label is None:
-                label = "其它"
-            clusters_map.setdefault(label, []).append(idx)
-        clusters = []
-        for c_label, idxs in clusters_map.items():
-            clusters.append({
-                "label": c_label,
-                "size": len(idxs),
-                "samples": [docs[i]["text"][:300] for i in idxs[:3]],
-            })
-
-        # 情感（占位）：简单按词典规则估计（LLM Key提供后可替换）
-        pos_words = {"好", "优秀", "点赞", "满意", "推荐", "不错", "很棒"}
-        neg_words = {"差", "糟糕", "投诉", "失望", "不行", "问题", "吐槽", "差评"}
-        pos = sum(any(p in t for p in pos_words) for t in texts)
-        neg = sum(any(n in t for n in neg_words) for t in texts)
-        neu = max(len(texts) - pos - neg, 0)
-
-        # 趋势：按发布日期做日粒度统计
-        from collections import defaultdict
-        from datetime import datetime
+        pos = neg = 0
         daily = defaultdict(int)
+        ch_counter = defaultdict(int)
         for d in docs:
+            t = d["text"]
+            # 关键词（粗略）：基于简单分词规则统计高频词
+            tokens = _TOKEN_RE.findall(t)
+            word_counter.update(tokens)
+
+            if _POS_RE.search(t):
+                pos += 1
+            if _NEG_RE.search(t):
+                neg += 1
+
+            # 趋势：按发布日期做日粒度统计
             dt = d.get("published")
-            if not dt:
-                continue
-            try:
-                date_str = dt.strftime("%Y-%m-%d") if hasattr(dt, "strftime") else str(dt)[:10]
-            except Exception:
-                date_str = str(dt)[:10]
-            if date_str:
-                daily[date_str] += 1
-        trend = [{"date": k, "count": v} for k, v in sorted(daily.items())]
+            if dt:
+                try:
+                    date_str = dt.strftime("%Y-%m-%d") if hasattr(dt, "strftime") else str(dt)[:10]
+                except Exception:
+                    date_str = str(dt)[:10]
+                if date_str:
+                    daily[date_str] += 1
 
-        # 渠道分布：按 URL 识别来源平台
-        from collections import defaultdict as dd
-        try:
-            from src.utils.channel import classify
-        except Exception:
-            def classify(_):
-                return "其他"
-        ch_counter = dd(int)
-        for d in docs:
-            ch = classify(d.get("url", ""))
-            ch_counter[ch] += 1
+            # 渠道分布：按 URL 识别来源平台（文档库中的文档已带渠道）
+            ch_counter[d.get("channel") or classify(d.get("url", ""))] += 1
+
+        keywords = [w for w, _ in word_counter.most_common(20)]
+        neu = max(len(docs) - pos - neg, 0)
+        trend = [{"date": k, "count": v} for k, v in sorted(daily.items())]
+        clusters = self._cluster(docs)
 
         return {
             "clusters": clusters,
@@ -86,4 +82,17 @@ class InsightAgent:
             "sentiment": {"pos": pos, "neg": neg, "neu": neu},
             "trend": trend,
             "channels": dict(ch_counter),
-        }
\ No newline at end of file
+        }
+
+    def analyze_from_store(self, store, brand: str, start=None, end=None, channel=None, match=None):
+        """直接按时间窗/渠道/全文条件从文档库取数并分析，不发起任何网络请求。"""
+        return self.analyze(store.query(brand, start=start, end=end, channel=channel, match=match))
+
+    def _cluster(self, docs):
+        # 话题聚类：哈希 TF-IDF + Mini-batch k-means，簇数由 n_clusters 指定
+        return cluster_texts(
+            [d["text"] for d in docs],
+            k=self.n_clusters,
+            workers=CLUSTER_WORKERS,
+            max_chars=CLUSTER_FEATURE_CHARS,
+        )
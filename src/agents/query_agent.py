@@ -1,17 +1,42 @@
-import httpx
-from bs4 import BeautifulSoup
-from langdetect import detect
 from datetime import datetime, timedelta
-import dateparser
 import hashlib
-import re
+import json
 import time
 
-from config import SEARXNG_INSTANCES, PREFER_CN_SITES, CN_SITES, TIME_BUDGET_SECONDS, MAX_FETCHES_PER_ANALYSIS
-from src.services.search_searx import web_search_combined, web_search_cn_first
+from config import (
+    SEARXNG_INSTANCES, PREFER_CN_SITES, CN_SITES, TIME_BUDGET_SECONDS, MAX_FETCHES_PER_ANALYSIS,
+    FETCH_CONCURRENCY, FETCH_PER_HOST_LIMIT, SEARCH_CONCURRENCY, FETCH_TIMEOUT, CACHE_PAGE_TTL,
+)
+from src.services.search_searx import web_search_combined, web_search_cn_first, dispatch_searches
 from src.services.fetchers import zhihu_fetch
-from src.utils.text import normalize_text, translate_to_zh
+from src.services.downloader import fetch_html
+from src.services.resolver import resolve_many
+from src.utils.text import normalize_text
+from src.utils.html_extract import parse as parse_html, extract_text, find_meta_refresh
+from src.utils.dates import extract_published
 from src.utils.dedup import near_dedup
+from src.utils.lang import detect_languages
+from src.utils.fetch_pool import FetchPool
+from src.utils.cache import get_cache
+from src.utils.urls import URLFrontier, canonicalize
+
+
+def _doc_to_json(doc: dict) -> str:
+    published = doc.get("published")
+    return json.dumps(
+        dict(doc, published=published.isoformat() if hasattr(published, "isoformat") else published),
+        ensure_ascii=False,
+    )
+
+
+def _doc_from_json(value: str) -> dict:
+    doc = json.loads(value)
+    if doc.get("published"):
+        try:
+            doc["published"] = datetime.fromisoformat(doc["published"])
+        except Exception:
+            doc["published"] = None
+    return doc
 
 
 class QueryAgent:
@@ -60,7 +85,44 @@ class QueryAgent:
             terms.extend(ext + site_ext)
         return terms
 
+    def _cached_doc(self, url: str, logs=None):
+        """文档缓存命中时直接返回（不发请求、不解析），否则返回 None。"""
+        cache = get_cache()
+        if not cache:
+            return None
+        try:
+            entry = cache.get("doc", url)
+            if entry:
+                doc = _doc_from_json(entry["value"])
+                msg = f"[QueryEngine] FETCH_OK {doc['url']} len={len(doc['text'])} cache=hit"
+                print(msg)
+                if isinstance(logs, list):
+                    logs.append(msg)
+                return doc
+        except Exception:
+            pass
+        return None
+
     def _fetch_and_extract(self, url: str, logs=None):
+        """抓取并抽取单个 URL；命中文档缓存时不发请求、不解析。
+        结果同时按请求 URL 与落地页 URL 缓存，其他检索结果直链到同一页面时也能命中。"""
+        doc = self._cached_doc(url, logs)
+        if doc:
+            return doc
+        doc = self._fetch_and_extract_uncached(url, logs)
+        if doc:
+            doc["url"] = canonicalize(doc["url"])
+        cache = get_cache()
+        if doc and cache:
+            try:
+                value = _doc_to_json(doc)
+                for key in {url, doc["url"]}:
+                    cache.set("doc", key, value, CACHE_PAGE_TTL)
+            except Exception:
+                pass
+        return doc
+
+    def _fetch_and_extract_uncached(self, url: str, logs=None):
         try:
             # 基础清洗：去除包裹字符与反引号
             orig_url = url
@@ -83,21 +145,9 @@ class QueryAgent:
                     logs.append(msg)
                 return doc
             # 其他搜索引擎跳转链接（sogou/360 等），先请求再判断最终落地域名
-            r = httpx.get(
-                url,
-                timeout=8,
-                follow_redirects=True,
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Safari/537.36",
-                    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                },
-            )
+            r = fetch_html(url, timeout=FETCH_TIMEOUT)
             # 如果最终跳转到知乎，则改用知乎定制抓取
-            try:
-                final_url = str(r.url)
-            except Exception:
-                final_url = url
+            final_url = r["url"] or url
             if "zhihu.com" in final_url:
                 doc = zhihu_fetch(final_url)
                 if not doc:
@@ -112,71 +162,57 @@ class QueryAgent:
                     logs.append(msg)
                 return doc
 
-            if r.status_code != 200:
-                msg = f"[QueryEngine] FETCH_FAIL {url} status={r.status_code}"
+            if r["status"] != 200:
+                # 415/413：响应头显示非 HTML 或体积超限，未下载响应体
+                msg = f"[QueryEngine] FETCH_FAIL {url} status={r['status']}" + (f" {r['reason']}" if r.get("reason") else "")
                 print(msg)
                 if isinstance(logs, list):
                     logs.append(msg)
                 return None
-            html = r.text
-            soup = BeautifulSoup(html, "html.parser")
-
-            # 处理 meta refresh 跳转（常见于搜狗/360的中转页）
-            meta_refresh = soup.find("meta", attrs={"http-equiv": lambda v: v and v.lower() == "refresh"})
-            if meta_refresh and meta_refresh.get("content"):
-                cnt = meta_refresh["content"]
-                # 形如: "0; URL='https://www.zhihu.com/...'"
-                m = re.search(r"url\s*=?\s*([^;]+)", cnt, flags=re.I)
-                tgt = None
-                if m:
-                    tgt = m.group(1).strip().strip("'\"`")
-                    if tgt:
-                        if "zhihu.com" in tgt:
-                            doc = zhihu_fetch(tgt)
-                            if not doc:
-                                msg = f"[QueryEngine] FETCH_FAIL zhihu {tgt}"
-                                print(msg)
-                                if isinstance(logs, list):
-                                    logs.append(msg)
-                                return None
-                            msg = f"[QueryEngine] FETCH_OK zhihu {tgt} len={len(doc.get('text',''))}"
-                            print(msg)
-                            if isinstance(logs, list):
-                                logs.append(msg)
-                            return doc
-                        # 非知乎的 refresh，直接跟进抓取一次
-                        rr = httpx.get(tgt, timeout=8, follow_redirects=True, headers={
-                            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Safari/537.36",
-                            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                        })
-                        if rr.status_code == 200:
-                            soup = BeautifulSoup(rr.text, "html.parser")
-                        else:
-                            msg = f"[QueryEngine] FETCH_FAIL {tgt} status={rr.status_code}"
-                            print(msg)
-                            if isinstance(logs, list):
-                                logs.append(msg)
-                            return None
-            # 去除脚本/样式
-            for tag in soup(["script", "style", "noscript"]):
-                tag.extract()
-            text = soup.get_text("\n")
-            text = normalize_text(text)
-            # 尝试语言检测与翻译
-            try:
-                lang = detect(text)
-            except Exception:
-                lang = "unknown"
-            if lang != "zh-cn" and lang != "zh" and lang != "unknown":
-                text = translate_to_zh(text)
-            # 尝试从页面中解析日期（弱匹配）
-            published = dateparser.search.search_dates(text)
+            html = r["text"]
+            landing = final_url
+
+            # 处理 meta refresh 跳转（常见于搜狗/360的中转页）：解析前用正则识别，页面只解析一次
+            tgt = find_meta_refresh(html)
+            if tgt:
+                if "zhihu.com" in tgt:
+                    doc = zhihu_fetch(tgt)
+                    if not doc:
+                        msg = f"[QueryEngine] FETCH_FAIL zhihu {tgt}"
+                        print(msg)
+                        if isinstance(logs, list):
+                            logs.append(msg)
+                        return None
+                    msg = f"[QueryEngine] FETCH_OK zhihu {tgt} len={len(doc.get('text',''))}"
+                    print(msg)
+                    if isinstance(logs, list):
+                        logs.append(msg)
+                    return doc
+                # 非知乎的 refresh，直接跟进抓取一次
+                rr = fetch_html(tgt, timeout=FETCH_TIMEOUT)
+                if rr["status"] == 200:
+                    html = rr["text"]
+                    landing = rr["url"] or tgt
+                else:
+                    msg = f"[QueryEngine] FETCH_FAIL {tgt} status={rr['status']}"
+                    print(msg)
+                    if isinstance(logs, list):
+                        logs.append(msg)
+                    return None
+            page = parse_html(html)
+            # 发布时间：结构化信号（meta/JSON-LD/<time>）需在正文抽取裁剪页面树之前读取
+            published = extract_published(html=html, page=page, url=landing)
+            text = normalize_text(extract_text(page))
+            # 无结构化时间时，再从正文开头匹配日期
+            if published is None:
+                published = extract_published(text=text)
             doc = {
-                "url": url,
+                # 以跳转后的落地页作为文档 URL，便于渠道识别与跨结果去重
+                "url": landing,
                 "text": text,
-                "language": lang,
-                "published": published[0][1] if published else None,
+                # 语言在检索结束后批量识别
+                "language": None,
+                "published": published,
             }
             msg = f"[QueryEngine] FETCH_OK {doc['url']} len={len(doc['text'])}"
             print(msg)
@@ -196,27 +232,36 @@ class QueryAgent:
         cutoff = datetime.now() - timedelta(days=self.time_window_days)
         return dt >= cutoff
 
-    def run(self, logs=None):
+    def run(self, logs=None, known_urls=None):
+        """检索并抓取文档。known_urls 为已入库的 URL 集合（监控模式增量抓取），命中的链接直接跳过。"""
         queries = self._build_queries()
         results = []
         start_ts = time.time()
         total_fetches = 0
-        # 统一调用组合检索：SearXNG -> DuckDuckGo -> Bing -> Baidu
-        for q in queries:
-            # 时间预算：超时直接停止后续检索
-            if time.time() - start_ts > TIME_BUDGET_SECONDS:
-                msg = f"[QueryEngine] TIME_BUDGET_REACHED after {int(time.time()-start_ts)}s fetches={total_fetches}"
-                print(msg)
-                if isinstance(logs, list):
-                    logs.append(msg)
-                break
-            per_q = max(10, self.max_results // max(1, len(queries)))
-            # 减小每个查询的抓取上限，避免阻塞
-            per_q = min(per_q, 6)
+        # 抓取前沿：命中链接先规范化去重（跟踪参数、跳转链接、知乎移动端等），已知 URL 直接跳过
+        frontier = URLFrontier(known=known_urls)
+        cache_hits = []
+        # 并发抓取：检索命中的 URL 入队，由抓取池按全局/单主机并发上限消费
+        pool = FetchPool(
+            lambda u: self._fetch_and_extract(u, logs),
+            concurrency=FETCH_CONCURRENCY,
+            per_host=FETCH_PER_HOST_LIMIT,
+            deadline=start_ts + TIME_BUDGET_SECONDS,
+        )
+        per_q = max(10, self.max_results // max(1, len(queries)))
+        # 减小每个查询的抓取上限，避免阻塞
+        per_q = min(per_q, 6)
+
+        def _search(q):
             if self.prefer_cn_sites or ("site:" in q):
-                hits = web_search_cn_first(q, max_results=per_q)
-            else:
-                hits = web_search_combined(q, instances=SEARXNG_INSTANCES, max_results=per_q)
+                return web_search_cn_first(q, max_results=per_q)
+            return web_search_combined(q, instances=SEARXNG_INSTANCES, max_results=per_q)
+
+        # 所有查询并发检索，按完成顺序把命中 URL 送入抓取池
+        searches = dispatch_searches(queries, _search, concurrency=SEARCH_CONCURRENCY, deadline=start_ts + TIME_BUDGET_SECONDS)
+        searched = 0
+        for q, hits in searches:
+            searched += 1
             try:
                 engine = hits[0].get("engine") if hits else None
             except Exception:
@@ -225,17 +270,19 @@ class QueryAgent:
             print(msg)
             if isinstance(logs, list):
                 logs.append(msg)
+            # 抓取前先并发解析本批跳转链接（只读响应头），直接抓取落地页，省去跳转与中转页下载
+            landings = resolve_many([h.get("url") for h in hits], logs=logs, deadline=start_ts + TIME_BUDGET_SECONDS)
             for h in hits:
-                if time.time() - start_ts > TIME_BUDGET_SECONDS:
-                    msg = f"[QueryEngine] TIME_BUDGET_REACHED during fetch after {int(time.time()-start_ts)}s fetches={total_fetches}"
-                    print(msg)
-                    if isinstance(logs, list):
-                        logs.append(msg)
-                    break
-                url = h.get("url")
-                if not url:
+                url = canonicalize(h.get("url"))
+                key = frontier.admit(landings.get(url) or url)
+                if not key:
                     continue
-                doc = self._fetch_and_extract(url, logs)
+                # 文档缓存命中不占用抓取配额
+                doc = self._cached_doc(key, logs)
+                if doc:
+                    cache_hits.append((key, doc))
+                    continue
+                pool.submit(key)
                 total_fetches += 1
                 if total_fetches >= MAX_FETCHES_PER_ANALYSIS:
                     msg = f"[QueryEngine] FETCH_LIMIT_REACHED limit={MAX_FETCHES_PER_ANALYSIS}"
@@ -243,12 +290,42 @@ class QueryAgent:
                     if isinstance(logs, list):
                         logs.append(msg)
                     break
-                if not doc:
-                    continue
-                if not self._within_time_window(doc.get("published")):
-                    continue
-                results.append(doc)
+            if total_fetches >= MAX_FETCHES_PER_ANALYSIS:
+                break
+        searches.close()
+        st = frontier.stats
+        msg = (f"[QueryEngine] FRONTIER admitted={st['admitted']} duplicate={st['duplicate']} known={st['known']} "
+               f"cache_hits={len(cache_hits)} fetches={total_fetches}")
+        print(msg)
+        if isinstance(logs, list):
+            logs.append(msg)
+        if searched < len(queries) and time.time() - start_ts > TIME_BUDGET_SECONDS:
+            msg = f"[QueryEngine] TIME_BUDGET_REACHED after {int(time.time()-start_ts)}s searches={searched}/{len(queries)} fetches={total_fetches}"
+            print(msg)
+            if isinstance(logs, list):
+                logs.append(msg)
+
+        pool.close()
+        fetched = pool.join()
+        unfinished = total_fetches - len(fetched)
+        if unfinished > 0:
+            msg = f"[QueryEngine] TIME_BUDGET_REACHED during fetch after {int(time.time()-start_ts)}s fetches={len(fetched)} pending={unfinished}"
+            print(msg)
+            if isinstance(logs, list):
+                logs.append(msg)
+        for url, doc in cache_hits + fetched:
+            if not doc:
+                continue
+            # 不同跳转链接落到同一页面时只保留先完成的一份
+            if not frontier.landed(url, doc["url"]):
+                continue
+            # 记录检索命中的原始链接（可能是跳转链接），供增量抓取识别已处理过的 URL
+            doc.setdefault("source_url", url)
+            if not self._within_time_window(doc.get("published")):
+                continue
+            results.append(doc)
 
         # 去重（跨平台）：按文本近重复
         deduped = near_dedup(results, key=lambda d: d["text"])
-        return deduped
\ No newline at end of file
+        # 语言识别：去重后批量进行（中文直接按汉字比例判定），供翻译阶段决定是否翻译
+        return detect_languages(deduped, logs=logs)
@@ -1,35 +1,133 @@
+import hashlib
+import json
 import os
-from jinja2 import Environment, FileSystemLoader
-import pdfkit
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from markupsafe import Markup
+
+from config import REPORT_TEMPLATE_CACHE_DIR, REPORT_RENDER_CACHE_SIZE, REPORT_PDF_WORKERS
+from src.services.report_files import get_index
+
+# 报告主体中每次运行都不同的片段（耗时表 / 日志），单独渲染后替换占位符
+_TIMINGS_SLOT = "<!--REPORT:timings-->"
+_LOGS_SLOT = "<!--REPORT:logs-->"
+
+# 进程级共享：模板环境（字节码缓存落盘，重启后免编译）、报告主体渲染缓存、PDF 生成线程池
+_env = None
+_render_cache = OrderedDict()
+_pdf_pool = None
+_pdf_jobs = {}
+_lock = threading.Lock()
+
+
+def _get_env() -> Environment:
+    global _env
+    with _lock:
+        if _env is None:
+            os.makedirs(REPORT_TEMPLATE_CACHE_DIR, exist_ok=True)
+            _env = Environment(
+                loader=FileSystemLoader("templates"),
+                autoescape=True,
+                bytecode_cache=FileSystemBytecodeCache(REPORT_TEMPLATE_CACHE_DIR),
+            )
+        return _env
+
+
+def _render_key(tmpl, **inputs) -> str:
+    """报告主体的缓存键：模板版本 + 分析输入（品牌、时间窗、洞察、结论、样本文档）的哈希。"""
+    docs = inputs.pop("docs")
+    inputs["n_docs"] = len(docs)
+    inputs["docs"] = [(d.get("url"), str(d.get("published")), (d.get("text") or "")[:200]) for d in docs[:15]]
+    try:
+        inputs["template_mtime"] = os.path.getmtime(tmpl.filename)
+    except Exception:
+        pass
+    raw = json.dumps(inputs, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _pdf_executor() -> ThreadPoolExecutor:
+    global _pdf_pool
+    with _lock:
+        if _pdf_pool is None:
+            _pdf_pool = ThreadPoolExecutor(max_workers=max(1, REPORT_PDF_WORKERS), thread_name_prefix="report-pdf")
+        return _pdf_pool
+
+
+def _build_pdf(html_path: str, pdf_path: str) -> str:
+    import pdfkit
+
+    # 先写临时文件再改名，避免下载到未写完的 PDF
+    tmp = pdf_path + ".tmp"
+    pdfkit.from_file(html_path, tmp)
+    os.replace(tmp, pdf_path)
+    return pdf_path
+
+
+def request_pdf(html_path: str, pdf_path: str) -> Future:
+    """按需生成 PDF（wkhtmltopdf）：放入后台线程池，同一报告并发请求共用一个任务。
+    已存在时直接返回已完成的 Future。"""
+    if os.path.exists(pdf_path):
+        fut = Future()
+        fut.set_result(pdf_path)
+        return fut
+    pool = _pdf_executor()
+    with _lock:
+        fut = _pdf_jobs.get(pdf_path)
+        # 失败的任务（如未安装 wkhtmltopdf）允许下次请求重试
+        if fut is None or (fut.done() and fut.exception() is not None):
+            fut = pool.submit(_build_pdf, html_path, pdf_path)
+            _pdf_jobs[pdf_path] = fut
+        return fut
+
 
 class ReportAgent:
     def __init__(self, output_dir: str):
         self.output_dir = output_dir
-        self.env = Environment(loader=FileSystemLoader("templates"), autoescape=True)
+        self.env = _get_env()
 
-    def generate_minimal(self, ts: str, brand: str, window_days: int, message: str, logs=None):
+    def _render(self, logs, timings, **inputs) -> str:
+        """渲染报告：主体按分析输入哈希缓存，相同输入直接复用；耗时表与日志每次单独渲染填入。"""
         tmpl = self.env.get_template("report_template.html")
-        html = tmpl.render(
-            ts=ts,
+        key = _render_key(tmpl, **inputs)
+        with _lock:
+            shell = _render_cache.get(key)
+            if shell is not None:
+                _render_cache.move_to_end(key)
+        if shell is None:
+            shell = tmpl.render(timings_html=Markup(_TIMINGS_SLOT), logs_html=Markup(_LOGS_SLOT), **inputs)
+            with _lock:
+                _render_cache[key] = shell
+                while len(_render_cache) > REPORT_RENDER_CACHE_SIZE:
+                    _render_cache.popitem(last=False)
+        timings_html = self.env.get_template("_report_timings.html").render(timings=timings or [])
+        logs_html = self.env.get_template("_report_logs.html").render(logs=logs or [])
+        return shell.replace(_TIMINGS_SLOT, timings_html, 1).replace(_LOGS_SLOT, logs_html, 1)
+
+    def generate_minimal(self, ts: str, brand: str, window_days: int, message: str, logs=None, timings=None):
+        html = self._render(
+            logs,
+            timings,
             brand=brand,
             window_days=window_days,
             docs=[],
             insights={},
             synthesis={"core_points": [message]},
-            logs=logs or [],
         )
         self._write_outputs(ts, html, md_content=f"# {brand} 舆情报告\n\n{message}\n")
 
-    def generate_full(self, ts: str, brand: str, window_days: int, docs, insights, synthesis, logs=None):
-        tmpl = self.env.get_template("report_template.html")
-        html = tmpl.render(
-            ts=ts,
+    def generate_full(self, ts: str, brand: str, window_days: int, docs, insights, synthesis, logs=None, timings=None):
+        html = self._render(
+            logs,
+            timings,
             brand=brand,
             window_days=window_days,
             docs=docs,
             insights=insights,
             synthesis=synthesis,
-            logs=logs or [],
         )
         # 生成MD（简单版）
         md_lines = [
@@ -53,16 +151,7 @@ class ReportAgent:
         self._write_outputs(ts, html, md_content)
 
     def _write_outputs(self, ts: str, html: str, md_content: str):
-        html_path = os.path.join(self.output_dir, f"report_{ts}.html")
-        md_path = os.path.join(self.output_dir, f"report_{ts}.md")
-        pdf_path = os.path.join(self.output_dir, f"report_{ts}.pdf")
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(html)
-        with open(md_path, "w", encoding="utf-8") as f:
-            f.write(md_content)
-        # 生成PDF（wkhtmltopdf优先，失败则跳过）
-        try:
-            pdfkit.from_file(html_path, pdf_path)
-        except Exception:
-            # 若未安装wkhtmltopdf，先跳过，后续可用reportlab兜底
-            pass
\ No newline at end of file
+        # PDF 不再随报告同步生成，首次下载时由 request_pdf 在后台生成；HTML/MD 写入时同时预压缩并登记索引
+        index = get_index(self.output_dir)
+        index.write(ts, "html", html.encode("utf-8"))
+        index.write(ts, "md", md_content.encode("utf-8"))
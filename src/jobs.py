@@ -0,0 +1,236 @@
+import multiprocessing
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from config import JOB_DB_PATH, JOB_WORKERS, JOB_QUEUE_MAX, JOB_WORKER_MODE
+from src.utils import metrics
+from src.utils.events import bus
+
+# 子进程结束任务后等待其事件转发完毕的最长时间（秒）
+_FLUSH_TIMEOUT = 10.0
+# 领取任务失败（如 database is locked）后的重试间隔（秒）
+_CLAIM_RETRY_SECONDS = 1.0
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """排队任务数已达上限（对外返回 429）。"""
+
+
+class JobQueue:
+    """分析任务队列：SQLite 持久化 + 有界工作池。
+    - 状态流转：queued -> running -> done/failed；进程重启后未完成的任务重新排队
+    - 背压：排队数达到 max_queued 时拒绝提交
+    - 合并：同一 品牌+时间窗 已有排队/运行中的任务时，直接复用该任务
+    - 执行方式：thread（工作线程内直接运行）或 process（工作线程把任务交给进程池）；
+      process 模式下子进程的进度事件与指标经队列转发回本进程发布，SSE 与 /metrics 不受影响
+    """
+
+    def __init__(self, runner: Callable, db_path: str = JOB_DB_PATH, workers: int = JOB_WORKERS,
+                 max_queued: int = JOB_QUEUE_MAX, mode: str = JOB_WORKER_MODE):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._started = False
+        self._procs = None
+        self._relay = None
+        self._flushed = {}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " ts TEXT PRIMARY KEY, brand TEXT NOT NULL, window_days INTEGER NOT NULL,"
+            " coalesce_key TEXT NOT NULL, state TEXT NOT NULL, error TEXT,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(coalesce_key, state)")
+
+    def start(self):
+        """启动工作线程（幂等）；把上次进程退出时仍在运行的任务放回队列。"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._conn.execute("UPDATE jobs SET state=?, started_at=NULL WHERE state=?", (QUEUED, RUNNING))
+            if self.mode == "process":
+                self._relay = multiprocessing.Queue()
+                self._procs = self._new_pool()
+                threading.Thread(target=self._relay_loop, name="job-relay", daemon=True).start()
+        for i in range(self.workers):
+            threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True).start()
+
+    @staticmethod
+    def _key(brand: str, window_days: int) -> str:
+        return f"{brand.strip().lower()}|{window_days}"
+
+    def submit(self, brand: str, window_days: int) -> dict:
+        """提交任务，返回任务信息（coalesced=True 表示复用了已有任务）；队列已满时抛出 QueueFull。"""
+        key = self._key(brand, window_days)
+        with self._cond:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE coalesce_key=? AND state IN (?, ?) ORDER BY created_at LIMIT 1",
+                (key, QUEUED, RUNNING),
+            ).fetchone()
+            if row is not None:
+                return dict(row, coalesced=True)
+            queued = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE state=?", (QUEUED,)).fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFull()
+            ts = base = time.strftime("%Y%m%d-%H%M%S")
+            n = 1
+            while self._conn.execute("SELECT 1 FROM jobs WHERE ts=?", (ts,)).fetchone():
+                n += 1
+                ts = f"{base}-{n}"
+            self._conn.execute(
+                "INSERT INTO jobs (ts, brand, window_days, coalesce_key, state, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (ts, brand, window_days, key, QUEUED, time.time()),
+            )
+            self._cond.notify()
+        bus.publish(ts, {"type": "state", "state": QUEUED})
+        job = self.get(ts)
+        job["coalesced"] = False
+        return job
+
+    def get(self, ts: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE ts=?", (ts,)).fetchone()
+        return dict(row) if row else None
+
+    def _claim(self) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT * FROM jobs WHERE state=? ORDER BY created_at LIMIT 1", (QUEUED,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE jobs SET state=?, started_at=? WHERE ts=?", (RUNNING, time.time(), row["ts"]))
+        bus.publish(row["ts"], {"type": "state", "state": RUNNING})
+        return dict(row)
+
+    def _finish(self, ts: str, state: str, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state=?, error=?, finished_at=? WHERE ts=?",
+                (state, error, time.time(), ts),
+            )
+        bus.publish(ts, {"type": "state", "state": state, "error": error})
+
+    def _loop(self):
+        while True:
+            try:
+                with self._cond:
+                    job = self._claim()
+                    while job is None:
+                        self._cond.wait()
+                        job = self._claim()
+            except Exception as e:
+                # 领取失败不能让工作线程退出（否则队列永久少一个工作者），稍后重试
+                print(f"[Jobs] CLAIM_FAIL {type(e).__name__}: {e}")
+                time.sleep(_CLAIM_RETRY_SECONDS)
+                continue
+            args = (job["brand"], job["window_days"], job["ts"])
+            try:
+                if self._procs is not None:
+                    self._run_in_pool(args)
+                else:
+                    self.runner(*args)
+                state, error = DONE, None
+            except Exception as e:
+                state, error = FAILED, f"{type(e).__name__}: {e}"
+            try:
+                self._finish(job["ts"], state, error)
+            except Exception as e:
+                print(f"[Jobs] FINISH_FAIL ts={job['ts']} {type(e).__name__}: {e}")
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_child, initargs=(self._relay,))
+
+    def _reset_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """子进程异常退出后进程池不再可用：用相同的初始化参数重建（多个工作线程同时发现时只重建一次）。"""
+        with self._lock:
+            if self._procs is broken:
+                print("[Jobs] POOL_RESET broken process pool replaced")
+                metrics.inc("job_pool_resets_total")
+                self._procs = self._new_pool()
+                broken.shutdown(wait=False)
+            return self._procs
+
+    def _run_in_pool(self, args):
+        ts = args[2]
+        flushed = threading.Event()
+        with self._lock:
+            self._flushed[ts] = flushed
+        try:
+            procs = self._procs
+            try:
+                fut = procs.submit(_run_child, self.runner, *args)
+            except BrokenProcessPool:
+                procs = self._reset_pool(procs)
+                fut = procs.submit(_run_child, self.runner, *args)
+            crashed = False
+            try:
+                fut.result()
+            except BrokenProcessPool:
+                # 执行本任务的子进程崩溃：不会再有 flush 标记，不必等待
+                crashed = True
+                self._reset_pool(procs)
+                raise
+            finally:
+                if not crashed:
+                    # 等子进程发出的事件都已转发，再发布终态（避免终态之后还有日志）
+                    flushed.wait(_FLUSH_TIMEOUT)
+        finally:
+            with self._lock:
+                self._flushed.pop(ts, None)
+
+    def _relay_loop(self):
+        """process 模式：把子进程转发来的事件与指标在本进程发布。"""
+        while True:
+            try:
+                kind, *rest = self._relay.get()
+                if kind == "event":
+                    bus.publish(*rest)
+                elif kind == "inc":
+                    name, value, labels = rest
+                    metrics.inc(name, value, **labels)
+                elif kind == "observe":
+                    name, value, labels = rest
+                    metrics.observe(name, value, **labels)
+                elif kind == "flush":
+                    with self._lock:
+                        flushed = self._flushed.get(rest[0])
+                    if flushed is not None:
+                        flushed.set()
+            except Exception as e:
+                print(f"[Jobs] RELAY_FAIL {type(e).__name__}: {e}")
+
+
+_child_relay = None
+
+
+def _init_child(relay):
+    # 进程池子进程初始化：事件与指标改为转发到父进程
+    global _child_relay
+    _child_relay = relay
+    bus.forward_to(relay)
+    metrics.registry.forward_to(relay)
+
+
+def _run_child(runner: Callable, brand: str, window_days: int, ts: str):
+    try:
+        return runner(brand, window_days, ts)
+    finally:
+        # 同一队列先进先出：父进程收到此标记时，本任务此前的事件均已转发
+        _child_relay.put(("flush", ts))
@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import Optional
+
+from config import ENABLE_KEYWORD_EXPANSION, MONITOR_TICK_SECONDS, MONITOR_INTERVAL_SECONDS, TRANSLATE_BUDGET_SECONDS
+from src.agents.query_agent import QueryAgent
+from src.pipeline import render_from_store, new_report_ts
+from src.services.doc_store import get_store
+from src.services.translator import translate_docs
+
+
+def refresh_brand(brand: str, window_days: int, logs=None) -> Optional[str]:
+    """增量刷新一个品牌：检索并只抓取文档库中没有的 URL，新文档入库后从文档库重新生成报告。
+    返回报告编号。"""
+    store = get_store()
+    logs = logs if logs is not None else []
+    logs.append(f"[Monitor] REFRESH brand={brand} window={window_days}d")
+    agent = QueryAgent(brand=brand, time_window_days=window_days, expand_keywords=ENABLE_KEYWORD_EXPANSION)
+    docs = agent.run(logs, known_urls=store.known_urls(brand))
+    translate_docs(docs, logs=logs, deadline=time.time() + TRANSLATE_BUDGET_SECONDS)
+    added = store.add_docs(brand, docs)
+    logs.append(f"[Monitor] INGEST brand={brand} fetched={len(docs)} new={added}")
+    ts = new_report_ts()
+    render_from_store(brand, window_days, ts, logs=logs)
+    store.mark_run(brand, ts)
+    return ts
+
+
+class Monitor:
+    """品牌监控调度器：后台线程定期检查登记的品牌，到期的按顺序增量刷新。"""
+
+    def __init__(self, tick: float = MONITOR_TICK_SECONDS):
+        self.tick = tick
+        self._wake = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._loop, name="brand-monitor", daemon=True).start()
+
+    def register(self, brand: str, window_days: int, interval_seconds: int = MONITOR_INTERVAL_SECONDS) -> dict:
+        """登记（或更新）监控品牌，并立即唤醒调度器执行首次刷新。"""
+        store = get_store()
+        store.register(brand, window_days, interval_seconds)
+        self._wake.set()
+        return store.monitor(brand)
+
+    def unregister(self, brand: str) -> bool:
+        return get_store().unregister(brand)
+
+    @staticmethod
+    def due(now: Optional[float] = None):
+        now = now or time.time()
+        return [
+            m for m in get_store().monitors()
+            if m["last_run"] is None or m["last_run"] + m["interval_seconds"] <= now
+        ]
+
+    def _loop(self):
+        while True:
+            for m in self.due():
+                try:
+                    refresh_brand(m["brand"], m["window_days"])
+                except Exception as e:
+                    print(f"[Monitor] REFRESH_FAIL brand={m['brand']} error={type(e).__name__}: {e}")
+                    # 失败同样记录运行时间，避免每个周期反复重试拖慢其他品牌
+                    get_store().mark_run(m["brand"])
+            self._wake.wait(self.tick)
+            self._wake.clear()
+
+
+monitor = Monitor()
@@ -1,29 +1,39 @@
 import os
 import time
+import uuid
 from typing import Optional
 
-from config import OUTPUT_DIR, ENABLE_KEYWORD_EXPANSION
+from config import OUTPUT_DIR, ENABLE_KEYWORD_EXPANSION, TRANSLATE_BUDGET_SECONDS
 from src.agents.query_agent import QueryAgent
 from src.agents.insight_agent import InsightAgent
 from src.agents.forum_engine import ForumEngine
 from src.agents.report_agent import ReportAgent
+from src.services.translator import translate_docs
+from src.services.doc_store import get_store
 from config import DEMO_MODE
+from src.utils.events import EventLog
+from src.utils.metrics import RunTimings
 from datetime import datetime, timedelta
 
 
 def run_analysis_pipeline(brand: str, time_window_days: int = 30, timestamp: Optional[str] = None) -> bool:
     ts = timestamp or time.strftime("%Y%m%d-%H%M%S")
-    logs = []
+    # 日志同时推送到事件总线（/events/<ts> 实时展示阶段进度）
+    logs = EventLog(ts)
+    timings = RunTimings()
 
     # Agent 初始化
     query_agent = QueryAgent(brand=brand, time_window_days=time_window_days, expand_keywords=ENABLE_KEYWORD_EXPANSION)
-    insight_agent = InsightAgent()
-    forum_engine = ForumEngine()
     report_agent = ReportAgent(output_dir=OUTPUT_DIR)
 
+    # 监控中的品牌：直接用文档库中的数据生成报告（由调度器负责增量抓取）
+    if get_store().monitor(brand):
+        return render_from_store(brand, time_window_days, ts, logs=logs, timings=timings)
+
     # 1) 检索与清洗
     logs.append(f"[QueryEngine] START brand={brand} window={time_window_days}d ts={ts}")
-    docs = query_agent.run(logs)
+    with timings.stage("QueryEngine"):
+        docs = query_agent.run(logs)
     logs.append(f"[QueryEngine] DONE docs={len(docs)}")
     if not docs:
         if DEMO_MODE:
@@ -63,32 +73,94 @@ def run_analysis_pipeline(brand: str, time_window_days: int = 30, timestamp: Opt
                 "risk": ["发热相关投诉", "个别机型电池寿命反馈"],
                 "advice": ["优化快充热管理", "加强夜景样张传播", "围绕系统流畅度做对比评测"],
             }
-            report_agent.generate_full(ts, brand, time_window_days, demo_docs, demo_insights, demo_synthesis, logs=logs)
+            with timings.stage("ReportEngine"):
+                report_agent.generate_full(ts, brand, time_window_days, demo_docs, demo_insights, demo_synthesis,
+                                           logs=logs, timings=timings.stages)
             logs.append("[ReportEngine] DEMO report generated")
             return True
         else:
             # 生成一个空报告以提示用户，并显示过程日志
-            report_agent.generate_minimal(
-                ts,
-                brand,
-                time_window_days,
-                message="未检索到有效数据，请稍后重试或更换关键词",
-                logs=logs,
-            )
+            with timings.stage("ReportEngine"):
+                report_agent.generate_minimal(
+                    ts,
+                    brand,
+                    time_window_days,
+                    message="未检索到有效数据，请稍后重试或更换关键词",
+                    logs=logs,
+                    timings=timings.stages,
+                )
             return True
 
+    # 1.5) 翻译：非中文文档批量翻译；超出时间预算的保留原文直接参与分析
+    logs.append("[TranslateEngine] START")
+    with timings.stage("TranslateEngine"):
+        translate_docs(docs, logs=logs, deadline=time.time() + TRANSLATE_BUDGET_SECONDS)
+    logs.append("[TranslateEngine] DONE")
+
+    # 所有文档入库，便于之后按时间窗/渠道切片复用，无需重新抓取
+    try:
+        with timings.stage("DocStore"):
+            added = get_store().add_docs(brand, docs)
+        logs.append(f"[DocStore] SAVE docs={len(docs)} new={added}")
+    except Exception as e:
+        logs.append(f"[DocStore] SAVE_FAIL error={type(e).__name__}")
+
+    return _analyze_and_render(ts, brand, time_window_days, docs, logs, timings, report_agent)
+
+
+def _analyze_and_render(ts, brand, time_window_days, docs, logs, timings, report_agent=None) -> bool:
+    """分析 -> 整合 -> 报告，实时流水线与监控模式（文档库）共用。"""
+    report_agent = report_agent or ReportAgent(output_dir=OUTPUT_DIR)
+    insight_agent = InsightAgent()
+    forum_engine = ForumEngine()
+
     # 2) 分析：情感、关键词、聚类（轻量版）
     logs.append("[InsightEngine] START basic analysis")
-    insights = insight_agent.analyze(docs)
+    with timings.stage("InsightEngine"):
+        insights = insight_agent.analyze(docs)
     logs.append("[InsightEngine] DONE")
 
     # 3) 论坛整合（无Key时降级占位）
     logs.append("[ForumEngine] START synthesize")
-    synthesis = forum_engine.summarize(brand, insights)
+    with timings.stage("ForumEngine"):
+        synthesis = forum_engine.summarize(brand, insights)
     logs.append("[ForumEngine] DONE")
 
     # 4) 报告生成（HTML/MD，并尝试PDF）
     logs.append("[ReportEngine] START render & export")
-    report_agent.generate_full(ts, brand, time_window_days, docs, insights, synthesis, logs=logs)
+    with timings.stage("ReportEngine"):
+        report_agent.generate_full(ts, brand, time_window_days, docs, insights, synthesis, logs=logs,
+                                   timings=timings.stages)
     logs.append("[ReportEngine] DONE")
-    return True
\ No newline at end of file
+    return True
+
+
+def new_report_ts() -> str:
+    """非队列任务（监控刷新 / 文档库渲染）的报告编号，避免与同一秒内的任务编号冲突。"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:4]}"
+
+
+def render_from_store(brand: str, time_window_days: int = 30, timestamp: Optional[str] = None,
+                      logs=None, timings=None) -> bool:
+    """从文档库读取时间窗内的文档生成报告，不发起检索/抓取。
+    未传入 logs 时（背后没有任务，也就没有 SSE 订阅者）只记到普通列表，不占用事件总线频道。"""
+    ts = timestamp or new_report_ts()
+    logs = logs if logs is not None else []
+    timings = timings or RunTimings()
+    since = datetime.now() - timedelta(days=time_window_days)
+    with timings.stage("DocStore"):
+        docs = get_store().query(brand, start=since)
+    logs.append(f"[DocStore] LOAD brand={brand} window={time_window_days}d docs={len(docs)}")
+    if not docs:
+        report_agent = ReportAgent(output_dir=OUTPUT_DIR)
+        with timings.stage("ReportEngine"):
+            report_agent.generate_minimal(
+                ts,
+                brand,
+                time_window_days,
+                message="监控数据尚未就绪，请等待首次刷新完成后再查看",
+                logs=logs,
+                timings=timings.stages,
+            )
+        return True
+    return _analyze_and_render(ts, brand, time_window_days, docs, logs, timings)
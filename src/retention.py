@@ -0,0 +1,213 @@
+import os
+import re
+import shutil
+import tarfile
+import threading
+import time
+from typing import Optional
+
+from config import (
+    OUTPUT_DIR, REPORT_RETENTION_DAYS, REPORT_MAX_BYTES, REPORT_ARCHIVE, REPORT_ARCHIVE_DIR,
+    REPORT_ARCHIVE_RETENTION_DAYS, RETENTION_INTERVAL_SECONDS, DOC_STORE_RETENTION_DAYS,
+)
+from src.services.doc_store import get_store
+from src.services.report_files import get_index, shard_for, NAME_RE, SUFFIX
+
+# 旧版按任务写入的状态文件（现由任务队列 SQLite 记录），迁移时直接清理
+_LEGACY_STATUS_RE = re.compile(r"^status_.+\.json$")
+
+
+def migrate_legacy(root: str = OUTPUT_DIR, logs=None) -> dict:
+    """把平铺在输出目录下的旧报告移入日期分片并登记索引，删除旧版 status_*.json。"""
+    index = get_index(root)
+    moved = removed = 0
+    with os.scandir(root) as it:
+        names = [e.name for e in it if e.is_file()]
+    for name in names:
+        if _LEGACY_STATUS_RE.match(name):
+            try:
+                os.remove(os.path.join(root, name))
+                removed += 1
+            except OSError:
+                pass
+            continue
+        m = NAME_RE.match(name)
+        if not m or m.group(3):
+            continue
+        src = os.path.join(root, name)
+        try:
+            mtime = os.path.getmtime(src)
+            dst = os.path.join(root, *shard_for(m.group(1), mtime).split("/"), name)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            # 先移动预压缩变体，再移动原文件，保证原文件可见时变体已就位
+            variants = []
+            for enc, suf in SUFFIX.items():
+                if os.path.exists(src + suf):
+                    os.replace(src + suf, dst + suf)
+                    variants.append(enc)
+            os.replace(src, dst)
+            index.add(dst, variants=variants, created_at=mtime)
+            moved += 1
+        except OSError:
+            continue
+    if (moved or removed) and isinstance(logs, list):
+        logs.append(f"[Retention] MIGRATE moved={moved} status_removed={removed}")
+    return {"moved": moved, "status_removed": removed}
+
+
+def _archive_shard(root: str, shard: str, entries) -> Optional[str]:
+    """把分片内的报告原文件打包为 ARCHIVE_DIR/YYYY-MM-DD.tar.gz（预压缩变体不入包）。"""
+    os.makedirs(REPORT_ARCHIVE_DIR, exist_ok=True)
+    base = os.path.join(REPORT_ARCHIVE_DIR, (shard or "legacy").replace("/", "-"))
+    path, n = base + ".tar.gz", 1
+    while os.path.exists(path):
+        n += 1
+        path = f"{base}-{n}.tar.gz"
+    tmp = path + ".tmp"
+    with tarfile.open(tmp, "w:gz") as tar:
+        for e in entries:
+            if os.path.exists(e["path"]):
+                tar.add(e["path"], arcname=os.path.basename(e["path"]))
+    os.replace(tmp, path)
+    return path
+
+
+def _archives() -> list:
+    """归档目录下的 tar.gz，按修改时间从旧到新排列：[(mtime, 路径, 字节数)]。"""
+    out = []
+    try:
+        with os.scandir(REPORT_ARCHIVE_DIR) as it:
+            for e in it:
+                if e.is_file() and e.name.endswith(".tar.gz"):
+                    st = e.stat()
+                    out.append((st.st_mtime, e.path, st.st_size))
+    except OSError:
+        return []
+    out.sort()
+    return out
+
+
+def evict_shard(shard: str, root: str = OUTPUT_DIR, archive: bool = REPORT_ARCHIVE) -> int:
+    """淘汰一个日期分片：按配置先归档，再删除索引条目与文件，返回报告文件数。"""
+    index = get_index(root)
+    entries = index.shard_entries(shard)
+    if archive and entries:
+        _archive_shard(root, shard, entries)
+    # 先删索引再删文件，避免请求查到已删除的文件
+    index.drop_shard(shard)
+    for e in entries:
+        for p in [e["path"]] + list(e["variants"].values()):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+    if shard:
+        shard_dir = os.path.join(root, *shard.split("/"))
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        # 连带删除已空的年/月目录
+        parent = os.path.dirname(shard_dir)
+        while os.path.abspath(parent) != os.path.abspath(root):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+    return len(entries)
+
+
+def enforce(root: str = OUTPUT_DIR, now: Optional[float] = None, logs=None) -> dict:
+    """执行一次保留策略：先迁移旧版文件，再淘汰超过保留天数的分片与归档，最后按总大小（报告 + 归档）
+    从最旧的数据开始淘汰：先删最旧的归档，仍超出时再淘汰最旧的分片（此时不再归档，否则归档仍占容量）。
+    当天的分片不参与按大小淘汰。"""
+    now = now or time.time()
+    stats = migrate_legacy(root, logs)
+    index = get_index(root)
+    evicted = 0
+    shards = index.shards()
+    if REPORT_RETENTION_DAYS > 0:
+        cutoff = now - REPORT_RETENTION_DAYS * 86400
+        for s in [s for s in shards if s["last_write"] < cutoff]:
+            evicted += evict_shard(s["shard"], root)
+        shards = index.shards()
+    archives = _archives()
+    pruned = 0
+    if REPORT_ARCHIVE_RETENTION_DAYS > 0:
+        cutoff = now - REPORT_ARCHIVE_RETENTION_DAYS * 86400
+        for a in [a for a in archives if a[0] < cutoff]:
+            pruned += _remove_archive(a[1])
+        archives = [a for a in archives if a[0] >= cutoff]
+    if REPORT_MAX_BYTES > 0:
+        total = sum(s["size"] for s in shards) + sum(a[2] for a in archives)
+        for _, path, size in archives:
+            if total <= REPORT_MAX_BYTES:
+                break
+            pruned += _remove_archive(path)
+            total -= size
+        today = time.strftime("%Y/%m/%d", time.localtime(now))
+        for s in shards:
+            if total <= REPORT_MAX_BYTES:
+                break
+            if s["shard"] == today:
+                continue
+            evicted += evict_shard(s["shard"], root, archive=False)
+            total -= s["size"]
+    stats["evicted"] = evicted
+    stats["archives_removed"] = pruned
+    if evicted and isinstance(logs, list):
+        logs.append(f"[Retention] EVICT files={evicted} archive={REPORT_ARCHIVE}")
+    if pruned and isinstance(logs, list):
+        logs.append(f"[Retention] ARCHIVE_PRUNE removed={pruned}")
+    return stats
+
+
+def prune_docs(now: Optional[float] = None, logs=None) -> int:
+    """清理文档库中超过保留天数的文档（每次分析都会入库，不清理会无限增长）。"""
+    if DOC_STORE_RETENTION_DAYS <= 0:
+        return 0
+    removed = get_store().prune(DOC_STORE_RETENTION_DAYS, now=now)
+    if removed and isinstance(logs, list):
+        logs.append(f"[Retention] DOCS_PRUNE removed={removed} days={DOC_STORE_RETENTION_DAYS}")
+    return removed
+
+
+def _remove_archive(path: str) -> int:
+    try:
+        os.remove(path)
+        return 1
+    except OSError:
+        return 0
+
+
+class Retention:
+    """报告目录保留策略（及文档库清理）的后台线程：启动后立即执行一次，此后按间隔定期执行，不阻塞请求处理。"""
+
+    def __init__(self, interval: float = RETENTION_INTERVAL_SECONDS, root: str = OUTPUT_DIR):
+        self.interval = interval
+        self.root = root
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._loop, name="report-retention", daemon=True).start()
+
+    def _loop(self):
+        while True:
+            logs = []
+            try:
+                enforce(self.root, logs=logs)
+            except Exception as e:
+                logs.append(f"[Retention] FAIL error={type(e).__name__}: {e}")
+            try:
+                prune_docs(logs=logs)
+            except Exception as e:
+                logs.append(f"[Retention] DOCS_PRUNE_FAIL error={type(e).__name__}: {e}")
+            for line in logs:
+                print(line)
+            time.sleep(self.interval)
+
+
+retention = Retention()
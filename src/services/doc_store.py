@@ -0,0 +1,269 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from config import DOC_STORE_PATH
+from src.utils.channel import classify
+from src.utils.dedup import fingerprint
+
+_U64 = 1 << 64
+
+
+def _iso(dt) -> Optional[str]:
+    return dt.isoformat() if hasattr(dt, "isoformat") else dt
+
+
+def _from_iso(value: Optional[str]):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except Exception:
+        return None
+
+
+def _to_signed(fp: int) -> int:
+    # SQLite INTEGER 为有符号 64 位，无符号指纹需转换后存储
+    return fp - _U64 if fp >= 1 << 63 else fp
+
+
+def _to_unsigned(v: Optional[int]) -> Optional[int]:
+    return None if v is None else v % _U64
+
+
+def _fingerprint(doc: dict) -> int:
+    # 去重时的指纹按翻译前的原文计算；已翻译的文档入库的是译文，需按译文重新计算，与回填的旧数据一致
+    fp = doc.get("simhash")
+    if fp is None or doc.get("translated"):
+        return fingerprint(doc.get("text") or "")
+    return fp
+
+
+class DocStore:
+    """按品牌持久化已抓取文档与监控登记（SQLite）。
+    - docs：(brand, url) 为主键，同时记录检索命中的原始链接、渠道与 simhash 指纹；增量入库时已有 URL 直接跳过
+    - 索引：品牌+发布时间、品牌+渠道+发布时间；FTS5 全文索引（trigram 分词，支持中文子串检索）
+    - monitors：持续监控的品牌、时间窗、刷新间隔与最近一次运行/报告
+    """
+
+    def __init__(self, path: str = DOC_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " brand TEXT NOT NULL, url TEXT NOT NULL, source_url TEXT, text TEXT NOT NULL, language TEXT,"
+            " published TEXT, fetched_at REAL NOT NULL, channel TEXT, simhash INTEGER,"
+            " PRIMARY KEY (brand, url))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS monitors ("
+            " brand TEXT PRIMARY KEY, window_days INTEGER NOT NULL, interval_seconds INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, last_run REAL, last_report TEXT)"
+        )
+        self._migrate()
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_published ON docs(brand, published)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_channel ON docs(brand, channel, published)")
+        self.fts = self._init_fts()
+
+    def _migrate(self):
+        """旧版库（无 channel/simhash 列）补列并回填。"""
+        cols = {r["name"] for r in self._conn.execute("PRAGMA table_info(docs)")}
+        added = False
+        for name, typ in (("channel", "TEXT"), ("simhash", "INTEGER")):
+            if name not in cols:
+                self._conn.execute(f"ALTER TABLE docs ADD COLUMN {name} {typ}")
+                added = True
+        if not added:
+            return
+        rows = self._conn.execute("SELECT rowid, url, text FROM docs WHERE channel IS NULL OR simhash IS NULL").fetchall()
+        self._conn.execute("BEGIN")
+        self._conn.executemany(
+            "UPDATE docs SET channel=?, simhash=? WHERE rowid=?",
+            [(classify(r["url"]), _to_signed(fingerprint(r["text"] or "")), r["rowid"]) for r in rows],
+        )
+        self._conn.execute("COMMIT")
+
+    def _init_fts(self) -> bool:
+        # 外部内容表：正文只存一份，由触发器同步；SQLite 未编译 FTS5 时退化为 LIKE 检索
+        try:
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='docs_fts'"
+            ).fetchone()
+            if exists:
+                return True
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE docs_fts USING fts5(text, content='docs', content_rowid='rowid', tokenize='trigram')"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN"
+                " INSERT INTO docs_fts(rowid, text) VALUES (new.rowid, new.text); END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN"
+                " INSERT INTO docs_fts(docs_fts, rowid, text) VALUES ('delete', old.rowid, old.text); END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS docs_au AFTER UPDATE OF text ON docs BEGIN"
+                " INSERT INTO docs_fts(docs_fts, rowid, text) VALUES ('delete', old.rowid, old.text);"
+                " INSERT INTO docs_fts(rowid, text) VALUES (new.rowid, new.text); END"
+            )
+            self._conn.execute("INSERT INTO docs_fts(docs_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _brand(brand: str) -> str:
+        return brand.strip().lower()
+
+    # ---- 文档 ----
+    def known_urls(self, brand: str) -> set:
+        with self._lock:
+            rows = self._conn.execute("SELECT url, source_url FROM docs WHERE brand=?", (self._brand(brand),)).fetchall()
+        return {u for r in rows for u in r if u}
+
+    def add_docs(self, brand: str, docs: List[dict]) -> int:
+        """增量入库，返回新增条数（已存在的 URL 不覆盖）。"""
+        now = time.time()
+        rows = [
+            (self._brand(brand), d["url"], d.get("source_url"), d.get("text") or "", d.get("language"),
+             _iso(d.get("published")), now, d.get("channel") or classify(d["url"]), _to_signed(_fingerprint(d)))
+            for d in docs if d.get("url")
+        ]
+        count_sql = "SELECT COUNT(*) FROM docs WHERE brand=?"
+        with self._lock:
+            before = self._conn.execute(count_sql, (self._brand(brand),)).fetchone()[0]
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO docs"
+                " (brand, url, source_url, text, language, published, fetched_at, channel, simhash)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("COMMIT")
+            return self._conn.execute(count_sql, (self._brand(brand),)).fetchone()[0] - before
+
+    def prune(self, max_age_days: int, now: Optional[float] = None) -> int:
+        """删除入库超过 max_age_days 天的文档，返回删除条数；监控中的品牌按 max(保留天数, 时间窗) 计算。"""
+        now = now or time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                removed = self._conn.execute(
+                    "DELETE FROM docs WHERE fetched_at < ?"
+                    " AND brand NOT IN (SELECT brand FROM monitors WHERE window_days > ?)",
+                    (now - max_age_days * 86400, max_age_days),
+                ).rowcount
+                rows = self._conn.execute(
+                    "SELECT brand, window_days FROM monitors WHERE window_days > ?", (max_age_days,)
+                ).fetchall()
+                for r in rows:
+                    removed += self._conn.execute(
+                        "DELETE FROM docs WHERE brand=? AND fetched_at < ?",
+                        (r["brand"], now - r["window_days"] * 86400),
+                    ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def query(self, brand: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              channel: Optional[str] = None, match: Optional[str] = None,
+              limit: Optional[int] = None) -> List[dict]:
+        """按时间窗 / 渠道 / 全文检索取品牌文档。
+        有发布时间的按发布时间过滤，否则按入库时间；match 为全文子串（FTS5 trigram，少于 3 字时用 LIKE）。"""
+        sql = "SELECT d.url, d.text, d.language, d.published, d.channel, d.simhash FROM docs d"
+        where = ["d.brand=?"]
+        args = [self._brand(brand)]
+        if start is not None:
+            where.append("((d.published IS NOT NULL AND d.published >= ?) OR (d.published IS NULL AND d.fetched_at >= ?))")
+            args += [start.isoformat(), start.timestamp()]
+        if end is not None:
+            where.append("((d.published IS NOT NULL AND d.published < ?) OR (d.published IS NULL AND d.fetched_at < ?))")
+            args += [end.isoformat(), end.timestamp()]
+        if channel:
+            where.append("d.channel=?")
+            args.append(channel)
+        if match:
+            if self.fts and len(match) >= 3:
+                sql += " JOIN docs_fts f ON f.rowid = d.rowid"
+                where.append("docs_fts MATCH ?")
+                args.append('"' + match.replace('"', '""') + '"')
+            else:
+                where.append("d.text LIKE ?")
+                args.append(f"%{match}%")
+        sql += " WHERE " + " AND ".join(where) + " ORDER BY d.fetched_at"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [
+            {
+                "url": r["url"],
+                "text": r["text"],
+                "language": r["language"],
+                "published": _from_iso(r["published"]),
+                "channel": r["channel"],
+                "simhash": _to_unsigned(r["simhash"]),
+            }
+            for r in rows
+        ]
+
+    def docs(self, brand: str, since: Optional[datetime] = None) -> List[dict]:
+        """取品牌在时间窗内的文档（query 的简写）。"""
+        return self.query(brand, start=since)
+
+    # ---- 监控登记 ----
+    def register(self, brand: str, window_days: int, interval_seconds: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO monitors (brand, window_days, interval_seconds, created_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(brand) DO UPDATE SET window_days=excluded.window_days,"
+                " interval_seconds=excluded.interval_seconds",
+                (self._brand(brand), window_days, interval_seconds, time.time()),
+            )
+
+    def unregister(self, brand: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM monitors WHERE brand=?", (self._brand(brand),))
+        return cur.rowcount > 0
+
+    def monitor(self, brand: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM monitors WHERE brand=?", (self._brand(brand),)).fetchone()
+        return dict(row) if row else None
+
+    def monitors(self) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM monitors ORDER BY brand").fetchall()
+        return [dict(r) for r in rows]
+
+    def mark_run(self, brand: str, report_ts: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE monitors SET last_run=?, last_report=COALESCE(?, last_report) WHERE brand=?",
+                (time.time(), report_ts, self._brand(brand)),
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> DocStore:
+    """进程级文档库实例。"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DocStore()
+        return _store
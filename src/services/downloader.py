@@ -0,0 +1,132 @@
+import codecs
+import json
+import re
+
+from config import FETCH_TIMEOUT, CACHE_PAGE_TTL, FETCH_MAX_BYTES, FETCH_ALLOWED_TYPES
+from src.services import http_client
+from src.utils import metrics
+from src.utils.cache import get_cache
+
+_ALLOWED_TYPES = {t.strip().lower() for t in FETCH_ALLOWED_TYPES.split(",") if t.strip()}
+# 响应头未声明编码时，从页面开头的 <meta charset> / http-equiv 中识别
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+_SNIFF_BYTES = 2048
+# GBK / GB2312 页面中常混有超出其字符集的字符，统一按超集 gb18030 解码
+_CHARSET_ALIASES = {"gbk": "gb18030", "gb2312": "gb18030", "gb_2312-80": "gb18030", "x-gbk": "gb18030"}
+
+
+def _codec(name) -> str:
+    name = (name or "").strip().strip("'\"").lower()
+    name = _CHARSET_ALIASES.get(name, name)
+    try:
+        return codecs.lookup(name).name if name else "utf-8"
+    except LookupError:
+        return "utf-8"
+
+
+def _decoder(declared, head: bytes):
+    m = None if declared else _META_CHARSET_RE.search(head[:_SNIFF_BYTES])
+    name = declared or (m.group(1).decode("ascii") if m else None)
+    return codecs.getincrementaldecoder(_codec(name))("replace")
+
+
+def _read_text(r, limit: int):
+    """增量读取并解码响应体，最多读取 limit 字节（解压后）；返回 (文本, 读取字节数, 是否截断)。
+    编码优先取响应头，其次页面开头的 meta 声明，默认 UTF-8。"""
+    declared = r.charset_encoding
+    decoder = None
+    head = b""
+    parts = []
+    size = 0
+    truncated = False
+    for chunk in r.iter_bytes():
+        if size + len(chunk) > limit:
+            chunk = chunk[:limit - size]
+            truncated = True
+        size += len(chunk)
+        if decoder is None:
+            head += chunk
+            if len(head) < _SNIFF_BYTES and not truncated:
+                continue
+            decoder = _decoder(declared, head)
+            chunk, head = head, b""
+        parts.append(decoder.decode(chunk))
+        if truncated:
+            break
+    if decoder is None:
+        decoder = _decoder(declared, head)
+        parts.append(decoder.decode(head))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts), size, truncated
+
+
+def _reject_reason(r, limit: int):
+    """读取响应体前按响应头判断是否放弃：非文本类型或声明长度超过上限。"""
+    ctype = (r.headers.get("content-type") or "").split(";")[0].strip().lower()
+    if ctype and ctype not in _ALLOWED_TYPES:
+        return 415, f"type={ctype}"
+    try:
+        length = int(r.headers.get("content-length") or 0)
+    except ValueError:
+        length = 0
+    if length > limit:
+        return 413, f"length={length}"
+    return None, None
+
+
+def fetch_html(url: str, timeout: float = FETCH_TIMEOUT, headers=None, follow_redirects: bool = True,
+               max_bytes: int = FETCH_MAX_BYTES) -> dict:
+    """抓取页面 HTML，返回 {"status", "url"(最终落地地址), "text", "from_cache"}。
+    - 缓存未过期：直接返回缓存内容，不发请求
+    - 缓存已过期但有 ETag/Last-Modified：发条件 GET，304 时续期并复用缓存
+    - 流式下载：先看响应头，非 HTML/文本类型返回 415、声明长度超过上限返回 413，均不读取响应体；
+      否则增量读取并解码，最多 max_bytes 字节（超出截断，"truncated" 为 True，且不写入缓存）
+    网络异常原样抛出，由调用方记录 FETCH_FAIL。
+    """
+    cache = get_cache()
+    entry = cache.get("page", url, allow_stale=True) if cache else None
+    if entry and entry["fresh"]:
+        data = json.loads(entry["value"])
+        return {"status": 200, "url": data["url"], "text": data["text"], "from_cache": True}
+
+    req_headers = dict(headers or {})
+    if entry:
+        if entry.get("etag"):
+            req_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            req_headers["If-Modified-Since"] = entry["last_modified"]
+    with metrics.span("fetch_request"):
+        with http_client.stream("GET", url, timeout=timeout, follow_redirects=follow_redirects,
+                                headers=req_headers) as r:
+            status, final_url = r.status_code, str(r.url)
+            metrics.inc("fetch_requests_total", status=status)
+            reject, reason = _reject_reason(r, max_bytes) if status == 200 else (None, None)
+            if reject:
+                metrics.inc("fetch_aborted_total", reason=str(reject))
+                return {"status": reject, "url": final_url, "text": "", "from_cache": False, "reason": reason}
+            text, size, truncated = ("", 0, False) if status == 304 else _read_text(r, max_bytes)
+            etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    metrics.observe("fetch_response_bytes", size)
+    metrics.inc("fetch_bytes_total", size)
+    if truncated:
+        metrics.inc("fetch_truncated_total")
+    if status == 304 and entry:
+        cache.refresh("page", url, CACHE_PAGE_TTL)
+        data = json.loads(entry["value"])
+        return {"status": 200, "url": data["url"], "text": data["text"], "from_cache": True}
+
+    result = {"status": status, "url": final_url, "text": text, "from_cache": False, "truncated": truncated}
+    # 截断的页面不入缓存：否则带上服务器的 ETag 后，条件 GET 返回 304 会把不完整的内容一直续期
+    if status == 200 and cache and not truncated:
+        try:
+            cache.set(
+                "page",
+                url,
+                json.dumps({"url": result["url"], "text": result["text"]}, ensure_ascii=False),
+                CACHE_PAGE_TTL,
+                etag=etag,
+                last_modified=last_modified,
+            )
+        except Exception:
+            pass
+    return result
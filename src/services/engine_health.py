@@ -0,0 +1,139 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+from config import (
+    ENGINE_HEALTH_PATH,
+    ENGINE_HEALTH_ALPHA,
+    ENGINE_FAILURE_THRESHOLD,
+    ENGINE_OPEN_SECONDS,
+    ENGINE_OPEN_MAX_SECONDS,
+)
+from src.utils import metrics
+
+# 新引擎的先验：延迟 2 秒、成功率 0.5（保证未知引擎按配置顺序参与，不会被直接排到最前/最后）
+_PRIOR_LATENCY = 2.0
+_PRIOR_OK = 0.5
+# 半开状态下探测请求的最长占用时间，超时视为探测丢失（例如任务被取消），允许重新探测
+_PROBE_TIMEOUT = 60.0
+# 持久化节流间隔（秒）
+_SAVE_INTERVAL = 30.0
+
+
+class EngineHealth:
+    """检索引擎 / SearXNG 实例的健康度登记表。
+    - 记录每个引擎的延迟、成功率、空结果率（指数滑动平均）
+    - 连续失败达到阈值后熔断（open），冷却期内直接跳过；冷却结束进入半开，仅放行一个探测请求
+      探测成功则恢复，失败则冷却时间翻倍（有上限）
+    - rank() 按“期望耗时 = 延迟 / 成功率”重排回退链；状态定期写入 JSON，重启后沿用
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._dirty = False
+        self._saved_at = 0.0
+        self.load()
+
+    def _get(self, name: str) -> dict:
+        st = self._stats.get(name)
+        if st is None:
+            st = {"latency": _PRIOR_LATENCY, "ok": _PRIOR_OK, "empty": 0.0, "calls": 0,
+                  "failures": 0, "trips": 0, "opened_at": None, "probe_at": None}
+            self._stats[name] = st
+        return st
+
+    def allow(self, name: str) -> bool:
+        """是否允许向该引擎发起请求（熔断中返回 False；半开时仅放行一个探测）。"""
+        now = time.time()
+        with self._lock:
+            st = self._get(name)
+            if st["opened_at"] is None:
+                return True
+            cooldown = min(ENGINE_OPEN_MAX_SECONDS, ENGINE_OPEN_SECONDS * (2 ** max(0, st["trips"] - 1)))
+            if now - st["opened_at"] < cooldown:
+                allowed = False
+            elif st["probe_at"] is not None and now - st["probe_at"] < _PROBE_TIMEOUT:
+                allowed = False
+            else:
+                st["probe_at"] = now
+                allowed = True
+        if not allowed:
+            metrics.inc("search_engine_skipped_total", engine=name)
+        return allowed
+
+    def record(self, name: str, outcome: str, seconds: float):
+        """记录一次调用结果：outcome 为 ok / empty / error。"""
+        a = ENGINE_HEALTH_ALPHA
+        with self._lock:
+            st = self._get(name)
+            st["calls"] += 1
+            st["latency"] = (1 - a) * st["latency"] + a * seconds
+            st["ok"] = (1 - a) * st["ok"] + a * (1.0 if outcome == "ok" else 0.0)
+            st["empty"] = (1 - a) * st["empty"] + a * (1.0 if outcome == "empty" else 0.0)
+            if outcome == "error":
+                st["failures"] += 1
+                if st["opened_at"] is not None or st["failures"] >= ENGINE_FAILURE_THRESHOLD:
+                    # 首次熔断或半开探测失败：重新计时，冷却时间翻倍
+                    st["trips"] += 1
+                    st["opened_at"] = time.time()
+                    metrics.inc("search_engine_circuit_open_total", engine=name)
+                    print(f"[Search] CIRCUIT_OPEN engine={name} failures={st['failures']} trips={st['trips']}")
+            else:
+                # 空结果说明引擎可达，不计入熔断
+                if st["opened_at"] is not None:
+                    print(f"[Search] CIRCUIT_CLOSE engine={name}")
+                st["failures"] = 0
+                st["trips"] = 0
+                st["opened_at"] = None
+            st["probe_at"] = None
+            self._dirty = True
+            due = time.time() - self._saved_at >= _SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def score(self, name: str) -> float:
+        with self._lock:
+            st = self._get(name)
+            return st["latency"] / max(st["ok"], 0.05)
+
+    def rank(self, names):
+        """按期望耗时升序排列（稳定排序，分值相同保持原配置顺序）。"""
+        return sorted(names, key=self.score)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {k: dict(v) for k, v in self._stats.items()}
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        with self._lock:
+            for name, st in data.items():
+                self._get(name).update({k: v for k, v in st.items() if k != "probe_at"})
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {k: dict(v, probe_at=None) for k, v in self._stats.items()}
+            self._dirty = False
+            self._saved_at = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
+
+
+health = EngineHealth(ENGINE_HEALTH_PATH)
+atexit.register(health.save)
@@ -0,0 +1,109 @@
+import threading
+import weakref
+from contextlib import contextmanager
+
+import httpx
+
+from config import (
+    HTTP_HEADERS,
+    HTTP_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_ENABLE_HTTP2,
+    HTTP_PER_HOST_LIMIT,
+)
+from src.utils.fetch_pool import host_of
+
+# 进程级共享客户端：同一主机（baidu/zhihu/ark 等）复用已建立的 TCP/TLS 连接
+_lock = threading.Lock()
+_client = None
+# 单主机信号量：弱引用保存，没有请求持有时随之回收，不会随访问过的主机数无限增长
+_host_sems = weakref.WeakValueDictionary()
+# 替换底层传输（录制/回放基准使用）；None 为默认网络传输
+_transport = None
+
+
+def _http2_available() -> bool:
+    if not HTTP_ENABLE_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+def _client_kwargs() -> dict:
+    return {
+        "headers": HTTP_HEADERS,
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "http2": _http2_available(),
+        **({"transport": _transport} if _transport is not None else {}),
+    }
+
+
+def set_transport(transport=None):
+    """替换共享客户端的底层传输（如 httpx.MockTransport 回放录制的响应），传 None 恢复网络访问。
+    已创建的客户端会被关闭，下次使用时按新传输重建。"""
+    global _transport
+    close_clients()
+    with _lock:
+        _transport = transport
+
+
+def get_client() -> httpx.Client:
+    """返回进程级共享的同步客户端（线程安全，带连接池与 keep-alive）。"""
+    global _client
+    with _lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(**_client_kwargs())
+        return _client
+
+
+@contextmanager
+def host_slot(url: str):
+    """单主机并发上限：超过 HTTP_PER_HOST_LIMIT 的请求在此排队。"""
+    host = host_of(url)
+    with _lock:
+        sem = _host_sems.get(host)
+        if sem is None:
+            sem = threading.BoundedSemaphore(HTTP_PER_HOST_LIMIT)
+            _host_sems[host] = sem
+    with sem:
+        yield
+
+
+def request(method: str, url: str, **kwargs) -> httpx.Response:
+    with host_slot(url):
+        return get_client().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> httpx.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> httpx.Response:
+    return request("POST", url, **kwargs)
+
+
+@contextmanager
+def stream(method: str, url: str, **kwargs):
+    """流式请求：响应体按需读取（SSE / 大文件），同样受单主机并发上限约束。"""
+    with host_slot(url):
+        with get_client().stream(method, url, **kwargs) as r:
+            yield r
+
+
+def close_clients():
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -1,11 +1,201 @@
-import httpx
-from typing import List, Dict, Any, Optional
-from config import LLM_API_KEY, ARK_API_URL, ARK_MODEL_ID
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Callable
 
+from config import (
+    LLM_API_KEY,
+    ARK_API_URL,
+    ARK_MODEL_ID,
+    LLM_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_HEDGE_DELAY,
+    LLM_STREAM,
+    LLM_CACHE_TTL,
+    LLM_CONCURRENCY,
+    LLM_RATE_PER_MIN,
+    LLM_TOKENS_PER_MIN,
+)
+from src.services import http_client
+from src.utils import metrics
+from src.utils.cache import get_cache
+from src.utils.ratelimit import RateLimiter
 
-def chat(messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.2, max_tokens: int = 1024) -> Optional[str]:
-    """调用火山引擎 Ark Chat Completions，返回 assistant 文本。
+# 可重试的状态码：限流与服务端错误
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 进程级并发与速率控制：请求数/分钟 + 估算 token 数/分钟
+_slots = threading.BoundedSemaphore(max(1, LLM_CONCURRENCY))
+_req_limiter = RateLimiter(LLM_RATE_PER_MIN / 60.0, burst=max(1, LLM_CONCURRENCY))
+_token_limiter = RateLimiter(LLM_TOKENS_PER_MIN / 60.0, burst=LLM_TOKENS_PER_MIN)
+_hedge_pool = None
+_hedge_lock = threading.Lock()
+
+
+class _Retryable(Exception):
+    def __init__(self, reason: str, retry_after: Optional[float] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=max(2, LLM_CONCURRENCY * 2), thread_name_prefix="llm")
+        return _hedge_pool
+
+
+def _estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int]) -> int:
+    # 粗略估算：中文约 1 字 1 token，英文约 4 字符 1 token，取中间值；未指定输出上限时按 1024 计
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // 2 + (max_tokens or 1024)
+
+
+def _cache_key(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(
+        {k: payload.get(k) for k in ("model", "messages", "temperature", "max_tokens")},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _retry_after(resp) -> Optional[float]:
+    try:
+        return float(resp.headers.get("Retry-After"))
+    except Exception:
+        return None
+
+
+def _read_stream(resp, on_delta: Optional[Callable[[str], None]]) -> Optional[str]:
+    """逐行消费 SSE：拼接 choices[0].delta.content，遇到 [DONE] 结束；输出被截断时返回 None。"""
+    parts = []
+    finish = None
+    for line in resp.iter_lines():
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            chunk = json.loads(data)
+        except Exception:
+            continue
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        finish = choices[0].get("finish_reason") or finish
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            parts.append(delta)
+            if on_delta:
+                on_delta(delta)
+    if _truncated(finish):
+        return None
+    return "".join(parts) or None
+
+
+def _truncated(finish_reason: Optional[str]) -> bool:
+    # 达到 max_tokens 被截断的输出不完整（译文缺尾、JSON 不闭合），按失败处理
+    if finish_reason != "length":
+        return False
+    metrics.inc("llm_truncated_total")
+    print("[LLM] TRUNCATED finish_reason=length")
+    return True
+
+
+def _send(payload: Dict[str, Any], headers: Dict[str, str], on_delta) -> Optional[str]:
+    """发送一次请求；可重试错误抛出 _Retryable，不可重试错误返回 None。"""
+    with _slots:
+        with metrics.span("llm_request"):
+            try:
+                if payload["stream"]:
+                    with http_client.stream("POST", ARK_API_URL, json=payload, headers=headers,
+                                            timeout=LLM_TIMEOUT) as resp:
+                        metrics.inc("llm_requests_total", status=resp.status_code)
+                        if resp.status_code in _RETRY_STATUS:
+                            raise _Retryable(f"status={resp.status_code}", _retry_after(resp))
+                        if resp.status_code != 200:
+                            resp.read()
+                            return None
+                        return _read_stream(resp, on_delta)
+                resp = http_client.post(ARK_API_URL, json=payload, headers=headers, timeout=LLM_TIMEOUT)
+            except _Retryable:
+                raise
+            except Exception as e:
+                # 连接/读超时等网络错误同样重试
+                metrics.inc("llm_requests_total", status="error")
+                raise _Retryable(type(e).__name__)
+    metrics.inc("llm_requests_total", status=resp.status_code)
+    if resp.status_code in _RETRY_STATUS:
+        raise _Retryable(f"status={resp.status_code}", _retry_after(resp))
+    if resp.status_code != 200:
+        return None
+    choices = resp.json().get("choices", [])
+    if not choices:
+        return None
+    if _truncated(choices[0].get("finish_reason")):
+        return None
+    content = choices[0].get("message", {}).get("content")
+    if content and on_delta:
+        on_delta(content)
+    return content
+
+
+def _send_with_retry(payload, headers, on_delta) -> Optional[str]:
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return _send(payload, headers, on_delta)
+        except _Retryable as e:
+            if attempt >= LLM_MAX_RETRIES:
+                print(f"[LLM] GIVE_UP after {attempt + 1} attempts: {e.reason}")
+                return None
+            # 指数退避 + 抖动；服务端给出 Retry-After 时以其为准
+            delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)) * (0.5 + random.random())
+            if e.retry_after is not None:
+                delay = min(LLM_BACKOFF_MAX, e.retry_after)
+            metrics.inc("llm_retries_total", reason=e.reason)
+            time.sleep(delay)
+    return None
+
+
+def _send_hedged(payload, headers, on_delta) -> Optional[str]:
+    """对冲请求：首个请求超过 LLM_HEDGE_DELAY 未返回时再发一个，取先返回的有效结果。
+    流式回调只绑定首个请求，避免重复输出。"""
+    pool = _hedge_executor()
+    futures = [pool.submit(_send_with_retry, payload, headers, on_delta)]
+    done, _ = wait(futures, timeout=LLM_HEDGE_DELAY)
+    if not done:
+        metrics.inc("llm_hedged_total")
+        futures.append(pool.submit(_send_with_retry, payload, headers, None))
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            out = f.result()
+            if out:
+                for p in pending:
+                    p.cancel()
+                return out
+    return None
+
+
+def chat(messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.2,
+         max_tokens: Optional[int] = None, use_cache: bool = True,
+         on_delta: Optional[Callable[[str], None]] = None) -> Optional[str]:
+    """调用火山引擎 Ark Chat Completions，返回 assistant 文本（失败返回 None）。
     兼容 OpenAI 风格的请求结构。
+    - max_tokens 为 None 时不发送（使用模型默认上限）；输出因长度被截断（finish_reason=length）视为失败
+    - 相同 prompt（模型/消息/温度/max_tokens 的哈希）命中响应缓存时不再请求
+    - 429/5xx/网络错误按指数退避重试；可选对冲请求降低长尾延迟
+    - 默认流式读取，on_delta 可逐段接收输出
     """
     if not LLM_API_KEY:
         return None
@@ -14,21 +204,32 @@ def chat(messages: List[Dict[str, str]], model: Optional[str] = None, temperatur
             "model": model or ARK_MODEL_ID,
             "messages": messages,
             "temperature": temperature,
-            "stream": False,
+            "stream": LLM_STREAM,
         }
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        cache = get_cache() if use_cache else None
+        key = _cache_key(payload)
+        if cache:
+            entry = cache.get("llm", key)
+            if entry:
+                return entry["value"]
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {LLM_API_KEY}",
         }
-        with httpx.Client(timeout=20) as client:
-            resp = client.post(ARK_API_URL, json=payload, headers=headers)
-        if resp.status_code != 200:
-            return None
-        data = resp.json()
-        choices = data.get("choices", [])
-        if not choices:
-            return None
-        content = choices[0].get("message", {}).get("content")
+        _req_limiter.acquire()
+        _token_limiter.acquire(_estimate_tokens(messages, max_tokens))
+        if LLM_HEDGE_DELAY > 0:
+            content = _send_hedged(payload, headers, on_delta)
+        else:
+            content = _send_with_retry(payload, headers, on_delta)
+        if content and cache:
+            try:
+                cache.set("llm", key, content, LLM_CACHE_TTL)
+            except Exception:
+                pass
         return content
-    except Exception:
-        return None
\ No newline at end of file
+    except Exception as e:
+        print(f"[LLM] ERROR {type(e).__name__}: {e}")
+        return None
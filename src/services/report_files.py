@@ -0,0 +1,224 @@
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from config import OUTPUT_DIR, REPORT_COMPRESS_LEVEL, REPORT_INDEX_CACHE_SIZE
+
+try:
+    import brotli
+except ImportError:  # 可选依赖：未安装时只预压缩 gzip
+    brotli = None
+
+NAME_RE = re.compile(r"^report_(.+)\.(html|md|pdf)(?:\.(gz|br))?$")
+_TS_DATE_RE = re.compile(r"^(\d{4})(\d{2})(\d{2})")
+SUFFIX = {"gzip": ".gz", "br": ".br"}
+# 文本类报告写入时预压缩；PDF 本身已压缩，不再处理
+COMPRESSIBLE = ("html", "md")
+MIMETYPES = {
+    "html": "text/html; charset=utf-8",
+    "md": "text/markdown; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+
+def _etag(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _compress(data: bytes) -> dict:
+    out = {"gzip": gzip.compress(data, compresslevel=REPORT_COMPRESS_LEVEL, mtime=0)}
+    if brotli is not None:
+        try:
+            out["br"] = brotli.compress(data, quality=min(11, REPORT_COMPRESS_LEVEL + 2))
+        except Exception:
+            pass
+    return out
+
+
+def shard_for(ts: str, when: Optional[float] = None) -> str:
+    """报告所在的日期分片目录（YYYY/MM/DD）：优先取报告编号中的日期，否则按写入时间。"""
+    m = _TS_DATE_RE.match(ts)
+    if m and 1 <= int(m.group(2)) <= 12 and 1 <= int(m.group(3)) <= 31:
+        return "/".join(m.groups())
+    return time.strftime("%Y/%m/%d", time.localtime(when or time.time()))
+
+
+class ReportIndex:
+    """报告文件索引：(ts, fmt) -> 分片目录、强 ETag（内容哈希）、预压缩变体、占用字节数。
+    - 报告按日期分片存放在 root/YYYY/MM/DD 下，避免单目录文件过多
+    - 索引持久化在 root/reports.sqlite3（主键查询），热点条目另有内存 LRU；其他进程写入的报告同样可查
+    - 未登记时兜底检查一次旧版平铺路径 root/report_<ts>.<fmt>（迁移完成前仍可访问）
+    """
+
+    def __init__(self, root: str, cache_size: int = REPORT_INDEX_CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, "reports.sqlite3"), check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " ts TEXT NOT NULL, fmt TEXT NOT NULL, shard TEXT NOT NULL, etag TEXT, variants TEXT NOT NULL,"
+            " size INTEGER NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (ts, fmt))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_shard ON reports(shard)")
+
+    def _entry(self, ts: str, fmt: str, shard: str, etag: Optional[str], variants: str,
+               size: int, created_at: float) -> dict:
+        base = os.path.join(self.root, *shard.split("/")) if shard else self.root
+        path = os.path.join(base, f"report_{ts}.{fmt}")
+        return {
+            "ts": ts,
+            "fmt": fmt,
+            "shard": shard,
+            "path": path,
+            "etag": etag,
+            "variants": {enc: path + SUFFIX[enc] for enc in variants.split(",") if enc in SUFFIX},
+            "size": size,
+            "created_at": created_at,
+        }
+
+    def _remember(self, entry: dict):
+        key = (entry["ts"], entry["fmt"])
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.cache_size:
+            self._mem.popitem(last=False)
+
+    def path_for(self, ts: str, fmt: str) -> str:
+        return os.path.join(self.root, *shard_for(ts).split("/"), f"report_{ts}.{fmt}")
+
+    def write(self, ts: str, fmt: str, data: bytes) -> dict:
+        """写入报告文件（先写临时文件再改名），文本类同时写入 gzip/brotli 预压缩版本，并登记索引。"""
+        path = self.path_for(ts, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        variants = {}
+        if fmt in COMPRESSIBLE:
+            for enc, blob in _compress(data).items():
+                _write_atomic(path + SUFFIX[enc], blob)
+                variants[enc] = path + SUFFIX[enc]
+        _write_atomic(path, data)
+        return self.add(path, data, list(variants))
+
+    def add(self, path: str, data: Optional[bytes] = None, variants: Optional[List[str]] = None,
+            created_at: Optional[float] = None) -> Optional[dict]:
+        """登记 root 下已写好的报告文件（如后台生成的 PDF、迁移的旧报告）；data 为文件内容时直接计算 ETag。
+        variants 为空时按磁盘上的 .gz/.br 文件判断。"""
+        m = NAME_RE.match(os.path.basename(path))
+        if not m or m.group(3):
+            return None
+        ts, fmt = m.group(1), m.group(2)
+        shard = os.path.relpath(os.path.dirname(path), self.root).replace(os.sep, "/")
+        shard = "" if shard == "." else shard
+        if variants is None:
+            variants = [enc for enc, suf in SUFFIX.items() if os.path.exists(path + suf)]
+        try:
+            size = os.path.getsize(path) + sum(os.path.getsize(path + SUFFIX[enc]) for enc in variants)
+        except OSError:
+            return None
+        entry = self._entry(ts, fmt, shard, _etag(data) if data is not None else None, ",".join(variants),
+                            size, created_at or time.time())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reports (ts, fmt, shard, etag, variants, size, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ts, fmt, shard, entry["etag"], ",".join(variants), size, entry["created_at"]),
+            )
+            self._remember(entry)
+        return entry
+
+    def _lookup(self, ts: str, fmt: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._mem.get((ts, fmt))
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT shard, etag, variants, size, created_at FROM reports WHERE ts=? AND fmt=?", (ts, fmt)
+                ).fetchone()
+                if row is not None:
+                    entry = self._entry(ts, fmt, *tuple(row))
+                    self._remember(entry)
+        if entry is not None:
+            return entry
+        # 旧版平铺存放、尚未迁移的报告：检查一次文件，存在则补登记（不存在不缓存，任务完成后可再次查到）
+        legacy = os.path.join(self.root, f"report_{ts}.{fmt}")
+        try:
+            mtime = os.path.getmtime(legacy)
+        except OSError:
+            return None
+        return self.add(legacy, created_at=mtime)
+
+    def get(self, ts: str, fmt: str) -> Optional[dict]:
+        entry = self._lookup(ts, fmt)
+        if entry is not None and entry["etag"] is None:
+            # 迁移/补登记的条目：首次访问时按内容计算 ETag 并持久化
+            try:
+                with open(entry["path"], "rb") as f:
+                    entry["etag"] = _etag(f.read())
+            except OSError:
+                return None
+            with self._lock:
+                self._conn.execute("UPDATE reports SET etag=? WHERE ts=? AND fmt=?", (entry["etag"], ts, fmt))
+        return entry
+
+    def exists(self, ts: str, fmt: str = "html") -> bool:
+        return self._lookup(ts, fmt) is not None
+
+    # ---- 供保留策略使用 ----
+    def shards(self) -> List[dict]:
+        """各分片的占用字节数与最近写入时间，按分片（日期）升序。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT shard, SUM(size) AS size, MAX(created_at) AS last_write, COUNT(*) AS files"
+                " FROM reports GROUP BY shard ORDER BY shard"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+
+    def shard_entries(self, shard: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, fmt, shard, etag, variants, size, created_at FROM reports WHERE shard=?", (shard,)
+            ).fetchall()
+        return [self._entry(*tuple(r)) for r in rows]
+
+    def drop_shard(self, shard: str) -> int:
+        """删除分片的全部索引条目（文件由调用方处理），返回条目数。"""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM reports WHERE shard=?", (shard,))
+            for key in [k for k, v in self._mem.items() if v["shard"] == shard]:
+                del self._mem[key]
+        return cur.rowcount
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(root: str = OUTPUT_DIR) -> ReportIndex:
+    """按目录共享的报告索引实例。"""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        if root not in _indexes:
+            _indexes[root] = ReportIndex(root)
+        return _indexes[root]
@@ -0,0 +1,100 @@
+import time
+from typing import Optional
+from urllib.parse import urljoin
+
+from config import (
+    FETCH_TIMEOUT, REDIRECT_CACHE_TTL, REDIRECT_MAX_HOPS, REDIRECT_PEEK_BYTES,
+    REDIRECT_CONCURRENCY,
+)
+from src.services import http_client
+from src.utils import metrics
+from src.utils.cache import get_cache
+from src.utils.fetch_pool import FetchPool
+from src.utils.html_extract import find_meta_refresh
+from src.utils.urls import canonicalize, is_redirector, known_landing, remember_landing
+
+
+def _peek(r) -> str:
+    """读取中转页开头（最多 REDIRECT_PEEK_BYTES 字节），用于识别 meta refresh。"""
+    buf = b""
+    for chunk in r.iter_bytes():
+        buf += chunk
+        if len(buf) >= REDIRECT_PEEK_BYTES:
+            break
+    return buf[:REDIRECT_PEEK_BYTES].decode(r.encoding or "utf-8", errors="replace")
+
+
+def _follow(url: str, timeout: float) -> Optional[str]:
+    """逐跳跟随跳转链接：只读响应头，遇到 3xx 取 Location；中转页（200）只读开头找 meta refresh。
+    一旦下一跳不再是跳转链接即返回，不请求落地页本身。"""
+    for _ in range(max(1, REDIRECT_MAX_HOPS)):
+        with http_client.stream("GET", url, timeout=timeout, follow_redirects=False) as r:
+            metrics.inc("redirect_requests_total", status=r.status_code)
+            if r.is_redirect:
+                nxt = r.headers.get("location")
+            elif r.status_code == 200:
+                nxt = find_meta_refresh(_peek(r))
+            else:
+                return None
+        if not nxt:
+            return None
+        url = urljoin(url, nxt.strip())
+        if not is_redirector(url):
+            return url
+    return None
+
+
+def resolve(url: str, timeout: float = FETCH_TIMEOUT) -> Optional[str]:
+    """返回跳转链接的落地地址（规范化后），无法解析时返回 None；非跳转链接原样规范化返回。
+    依次查进程内记忆、内容缓存（kind=redirect），都未命中才发请求。"""
+    key = canonicalize(url)
+    if not key or not is_redirector(key):
+        return key or None
+    landing = known_landing(key)
+    if landing:
+        metrics.inc("redirect_resolve_total", result="memory")
+        return landing
+    cache = get_cache()
+    entry = cache.get("redirect", key) if cache else None
+    if entry:
+        metrics.inc("redirect_resolve_total", result="cache")
+        remember_landing(key, entry["value"])
+        return entry["value"]
+    try:
+        with metrics.span("redirect_resolve"):
+            target = _follow(key, timeout)
+    except Exception:
+        target = None
+    if not target:
+        metrics.inc("redirect_resolve_total", result="fail")
+        return None
+    metrics.inc("redirect_resolve_total", result="network")
+    landing = canonicalize(target)
+    remember_landing(key, landing)
+    if cache:
+        try:
+            cache.set("redirect", key, landing, REDIRECT_CACHE_TTL)
+        except Exception:
+            pass
+    return landing
+
+
+def resolve_many(urls, logs=None, deadline: Optional[float] = None) -> dict:
+    """并发解析一批跳转链接，返回 {规范化跳转链接: 落地地址}；解析失败的不在结果中（由抓取阶段按原链接处理）。"""
+    keys = list(dict.fromkeys(k for k in (canonicalize(u) for u in urls if u) if is_redirector(k)))
+    if not keys:
+        return {}
+    t0 = time.time()
+    # 只读响应头的请求很轻，单主机并发交给 http_client 的 HTTP_PER_HOST_LIMIT 约束
+    n = min(REDIRECT_CONCURRENCY, len(keys))
+    pool = FetchPool(resolve, concurrency=n, per_host=n, deadline=deadline)
+    for k in keys:
+        pool.submit(k)
+    pool.close()
+    resolved = {k: v for k, v in pool.join() if v}
+    msg = (f"[Resolver] RESOLVE links={len(keys)} resolved={len(resolved)} "
+           f"elapsed_ms={int((time.time() - t0) * 1000)}")
+    print(msg)
+    if isinstance(logs, list):
+        logs.append(msg)
+    return resolved
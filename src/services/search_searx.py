@@ -1,27 +1,52 @@
-import httpx
+import json
+import threading
+import time
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
 from urllib.parse import urljoin, urlparse
 
+from config import SEARCH_CONCURRENCY, SEARCH_HEDGE_DELAY, SEARCH_TIMEOUT, HTTP_HEADERS, CACHE_SEARCH_TTL
+from src.services import http_client
+from src.services.engine_health import health
+from src.utils import metrics
+from src.utils.fetch_pool import host_of
+from src.utils.cache import get_cache
 
-def searx_search(query: str, instances, max_results: int = 20):
-    """调用 SearXNG 公共实例进行搜索，返回结果列表；若全部失败则回退到 DuckDuckGo。
-    - 增加 User-Agent 与 Accept-Language，提高命中率与兼容性
-    - 失败时尝试简易 DuckDuckGo HTML 抓取作为兜底
-    """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Safari/537.36",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-    }
+# 引擎竞速使用的共享线程池（按需创建）
+_ENGINE_POOL = None
+_ENGINE_POOL_LOCK = threading.Lock()
+
+
+class EngineError(Exception):
+    """引擎请求失败（网络异常 / 非 200 状态），计入健康度并可能触发熔断；空结果不属于此类。"""
+
+
+def _get_ok(url: str, params: dict, headers):
+    r = http_client.get(url, params=params, headers=headers, timeout=SEARCH_TIMEOUT)
+    if r.status_code != 200:
+        raise EngineError(f"status={r.status_code}")
+    return r
+
+
+def _searx_instances_search(query: str, instances, max_results: int, headers):
+    """依次尝试 SearXNG 实例：按健康度排序并跳过熔断中的实例。
+    所有可用实例都失败（或全部熔断）时抛出 EngineError。"""
     params = {
         "q": query,
         "format": "json",
         "language": "zh-CN",
     }
-    for base in instances:
+    names = {f"searx:{host_of(base)}": base for base in instances}
+    ordered = [n for n in health.rank(list(names)) if health.allow(n)]
+    if not ordered:
+        raise EngineError("all instances unavailable")
+    errors = 0
+    for name in ordered:
+        base = names[name]
+        start = time.perf_counter()
         try:
-            r = httpx.get(base, params=params, headers=headers, timeout=15)
-            if r.status_code != 200:
-                continue
+            r = _get_ok(base, params, headers)
             data = r.json()
             results = []
             for item in data.get("results", [])[:max_results]:
@@ -31,226 +56,309 @@ def searx_search(query: str, instances, max_results: int = 20):
                     "content": item.get("content"),
                     "engine": item.get("engine") or "searx",
                 })
-            if results:
-                return results
         except Exception:
+            errors += 1
+            health.record(name, "error", time.perf_counter() - start)
             continue
-    # Fallback: DuckDuckGo HTML 简易抓取
-    try:
-        ddg_url = "https://duckduckgo.com/html/"
-        r = httpx.get(ddg_url, params={"q": query}, headers=headers, timeout=15)
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, "html.parser")
-            links = []
-            for a in soup.select(".result__a"):
-                href = a.get("href")
-                if not href:
-                    continue
-                links.append({
-                    "title": a.get_text(strip=True),
-                    "url": href,
-                    "content": None,
-                    "engine": "duckduckgo_fallback",
-                })
-                if len(links) >= max_results:
-                    break
-            return links
-    except Exception:
-        pass
+        health.record(name, "ok" if results else "empty", time.perf_counter() - start)
+        if results:
+            return results
+    if errors == len(ordered):
+        raise EngineError("all instances failed")
     return []
 
 
+def searx_search(query: str, instances, max_results: int = 20):
+    """调用 SearXNG 公共实例进行搜索，返回结果列表；若全部失败则回退到 DuckDuckGo。
+    - 增加 User-Agent 与 Accept-Language，提高命中率与兼容性
+    - 失败时尝试简易 DuckDuckGo HTML 抓取作为兜底
+    """
+    headers = dict(HTTP_HEADERS)
+    res = []
+    if health.allow("searx"):
+        res = _timed_engine("searx", lambda q, n, h: _searx_instances_search(q, instances, n, h),
+                            query, max_results, headers)
+    if res:
+        return res
+    # Fallback: DuckDuckGo HTML 简易抓取
+    links = _timed_engine("duckduckgo", _ddg_html_search, query, max_results, headers) if health.allow("duckduckgo") else []
+    for it in links:
+        it["engine"] = "duckduckgo_fallback"
+    return links
+
+
 def _ddg_html_search(query: str, max_results: int, headers):
     links = []
-    try:
-        ddg_url = "https://duckduckgo.com/html/"
-        r = httpx.get(ddg_url, params={"q": query}, headers=headers, timeout=15)
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, "html.parser")
-            for a in soup.select(".result__a"):
-                href = a.get("href")
-                if not href:
-                    continue
-                links.append({
-                    "title": a.get_text(strip=True),
-                    "url": href,
-                    "content": None,
-                    "engine": "duckduckgo",
-                })
-                if len(links) >= max_results:
-                    break
-    except Exception:
-        pass
+    ddg_url = "https://duckduckgo.com/html/"
+    r = http_client.get(ddg_url, params={"q": query}, headers=headers, timeout=SEARCH_TIMEOUT)
+    if r.status_code != 200:
+        raise EngineError(f"status={r.status_code}")
+    soup = BeautifulSoup(r.text, "html.parser")
+    for a in soup.select(".result__a"):
+        href = a.get("href")
+        if not href:
+            continue
+        links.append({
+            "title": a.get_text(strip=True),
+            "url": href,
+            "content": None,
+            "engine": "duckduckgo",
+        })
+        if len(links) >= max_results:
+            break
     return links
 
 
 def _bing_html_search(query: str, max_results: int, headers):
     links = []
-    try:
-        url = "https://www.bing.com/search"
-        r = httpx.get(url, params={"q": query}, headers=headers, timeout=15)
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, "html.parser")
-            for a in soup.select("li.b_algo h2 a"):
-                href = a.get("href")
-                if not href:
-                    continue
-                # 规范化链接
-                href = href.strip().strip("'\"`")
-                if href.startswith("//"):
-                    href = "https:" + href
-                elif not urlparse(href).scheme:
-                    href = urljoin("https://www.bing.com/", href)
-                title = a.get_text(strip=True)
-                links.append({"title": title, "url": href, "content": None, "engine": "bing"})
-                if len(links) >= max_results:
-                    break
-    except Exception:
-        pass
+    url = "https://www.bing.com/search"
+    r = http_client.get(url, params={"q": query}, headers=headers, timeout=SEARCH_TIMEOUT)
+    if r.status_code != 200:
+        raise EngineError(f"status={r.status_code}")
+    soup = BeautifulSoup(r.text, "html.parser")
+    for a in soup.select("li.b_algo h2 a"):
+        href = a.get("href")
+        if not href:
+            continue
+        # 规范化链接
+        href = href.strip().strip("'\"`")
+        if href.startswith("//"):
+            href = "https:" + href
+        elif not urlparse(href).scheme:
+            href = urljoin("https://www.bing.com/", href)
+        title = a.get_text(strip=True)
+        links.append({"title": title, "url": href, "content": None, "engine": "bing"})
+        if len(links) >= max_results:
+            break
     return links
 
 
 def _baidu_html_search(query: str, max_results: int, headers):
     links = []
-    try:
-        url = "https://www.baidu.com/s"
-        r = httpx.get(url, params={"wd": query}, headers=headers, timeout=15)
-        print(f"[Search] Baidu status={r.status_code} q='{query}'")
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, "html.parser")
-            # 选择通用结果卡片标题链接
-            for a in soup.select("h3 a, .result h3 a, .c-container h3 a"):
-                href = a.get("href")
-                if not href:
-                    continue
-                href = href.strip().strip("'\"`")
-                if href.startswith("//"):
-                    href = "https:" + href
-                elif not urlparse(href).scheme:
-                    href = urljoin("https://www.baidu.com/", href)
-                title = a.get_text(strip=True)
-                links.append({"title": title, "url": href, "content": None, "engine": "baidu"})
-                if len(links) >= max_results:
-                    break
-    except Exception:
-        pass
+    url = "https://www.baidu.com/s"
+    r = http_client.get(url, params={"wd": query}, headers=headers, timeout=SEARCH_TIMEOUT)
+    print(f"[Search] Baidu status={r.status_code} q='{query}'")
+    if r.status_code != 200:
+        raise EngineError(f"status={r.status_code}")
+    soup = BeautifulSoup(r.text, "html.parser")
+    # 选择通用结果卡片标题链接
+    for a in soup.select("h3 a, .result h3 a, .c-container h3 a"):
+        href = a.get("href")
+        if not href:
+            continue
+        href = href.strip().strip("'\"`")
+        if href.startswith("//"):
+            href = "https:" + href
+        elif not urlparse(href).scheme:
+            href = urljoin("https://www.baidu.com/", href)
+        title = a.get_text(strip=True)
+        links.append({"title": title, "url": href, "content": None, "engine": "baidu"})
+        if len(links) >= max_results:
+            break
     return links
 
 
 def web_search_combined(query: str, instances, max_results: int = 20):
-    """组合搜索：优先 SearXNG，失败则依次回退到 DuckDuckGo / Bing / Baidu。"""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Safari/537.36",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-    }
-    # 1) SearXNG JSON
-    res = searx_search(query, instances=instances, max_results=max_results)
-    if res:
-        return res
-    # 2) DuckDuckGo
-    res = _ddg_html_search(query, max_results=max_results, headers=headers)
-    if res:
-        return res
-    # 3) Bing
-    res = _bing_html_search(query, max_results=max_results, headers=headers)
-    if res:
-        return res
-    # 4) Baidu
-    res = _baidu_html_search(query, max_results=max_results, headers=headers)
-    return res
+    """组合搜索：优先 SearXNG，失败则依次回退到 DuckDuckGo / Bing / Baidu（按对冲方式并发竞速）。"""
+    chain = [
+        ("searx", lambda q, n, h: _searx_instances_search(q, instances, n, h)),
+        ("duckduckgo", _ddg_html_search),
+        ("bing", _bing_html_search),
+        ("baidu", _baidu_html_search),
+    ]
+    return _cached_search("combined", query, max_results, lambda: _race_engines(query, chain, max_results))
 
 
 def _sogou_html_search(query: str, max_results: int, headers):
     links = []
-    try:
-        url = "https://www.sogou.com/web"
-        r = httpx.get(url, params={"query": query}, headers=headers, timeout=15)
-        print(f"[Search] Sogou status={r.status_code} q='{query}'")
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, "html.parser")
-            for a in soup.select(".vrTitle a, h3 a"):
-                href = a.get("href")
-                if not href:
-                    continue
-                href = href.strip().strip("'\"`")
-                # 规范化为绝对链接，避免 '/link?url=...' 导致 UnsupportedProtocol
-                if href.startswith("//"):
-                    href = "https:" + href
-                elif not urlparse(href).scheme:
-                    href = urljoin("https://www.sogou.com/", href)
-                title = a.get_text(strip=True)
-                links.append({"title": title, "url": href, "content": None, "engine": "sogou"})
-                if len(links) >= max_results:
-                    break
-    except Exception:
-        pass
+    url = "https://www.sogou.com/web"
+    r = http_client.get(url, params={"query": query}, headers=headers, timeout=SEARCH_TIMEOUT)
+    print(f"[Search] Sogou status={r.status_code} q='{query}'")
+    if r.status_code != 200:
+        raise EngineError(f"status={r.status_code}")
+    soup = BeautifulSoup(r.text, "html.parser")
+    for a in soup.select(".vrTitle a, h3 a"):
+        href = a.get("href")
+        if not href:
+            continue
+        href = href.strip().strip("'\"`")
+        # 规范化为绝对链接，避免 '/link?url=...' 导致 UnsupportedProtocol
+        if href.startswith("//"):
+            href = "https:" + href
+        elif not urlparse(href).scheme:
+            href = urljoin("https://www.sogou.com/", href)
+        title = a.get_text(strip=True)
+        links.append({"title": title, "url": href, "content": None, "engine": "sogou"})
+        if len(links) >= max_results:
+            break
     return links
 
 
 def _so_html_search(query: str, max_results: int, headers):
     links = []
-    try:
-        url = "https://www.so.com/s"
-        r = httpx.get(url, params={"q": query}, headers=headers, timeout=15)
-        print(f"[Search] 360so status={r.status_code} q='{query}'")
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, "html.parser")
-            for a in soup.select("h3 a, .res-list h3 a"):
-                href = a.get("href")
-                if not href:
-                    continue
-                href = href.strip().strip("'\"`")
-                if href.startswith("//"):
-                    href = "https:" + href
-                elif not urlparse(href).scheme:
-                    href = urljoin("https://www.so.com/", href)
-                title = a.get_text(strip=True)
-                links.append({"title": title, "url": href, "content": None, "engine": "360so"})
-                if len(links) >= max_results:
-                    break
-    except Exception:
-        pass
+    url = "https://www.so.com/s"
+    r = http_client.get(url, params={"q": query}, headers=headers, timeout=SEARCH_TIMEOUT)
+    print(f"[Search] 360so status={r.status_code} q='{query}'")
+    if r.status_code != 200:
+        raise EngineError(f"status={r.status_code}")
+    soup = BeautifulSoup(r.text, "html.parser")
+    for a in soup.select("h3 a, .res-list h3 a"):
+        href = a.get("href")
+        if not href:
+            continue
+        href = href.strip().strip("'\"`")
+        if href.startswith("//"):
+            href = "https:" + href
+        elif not urlparse(href).scheme:
+            href = urljoin("https://www.so.com/", href)
+        title = a.get_text(strip=True)
+        links.append({"title": title, "url": href, "content": None, "engine": "360so"})
+        if len(links) >= max_results:
+            break
     return links
 
 
 def web_search_cn_first(query: str, max_results: int = 20):
-    """国内站点优先的搜索链路。
+    """国内站点优先的搜索链路（按对冲方式并发竞速，取第一个非空结果）。
     - 普通查询：Baidu -> Sogou -> 360so -> Bing -> DuckDuckGo
     - 含 site: 的查询：优先 Bing（对站点过滤更稳定）-> Baidu -> Sogou -> 360so -> DuckDuckGo
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Safari/537.36",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-    }
     if "site:" in query:
         # 站点过滤场景：先 Bing，再国内引擎
-        res = _bing_html_search(query, max_results=max_results, headers=headers)
-        if res:
-            return res
-        res = _baidu_html_search(query, max_results=max_results, headers=headers)
-        if res:
-            return res
-        res = _sogou_html_search(query, max_results=max_results, headers=headers)
-        if res:
-            return res
-        res = _so_html_search(query, max_results=max_results, headers=headers)
-        if res:
-            return res
-        res = _ddg_html_search(query, max_results=max_results, headers=headers)
-        return res
+        chain = [
+            ("bing", _bing_html_search),
+            ("baidu", _baidu_html_search),
+            ("sogou", _sogou_html_search),
+            ("360so", _so_html_search),
+            ("duckduckgo", _ddg_html_search),
+        ]
     else:
         # 普通查询：国内优先
-        res = _baidu_html_search(query, max_results=max_results, headers=headers)
-        if res:
-            return res
-        res = _sogou_html_search(query, max_results=max_results, headers=headers)
-        if res:
-            return res
-        res = _so_html_search(query, max_results=max_results, headers=headers)
-        if res:
-            return res
-        res = _bing_html_search(query, max_results=max_results, headers=headers)
-        if res:
-            return res
-        res = _ddg_html_search(query, max_results=max_results, headers=headers)
-        return res
\ No newline at end of file
+        chain = [
+            ("baidu", _baidu_html_search),
+            ("sogou", _sogou_html_search),
+            ("360so", _so_html_search),
+            ("bing", _bing_html_search),
+            ("duckduckgo", _ddg_html_search),
+        ]
+    return _cached_search("cn_first", query, max_results, lambda: _race_engines(query, chain, max_results))
+
+
+def _cached_search(chain_key: str, query: str, max_results: int, search):
+    """检索结果缓存：按 链路 + 结果数 + 规范化查询（小写、合并空白）为键，仅缓存非空结果。"""
+    cache = get_cache()
+    key = f"{chain_key}:{max_results}:{' '.join(query.lower().split())}"
+    if cache:
+        try:
+            entry = cache.get("search", key)
+            if entry:
+                return json.loads(entry["value"])
+        except Exception:
+            pass
+    res = search()
+    if res and cache:
+        try:
+            cache.set("search", key, json.dumps(res, ensure_ascii=False), CACHE_SEARCH_TTL)
+        except Exception:
+            pass
+    return res
+
+
+def _engine_pool() -> ThreadPoolExecutor:
+    global _ENGINE_POOL
+    with _ENGINE_POOL_LOCK:
+        if _ENGINE_POOL is None:
+            _ENGINE_POOL = ThreadPoolExecutor(max_workers=SEARCH_CONCURRENCY * 5, thread_name_prefix="search-engine")
+        return _ENGINE_POOL
+
+
+def _race_engines(query: str, chain, max_results: int):
+    """按回退顺序（按健康度动态调整）对冲竞速：先发起首选引擎，每隔 SEARCH_HEDGE_DELAY 秒（或上一个返回空/失败时立即）
+    追加下一个引擎；第一个非空结果胜出，尚未开始的请求被取消，进行中的请求结果直接丢弃。
+    SEARCH_HEDGE_DELAY=0 时所有引擎同时发起。"""
+    headers = dict(HTTP_HEADERS)
+    pool = _engine_pool()
+    # 按观测到的成功率与延迟重排回退链
+    fns = dict(chain)
+    remaining = [(name, fns[name]) for name in health.rank(list(fns))]
+    in_flight = {}
+
+    def launch() -> bool:
+        # 发起下一个可用引擎；熔断检查放在真正发起时，半开引擎的探测名额只由实际发出的请求占用
+        while remaining:
+            name, fn = remaining.pop(0)
+            if health.allow(name):
+                in_flight[pool.submit(_timed_engine, name, fn, query, max_results, headers)] = name
+                return True
+        return False
+
+    if not launch():
+        return []
+    while SEARCH_HEDGE_DELAY <= 0 and launch():
+        pass
+    try:
+        while in_flight:
+            timeout = SEARCH_HEDGE_DELAY if remaining else None
+            done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # 对冲：首选引擎迟迟未返回，追加下一个引擎
+                launch()
+                continue
+            for fut in done:
+                in_flight.pop(fut, None)
+                try:
+                    res = fut.result()
+                except Exception:
+                    res = []
+                if res:
+                    return res
+            # 已返回的引擎均为空/失败：立即启用下一个
+            if remaining:
+                launch()
+        return []
+    finally:
+        for fut in in_flight:
+            fut.cancel()
+
+
+def _timed_engine(name: str, fn, query: str, max_results: int, headers):
+    """执行单个引擎并记录耗时与结果（ok/empty/error），计入健康度登记表用于熔断与排序；
+    引擎异常视为失败并返回空列表。"""
+    start = time.perf_counter()
+    outcome = "error"
+    res = []
+    try:
+        res = fn(query, max_results, headers)
+        outcome = "ok" if res else "empty"
+    except Exception as e:
+        print(f"[Search] ENGINE_FAIL {name} {type(e).__name__}: {e}")
+    finally:
+        elapsed = time.perf_counter() - start
+        health.record(name, outcome, elapsed)
+        metrics.observe("search_engine_seconds", elapsed, engine=name)
+        metrics.inc("search_engine_requests_total", engine=name, outcome=outcome)
+    return res
+
+
+def dispatch_searches(queries, search_fn, concurrency: int = SEARCH_CONCURRENCY, deadline: Optional[float] = None):
+    """并发执行多个查询，按完成顺序逐个产出 (query, hits)。
+    - search_fn(query) -> hits，通常为 web_search_cn_first / web_search_combined 的包装
+    - 到达 deadline 后停止产出，未开始的查询被取消
+    """
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="search")
+    futures = {pool.submit(search_fn, q): q for q in queries}
+    try:
+        pending = set(futures)
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for fut in done:
+                try:
+                    hits = fut.result()
+                except Exception:
+                    hits = []
+                yield futures[fut], hits or []
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Optional
+
+from config import (
+    LLM_PROVIDER,
+    LLM_API_KEY,
+    LLM_MAX_OUTPUT_TOKENS,
+    TRANSLATE_BATCH_SIZE,
+    TRANSLATE_BATCH_CHARS,
+    TRANSLATE_MAX_CHARS,
+    TRANSLATE_CONCURRENCY,
+    TRANSLATE_CACHE_TTL,
+)
+from src.utils.cache import get_cache
+
+_SYSTEM_PROMPT = (
+    "你是一位精准的专业翻译。请将用户提供的文本完整、忠实地翻译为简体中文，"
+    "保持原意与风格，不要添加解释或额外信息，仅输出翻译后的中文内容。"
+)
+_BATCH_PROMPT = (
+    "你是一位精准的专业翻译。用户会提供一个 JSON 字符串数组，请把每一项完整、忠实地翻译为简体中文，"
+    "保持原意与风格，不要添加解释。严格输出等长的 JSON 字符串数组，顺序与输入一致，不要输出其他内容。"
+)
+
+def _enabled() -> bool:
+    return bool(LLM_API_KEY) and LLM_PROVIDER == "ark"
+
+
+def _key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def needs_translation(lang: Optional[str]) -> bool:
+    return lang not in ("zh-cn", "zh", "zh-tw", "unknown", None)
+
+
+def _max_tokens(chars: int) -> int:
+    # 译为中文的输出约不超过 1 字符 1 token，另留 JSON 引号/转义与提示余量
+    return min(LLM_MAX_OUTPUT_TOKENS, chars + 256)
+
+
+def _translate_batch(texts: List[str]) -> List[Optional[str]]:
+    """一次 LLM 请求翻译多段文本；返回与输入等长的列表，失败项为 None。
+    限速与重试由 LLM 客户端统一处理；译文按单篇缓存，不再重复写 LLM 响应缓存。
+    max_tokens 按输入长度估算；输出被截断时 chat 返回 None，整批按失败处理（保留原文）。"""
+    from src.services.llm_ark import chat
+
+    if len(texts) == 1:
+        out = chat([
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": texts[0]},
+        ], max_tokens=_max_tokens(len(texts[0])), use_cache=False)
+        return [out or None]
+    payload = json.dumps(texts, ensure_ascii=False)
+    out = chat([
+        {"role": "system", "content": _BATCH_PROMPT},
+        {"role": "user", "content": payload},
+    ], max_tokens=_max_tokens(len(payload)), use_cache=False)
+    try:
+        data = json.loads(out) if out else None
+    except Exception:
+        data = None
+    if not isinstance(data, list) or len(data) != len(texts):
+        return [None] * len(texts)
+    return [x if isinstance(x, str) and x else None for x in data]
+
+
+def _batches(texts: List[str]):
+    batch, size = [], 0
+    for t in texts:
+        if batch and (len(batch) >= TRANSLATE_BATCH_SIZE or size + len(t) > TRANSLATE_BATCH_CHARS):
+            yield batch
+            batch, size = [], 0
+        batch.append(t)
+        size += len(t)
+    if batch:
+        yield batch
+
+
+def translate_texts(texts: List[str], deadline: Optional[float] = None) -> List[Optional[str]]:
+    """批量翻译：先查按内容哈希的翻译缓存，未命中的按批次并发请求 LLM（受限速器约束）。
+    到达 deadline 时返回已完成的部分（未完成项为 None），后台请求完成后仍会写入缓存。"""
+    results: List[Optional[str]] = [None] * len(texts)
+    if not _enabled():
+        return results
+    cache = get_cache()
+    pending = {}
+    for i, t in enumerate(texts):
+        t = (t or "")[:TRANSLATE_MAX_CHARS]
+        if not t:
+            continue
+        entry = cache.get("translation", _key(t)) if cache else None
+        if entry:
+            results[i] = entry["value"]
+        else:
+            pending.setdefault(t, []).append(i)
+    if not pending:
+        return results
+
+    def _run(batch):
+        outs = _translate_batch(batch)
+        for src, out in zip(batch, outs):
+            if out is None:
+                continue
+            if cache:
+                try:
+                    cache.set("translation", _key(src), out, TRANSLATE_CACHE_TTL)
+                except Exception:
+                    pass
+            for i in pending[src]:
+                results[i] = out
+
+    pool = ThreadPoolExecutor(max_workers=TRANSLATE_CONCURRENCY, thread_name_prefix="translate")
+    futures = [pool.submit(_run, b) for b in _batches(list(pending))]
+    timeout = None if deadline is None else max(0.0, deadline - time.time())
+    wait(futures, timeout=timeout)
+    pool.shutdown(wait=False)
+    return list(results)
+
+
+def translate_docs(docs: List[dict], logs=None, deadline: Optional[float] = None) -> int:
+    """流水线翻译阶段：把非中文文档的 text 替换为中文译文（保留 original_text），返回完成数量。
+    截止时间前未完成的文档保持原文，可直接参与后续分析。"""
+    targets = [d for d in docs if needs_translation(d.get("language")) and not d.get("translated")]
+    if not targets:
+        return 0
+    outs = translate_texts([d["text"] for d in targets], deadline=deadline)
+    done = 0
+    for d, out in zip(targets, outs):
+        if out:
+            d["original_text"] = d["text"]
+            d["text"] = out
+            d["translated"] = True
+            done += 1
+    msg = f"[TranslateEngine] TRANSLATED {done}/{len(targets)}"
+    print(msg)
+    if isinstance(logs, list):
+        logs.append(msg)
+    return done
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from config import CACHE_PATH, CACHE_MAX_BYTES, ENABLE_CACHE_SAVE
+from src.utils import metrics
+
+
+class ContentCache:
+    """基于 SQLite 的内容缓存（检索结果 / 页面 HTML / 抽取后的文档等）。
+    - 以 (kind, key) 为主键，记录 ETag / Last-Modified 以便条件请求复验
+    - 条目过期后仍保留，供条件 GET 复用；总大小超过上限时按最近访问时间（LRU）淘汰
+    - 总大小记在库内计数行（由触发器维护），多进程共用同一文件时各自读到的都是实际值
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " etag TEXT, last_modified TEXT,"
+            " stored_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+            " size INTEGER NOT NULL, PRIMARY KEY (kind, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_stats (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO cache_stats (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM entries"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN"
+                " UPDATE cache_stats SET total = total + new.size WHERE id = 0; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN"
+                " UPDATE cache_stats SET total = total - old.size WHERE id = 0; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE OF size ON entries BEGIN"
+                " UPDATE cache_stats SET total = total + new.size - old.size WHERE id = 0; END"
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def get(self, kind: str, key: str, allow_stale: bool = False) -> Optional[dict]:
+        """返回条目字典（value/etag/last_modified/fresh）；过期条目仅在 allow_stale 时返回。"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, etag, last_modified, expires_at FROM entries WHERE kind=? AND key=?",
+                (kind, key),
+            ).fetchone()
+            if row is None:
+                metrics.inc("cache_requests_total", kind=kind, result="miss")
+                return None
+            fresh = row[3] > now
+            metrics.inc("cache_requests_total", kind=kind, result="hit" if fresh else "stale")
+            if not fresh and not allow_stale:
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at=? WHERE kind=? AND key=?", (now, kind, key))
+        return {"value": row[0], "etag": row[1], "last_modified": row[2], "fresh": fresh}
+
+    def set(self, kind: str, key: str, value: str, ttl: float, etag: Optional[str] = None,
+            last_modified: Optional[str] = None):
+        now = time.time()
+        size = len(value.encode("utf-8")) + len(key)
+        with self._lock:
+            # 写入、读取总大小与淘汰在同一写事务内完成，其他进程的写入不会交错
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 用 UPSERT 而非 INSERT OR REPLACE：替换已有条目时走 UPDATE 触发器，总大小才能正确增减
+                self._conn.execute(
+                    "INSERT INTO entries (kind, key, value, etag, last_modified, stored_at, expires_at, accessed_at, size)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(kind, key) DO UPDATE SET value=excluded.value, etag=excluded.etag,"
+                    " last_modified=excluded.last_modified, stored_at=excluded.stored_at,"
+                    " expires_at=excluded.expires_at, accessed_at=excluded.accessed_at, size=excluded.size",
+                    (kind, key, value, etag, last_modified, now, now + ttl, now, size),
+                )
+                total = self._conn.execute("SELECT total FROM cache_stats WHERE id = 0").fetchone()[0]
+                if total > self.max_bytes:
+                    self._evict(total)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def refresh(self, kind: str, key: str, ttl: float):
+        """条件请求返回 304 时延长有效期。"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET expires_at=?, accessed_at=? WHERE kind=? AND key=?",
+                (now + ttl, now, kind, key),
+            )
+
+    def _evict(self, total: int):
+        # 淘汰到上限的 90%，避免每次写入都触发淘汰；计数行由删除触发器同步扣减
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT kind, key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+        victims = []
+        for kind, key, size in rows:
+            if total <= target:
+                break
+            victims.append((kind, key))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE kind=? AND key=?", victims)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ContentCache]:
+    """进程级缓存实例；ENABLE_CACHE_SAVE 关闭或数据库不可用时返回 None。"""
+    global _cache
+    if not ENABLE_CACHE_SAVE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ContentCache(CACHE_PATH, CACHE_MAX_BYTES)
+            except Exception:
+                return None
+        return _cache
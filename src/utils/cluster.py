@@ -0,0 +1,214 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List
+
+import numpy as np
+
+# 特征为中文二元组（中文连续片段常为整句，需切细才有共现），编码为 (首字, 次字) 在 CJK 基本区内的序号对
+_CJK_LO, _CJK_HI = 0x4E00, 0x9FFF
+_SPAN = _CJK_HI - _CJK_LO + 1
+# 乘法哈希（Knuth）：二元组编码 × 常数后取高位作为桶号
+_HASH_MUL = 2654435761
+# 全量分配时每次处理的文档数，控制 (非零项 × 簇数) 中间数组的内存
+_ASSIGN_CHUNK = 20000
+
+
+def _bigram_name(code: int) -> str:
+    return chr(_CJK_LO + code // _SPAN) + chr(_CJK_LO + code % _SPAN)
+
+
+def tfidf_matrix(texts: List[str], max_terms: int = 64, max_chars: int = 1000, dim_bits: int = 20):
+    """中文二元组的哈希 TF-IDF，返回 CSR 形式 (indptr, cols, vals) 与词表（列号 -> 二元组编码，用于生成标签）。
+    - 每篇只取前 max_chars 个字符，只保留权重最高的 max_terms 项，已做 L2 归一化
+    - 全部文档拼接为一个码点数组后向量化计算；二元组哈希到 2^dim_bits 个桶，
+      文档频率与列号压缩都用计数数组完成，只有 (文档, 桶) 去重与每篇截断需要排序"""
+    n = len(texts)
+    dim = 1 << dim_bits
+    parts = [t[:max_chars] for t in texts]
+    # 文档之间以 \x00 分隔，跨文档的相邻字符不会同时落在 CJK 区内
+    cp = np.frombuffer("\x00".join(parts).encode("utf-32-le", errors="replace"), dtype=np.uint32)
+    cjk = (cp >= _CJK_LO) & (cp <= _CJK_HI)
+    pos = np.flatnonzero(cjk[:-1] & cjk[1:])
+    codes = (cp[pos].astype(np.int64) - _CJK_LO) * _SPAN + (cp[pos + 1].astype(np.int64) - _CJK_LO)
+    buckets = (codes * _HASH_MUL) >> (32 - dim_bits) & (dim - 1)
+    # 每个桶记一个二元组作为名称（冲突时任取其一）
+    names = np.zeros(dim, dtype=np.int64)
+    names[buckets] = codes
+    # 二元组所属文档：pos 有序，按各文档起始字符位置切分即可（只需 n 次二分查找）
+    lens = np.fromiter((len(p) + 1 for p in parts), dtype=np.int64, count=n)
+    per_doc = np.diff(np.searchsorted(pos, np.cumsum(lens) - lens), append=len(pos))
+    key = np.repeat(np.arange(n, dtype=np.int64), per_doc) << dim_bits | buckets
+    if not len(key):
+        return np.zeros(n + 1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64)
+    key.sort()
+    first = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+    tf = np.diff(np.append(first, len(key)))
+    key = key[first]
+    pdoc, col = key >> dim_bits, key & (dim - 1)
+    idf = np.log((1.0 + n) / (1.0 + np.bincount(col, minlength=dim))) + 1.0
+    w = (1.0 + np.log(tf)) * idf[col]
+    counts = np.bincount(pdoc, minlength=n)
+    if len(counts) and counts.max() > max_terms:
+        # 每篇保留权重最高的 max_terms 项：按 (文档, -权重) 排序后取每篇前 max_terms 个；
+        # 权重缩放到 [0, 1) 后与文档号合成一个浮点键排序（比 lexsort 快一个数量级）
+        order = np.argsort(pdoc + (w.max() - w) / (w.max() * 1.001 + 1e-9))
+        pdoc, col, w = pdoc[order], col[order], w[order]
+        keep = np.arange(len(pdoc)) - (np.cumsum(counts) - counts)[pdoc] < max_terms
+        pdoc, col, w = pdoc[keep], col[keep], w[keep]
+    w = w / np.sqrt(np.bincount(pdoc, weights=w * w, minlength=n))[pdoc]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(pdoc, minlength=n))))
+    # 列号压缩为实际用到的桶
+    used = np.zeros(dim, dtype=bool)
+    used[col] = True
+    remap = np.cumsum(used) - 1
+    return indptr, remap[col], w, names[used]
+
+
+def _rows(indptr, docs):
+    """取若干文档的非零项：返回 (非零项下标, 所属的行号 0..len(docs)-1)。"""
+    lens = indptr[docs + 1] - indptr[docs]
+    total = int(lens.sum())
+    local = np.repeat(np.arange(len(docs)), lens)
+    offsets = np.repeat(indptr[docs] - (np.cumsum(lens) - lens), lens)
+    return offsets + np.arange(total), local
+
+
+def _similarity(centroids, norms, cols, vals, idx, local, m):
+    """余弦相似度矩阵 (m, k)：样本已归一化，只需除以质心范数。"""
+    sims = np.empty((m, len(centroids)))
+    c, v = cols[idx], vals[idx]
+    for ci in range(len(centroids)):
+        sims[:, ci] = np.bincount(local, weights=centroids[ci, c] * v, minlength=m)
+    return sims / np.where(norms > 0, norms, 1.0)
+
+
+def _assign_chunk(centroids, indptr, cols, vals):
+    # 进程池任务：对一段文档（局部 CSR）求最近质心
+    norms = np.sqrt((centroids * centroids).sum(axis=1))
+    m = len(indptr) - 1
+    idx, local = _rows(indptr, np.arange(m))
+    sims = _similarity(centroids, norms, cols, vals, idx, local, m)
+    best = sims.argmax(axis=1)
+    return best, sims[np.arange(m), best]
+
+
+def _train(matrix, k: int, batch_size: int, max_batches: int, rng, epochs: int = 3,
+           tol: float = 1e-3, patience: int = 5):
+    indptr, cols, vals, dim = matrix
+    n = len(indptr) - 1
+    centroids = np.zeros((k, dim))
+    # k-means++ 初始化（在样本子集上进行，控制初始化成本）
+    pool = rng.choice(n, size=min(n, max(k * 50, 1000)), replace=False)
+    p_idx, p_local = _rows(indptr, pool)
+
+    def _seed(ci, doc):
+        lo, hi = indptr[doc], indptr[doc + 1]
+        centroids[ci, cols[lo:hi]] = vals[lo:hi]
+
+    _seed(0, pool[0])
+    chosen = 1
+    dist = 1.0 - _similarity(centroids[:1], np.ones(1), cols, vals, p_idx, p_local, len(pool))[:, 0]
+    while chosen < k:
+        total = dist.sum()
+        if total <= 0:
+            break
+        pick = min(int(np.searchsorted(np.cumsum(dist), rng.random() * total)), len(pool) - 1)
+        _seed(chosen, pool[pick])
+        sims = _similarity(centroids[chosen:chosen + 1], np.ones(1), cols, vals, p_idx, p_local, len(pool))
+        dist = np.minimum(dist, 1.0 - sims[:, 0])
+        chosen += 1
+
+    # 批次数随样本数增长：约 epochs 遍样本，且不超过 max_batches；
+    # 批内平均相似度（指数平滑）连续 patience 个批次提升不足 tol 时视为收敛，提前结束
+    counts = np.ones(k)
+    batches = min(max_batches, max(10, math.ceil(epochs * n / batch_size)))
+    best, stale, ewa = -1.0, 0, None
+    for _ in range(batches):
+        batch = rng.choice(n, size=min(batch_size, n), replace=False)
+        idx, local = _rows(indptr, batch)
+        norms = np.sqrt((centroids * centroids).sum(axis=1))
+        sims = _similarity(centroids, norms, cols, vals, idx, local, len(batch))
+        nearest = sims.argmax(axis=1)
+        # 质心向本批成员均值移动，步长 = 本批成员数 / 累计成员数（mini-batch k-means 的按簇学习率）
+        for ci in np.unique(nearest):
+            members = np.flatnonzero(nearest == ci)
+            counts[ci] += len(members)
+            eta = len(members) / counts[ci]
+            sel = np.isin(local, members)
+            mean = np.bincount(cols[idx[sel]], weights=vals[idx[sel]], minlength=dim) / len(members)
+            centroids[ci] = (1.0 - eta) * centroids[ci] + eta * mean
+        mean_sim = float(sims[np.arange(len(batch)), nearest].mean())
+        ewa = mean_sim if ewa is None else 0.7 * ewa + 0.3 * mean_sim
+        if ewa > best + tol:
+            best, stale = ewa, 0
+        else:
+            stale += 1
+            if stale >= patience:
+                break
+    # 以子集上的平均相似度评估本次训练质量
+    norms = np.sqrt((centroids * centroids).sum(axis=1))
+    score = float(_similarity(centroids, norms, cols, vals, p_idx, p_local, len(pool)).max(axis=1).mean())
+    return centroids, score
+
+
+def minibatch_kmeans(matrix, k: int, batch_size: int = 1024, max_batches: int = 100, n_init: int = 3,
+                     seed: int = 0, workers: int = 1):
+    """Mini-batch k-means（余弦距离）。matrix 为 (indptr, cols, vals, 维数)；返回 (质心矩阵, 簇编号数组, 相似度数组)。
+    每次训练约 3 遍样本（至多 max_batches 个小批次，收敛即停），取 n_init 次中最优一次（小语料只训练一次）；
+    最终全量分配按块向量化计算，可按 workers 拆到进程池。"""
+    indptr, cols, vals, _ = matrix
+    rng = np.random.default_rng(seed)
+    n = len(indptr) - 1
+    k = max(1, min(k, n))
+    if n <= batch_size * 10:
+        n_init = 1
+    centroids, _ = max((_train(matrix, k, batch_size, max_batches, rng) for _ in range(n_init)),
+                       key=lambda r: r[1])
+
+    step = math.ceil(n / workers) if workers > 1 and n >= 5000 else _ASSIGN_CHUNK
+    chunks = [
+        (indptr[lo:hi + 1] - indptr[lo], cols[indptr[lo]:indptr[hi]], vals[indptr[lo]:indptr[hi]])
+        for lo, hi in ((lo, min(lo + step, n)) for lo in range(0, n, step))
+    ]
+    if workers > 1 and n >= 5000:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(_assign_chunk, repeat(centroids), *zip(*chunks)))
+    else:
+        parts = [_assign_chunk(centroids, *c) for c in chunks]
+    return centroids, np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def cluster_texts(texts: List[str], k: int, n_samples: int = 3, n_label_terms: int = 3, workers: int = 1,
+                  max_chars: int = 1000) -> List[dict]:
+    """聚类并生成报告所需的簇列表：label 为质心权重最高的若干二元组，samples 为距质心最近的文本。
+    没有中文特征的文档归入“其它”。"""
+    if not texts:
+        return []
+    indptr, cols, vals, vocab = tfidf_matrix(texts, max_chars=max_chars)
+    lens = np.diff(indptr)
+    valid = np.flatnonzero(lens > 0)
+    others = np.flatnonzero(lens == 0)
+    clusters = []
+    if len(valid):
+        # 只保留有特征的行
+        sub_ptr = np.concatenate(([0], np.cumsum(lens[valid])))
+        centroids, assigned, sims = minibatch_kmeans((sub_ptr, cols, vals, len(vocab)), k, workers=workers)
+        for ci in np.unique(assigned):
+            members = np.flatnonzero(assigned == ci)
+            nearest = members[np.argsort(-sims[members], kind="stable")[:n_samples]]
+            top = [t for t in np.argsort(-centroids[ci])[:n_label_terms] if centroids[ci, t] > 0]
+            label = "/".join(_bigram_name(int(vocab[t])) for t in top)
+            clusters.append({
+                "label": label or "其它",
+                "size": int(len(members)),
+                "samples": [texts[valid[i]][:300] for i in nearest],
+            })
+    if len(others):
+        clusters.append({
+            "label": "其它",
+            "size": int(len(others)),
+            "samples": [texts[i][:300] for i in others[:n_samples]],
+        })
+    clusters.sort(key=lambda c: c["size"], reverse=True)
+    return clusters
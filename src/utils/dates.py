@@ -0,0 +1,185 @@
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config import DATE_SCAN_CHARS, DATE_USE_DATEPARSER
+
+# 结构化发布时间：meta 标签（property / name / itemprop）
+_META_KEYS = [
+    "article:published_time",
+    "og:article:published_time",
+    "datePublished",
+    "dateCreated",
+    "uploadDate",
+    "pubdate",
+    "publishdate",
+    "PubDate",
+    "weibo: article:create_at",
+    "og:release_date",
+]
+_JSONLD_KEYS = ("datePublished", "dateCreated", "uploadDate")
+_JSONLD_RE = re.compile(
+    r"<script[^>]+application/ld\+json[^>]*>(.*?)</script>", re.I | re.S
+)
+# 站点专用选择器（取节点文本再做正则匹配）
+_SITE_SELECTORS = {
+    "zhihu.com": [".ContentItem-time", ".Post-Time"],
+    "weibo.com": [".from a", ".time", "[class*=time]"],
+    "weibo.cn": [".time", ".from"],
+    "bilibili.com": [".pubdate-text", ".pubdate-ip-text", ".pubdate"],
+}
+
+# 中文/数字日期格式
+_FULL_RE = re.compile(
+    r"((?:19|20)\d{2})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})\s*日?"
+    r"(?:[\sT]*(\d{1,2})[:：时](\d{1,2}))?"
+)
+_MONTH_DAY_RE = re.compile(r"(?<!\d)(\d{1,2})月(\d{1,2})日(?:\s*(\d{1,2})[:：](\d{2}))?")
+_AGO_RE = re.compile(r"(\d+)\s*(秒|分钟|小时|天|周|个月)前")
+_DAY_WORD_RE = re.compile(r"(刚刚|今天|昨天|前天)(?:\s*(\d{1,2})[:：](\d{2}))?")
+_URL_DATE_RE = re.compile(r"/((?:19|20)\d{2})[/-]?(0[1-9]|1[0-2])[/-]?(0[1-9]|[12]\d|3[01])(?=/|\D|$)")
+
+_AGO_UNITS = {
+    "秒": timedelta(seconds=1),
+    "分钟": timedelta(minutes=1),
+    "小时": timedelta(hours=1),
+    "天": timedelta(days=1),
+    "周": timedelta(weeks=1),
+    "个月": timedelta(days=30),
+}
+_DAY_WORD_OFFSET = {"刚刚": 0, "今天": 0, "昨天": 1, "前天": 2}
+
+
+def _plausible(dt: Optional[datetime], now: datetime) -> Optional[datetime]:
+    # 过滤明显错误的日期：早于 2000 年或晚于当前时间一天以上
+    if dt is None or dt.year < 2000 or dt > now + timedelta(days=1):
+        return None
+    return dt
+
+
+def _build(y, mo, d, h=None, mi=None) -> Optional[datetime]:
+    try:
+        return datetime(int(y), int(mo), int(d), int(h or 0), int(mi or 0))
+    except ValueError:
+        return None
+
+
+def parse_date(value: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """解析单个日期字符串（ISO 8601 或中文/数字格式、相对时间），返回本地时间的 naive datetime。"""
+    now = now or datetime.now()
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if dt.tzinfo is not None:
+            dt = dt.astimezone().replace(tzinfo=None)
+        return _plausible(dt, now)
+    except ValueError:
+        pass
+    return _match_text(value, now)
+
+
+def _match_text(text: str, now: datetime, free_text: bool = False) -> Optional[datetime]:
+    # free_text：正文自由文本。“今天/昨天”等在正文里多是叙述用语而非发布时间，只在带 HH:MM 时采用
+    m = _FULL_RE.search(text)
+    if m:
+        dt = _plausible(_build(*m.groups()), now)
+        if dt:
+            return dt
+    m = _AGO_RE.search(text)
+    if m:
+        return now - int(m.group(1)) * _AGO_UNITS[m.group(2)]
+    m = _DAY_WORD_RE.search(text)
+    if m and free_text and m.group(2) is None:
+        m = next((x for x in _DAY_WORD_RE.finditer(text) if x.group(2) is not None), None)
+    if m:
+        day = now - timedelta(days=_DAY_WORD_OFFSET[m.group(1)])
+        if m.group(1) == "刚刚" and m.group(2) is None:
+            return now
+        return _build(day.year, day.month, day.day, m.group(2), m.group(3))
+    m = _MONTH_DAY_RE.search(text)
+    if m:
+        # 无年份：取当前年份，若落在未来则视为去年
+        dt = _build(now.year, m.group(1), m.group(2), m.group(3), m.group(4))
+        if dt and dt > now + timedelta(days=1):
+            dt = _build(now.year - 1, m.group(1), m.group(2), m.group(3), m.group(4))
+        return _plausible(dt, now)
+    return None
+
+
+def _jsonld_dates(html: str):
+    for raw in _JSONLD_RE.findall(html):
+        try:
+            data = json.loads(raw.strip())
+        except Exception:
+            continue
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+            elif isinstance(node, dict):
+                for k in _JSONLD_KEYS:
+                    if isinstance(node.get(k), str):
+                        yield node[k]
+                stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+
+
+def _structured(html: Optional[str], page, url: str, now: datetime) -> Optional[datetime]:
+    if page is not None:
+        for key in _META_KEYS:
+            dt = parse_date(page.meta(key) or "", now)
+            if dt:
+                return dt
+    if html:
+        for value in _jsonld_dates(html):
+            dt = parse_date(value, now)
+            if dt:
+                return dt
+    if page is not None:
+        for value in page.attr_values("time[datetime]", "datetime"):
+            dt = parse_date(value, now)
+            if dt:
+                return dt
+        for site, selectors in _SITE_SELECTORS.items():
+            if site not in url:
+                continue
+            for sel in selectors:
+                for txt in page.select_texts(sel):
+                    dt = _match_text(txt, now)
+                    if dt:
+                        return dt
+    m = _URL_DATE_RE.search(url or "")
+    if m:
+        return _plausible(_build(*m.groups()), now)
+    return None
+
+
+def extract_published(html: Optional[str] = None, page=None, text: str = "", url: str = "") -> Optional[datetime]:
+    """抽取发布时间：结构化信号（meta / JSON-LD / <time> / 站点选择器 / URL）优先，
+    其次对正文开头 DATE_SCAN_CHARS 个字符做正则匹配，最后才调用 dateparser。
+    page 需在正文抽取（会裁剪页面树）之前传入。"""
+    now = datetime.now()
+    try:
+        dt = _structured(html, page, url, now)
+        if dt:
+            return dt
+        window = (text or "")[:DATE_SCAN_CHARS]
+        dt = _match_text(window, now, free_text=True)
+        if dt or not DATE_USE_DATEPARSER or not window:
+            return dt
+        import dateparser.search
+
+        # 同样跳过不含数字的相对说法（今天 / yesterday 等）
+        found = [f for f in dateparser.search.search_dates(window, languages=["zh", "en"]) or []
+                 if any(c.isdigit() for c in f[0])]
+        if found:
+            dt = found[0][1]
+            if dt.tzinfo is not None:
+                dt = dt.astimezone().replace(tzinfo=None)
+            return _plausible(dt, now)
+    except Exception:
+        pass
+    return None
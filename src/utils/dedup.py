@@ -1,21 +1,179 @@
-from typing import List, Callable
+import json
+import re
+from collections import Counter
+from itertools import chain, combinations
+from math import comb
+from typing import List, Callable, Optional
 from simhash import Simhash
 
+# 与 simhash 库默认分词一致：保留字母数字与汉字后按 4 字符滑窗取特征
+_FEATURE_RE = re.compile(r"[\w\u4e00-\u9fcc]+")
 
-def near_dedup(items: List[dict], key: Callable[[dict], str], threshold: int = 8) -> List[dict]:
-    """简单近重复去重：基于Simhash的汉明距离阈值。"""
+
+def _popcount(x: int) -> int:
+    return bin(x).count("1")
+
+
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count  # noqa: F811
+
+
+def fingerprint(text: str) -> int:
+    """文本的 64 位 Simhash 指纹。
+    simhash 库在 numpy 2 下单个特征权重超过 255 时会溢出（重复内容多的页面，如论坛列表），此时把权重截断到 255 再计算。"""
+    try:
+        return Simhash(text).value
+    except OverflowError:
+        content = "".join(_FEATURE_RE.findall(text.lower()))
+        features = Counter(content[i:i + 4] for i in range(max(len(content) - 3, 1)))
+        return Simhash({k: min(w, 255) for k, w in features.items()}).value
+
+
+class SimhashIndex:
+    """Simhash 近重复索引（多分块索引 / multi-index hashing）。
+    将 f 位指纹切成 blocks 段；若两指纹汉明距离 ≤ threshold，则由鸽巢原理至少有一段的距离
+    ≤ threshold // blocks。查询时仅在各段的邻域（翻转 ≤ r 位）中取候选再精确校验，
+    代替逐一比较全部已保留指纹。
+    未指定 blocks 时分段随规模调整：段越宽，每个桶里的候选越少，但邻域探测数越多；
+    指纹数每翻一番重新估算一次，分段变化时重建各段的表（均摊 O(1)），使段宽随 log2(n) 增长，
+    候选数保持在常数级。分段方式不影响结果，只影响速度。
+    """
+
+    def __init__(self, threshold: int = 8, f: int = 64, blocks: Optional[int] = None):
+        self.threshold = threshold
+        self.f = f
+        self.fixed_blocks = blocks
+        self.fingerprints = []
+        self.keys = []
+        self._ids = {}
+        self._next_plan = 1024
+        self._configure(blocks or self._plan(self._next_plan))
+
+    def _plan(self, n: int) -> int:
+        """按预计规模 n 选分段数：估算每次查询的 邻域探测数 + 候选校验数，取最小者。"""
+        best, best_cost = 1, None
+        for blocks in range(1, min(self.threshold + 1, self.f) + 1):
+            radius = self.threshold // blocks
+            width = self.f // blocks
+            probes = blocks * sum(comb(width, k) for k in range(radius + 1))
+            cost = probes * (1 + n / (1 << width))
+            if best_cost is None or cost < best_cost:
+                best, best_cost = blocks, cost
+        return best
+
+    def _configure(self, blocks: int):
+        self.blocks = max(1, min(blocks, self.f))
+        self.radius = self.threshold // self.blocks
+        # 每段的 (起始位, 位宽)
+        bounds = [round(i * self.f / self.blocks) for i in range(self.blocks + 1)]
+        self._segments = [(bounds[i], bounds[i + 1] - bounds[i]) for i in range(self.blocks)]
+        # 每段的邻域翻转掩码（含 0，即精确匹配）
+        self._flips = []
+        for _, width in self._segments:
+            masks = [0]
+            for k in range(1, self.radius + 1):
+                for bits in combinations(range(width), k):
+                    m = 0
+                    for b in bits:
+                        m |= 1 << b
+                    masks.append(m)
+            self._flips.append(masks)
+        # 每段一张表：段值 -> 指纹列表（同一指纹只登记一次，编号见 _ids）
+        self._tables = [dict() for _ in range(self.blocks)]
+        for fp in self._ids:
+            self._insert(fp)
+
+    def _insert(self, fp: int):
+        for table, part in zip(self._tables, self._parts(fp)):
+            table.setdefault(part, []).append(fp)
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def _parts(self, fp: int):
+        for start, width in self._segments:
+            yield (fp >> start) & ((1 << width) - 1)
+
+    def _buckets(self, fp: int):
+        # 邻域探测与取桶均用 map/filter 在 C 层完成，只返回真实存在的桶
+        for table, masks, part in zip(self._tables, self._flips, self._parts(fp)):
+            buckets = list(filter(None, map(table.get, map(part.__xor__, masks))))
+            if buckets:
+                yield buckets
+
+    def add(self, fp: int, key=None) -> int:
+        """加入一个指纹，返回其内部编号；key 为可选的业务标识（如 URL），会随索引持久化。"""
+        idx = len(self.fingerprints)
+        self.fingerprints.append(fp)
+        self.keys.append(key)
+        if fp in self._ids:
+            self._ids[fp].append(idx)
+        else:
+            self._ids[fp] = [idx]
+            self._insert(fp)
+        if self.fixed_blocks is None and len(self._ids) >= self._next_plan:
+            # 规模翻倍：按下一档规模重新选分段，变化时重建
+            self._next_plan *= 2
+            blocks = self._plan(self._next_plan)
+            if blocks != self.blocks:
+                self._configure(blocks)
+        return idx
+
+    def query(self, fp: int) -> List[int]:
+        """返回与 fp 汉明距离 ≤ threshold 的全部指纹编号。"""
+        matched = set()
+        for buckets in self._buckets(fp):
+            for x in chain.from_iterable(buckets):
+                if x not in matched and _popcount(fp ^ x) <= self.threshold:
+                    matched.add(x)
+        return sorted(i for x in matched for i in self._ids[x])
+
+    def find(self, fp: int) -> Optional[int]:
+        """返回任意一个近重复指纹的编号，没有则返回 None（去重热路径）。"""
+        for buckets in self._buckets(fp):
+            # 先在 C 层求候选的最小汉明距离，命中后再定位具体指纹
+            if min(map(_popcount, map(fp.__xor__, chain.from_iterable(buckets)))) > self.threshold:
+                continue
+            for x in chain.from_iterable(buckets):
+                if _popcount(fp ^ x) <= self.threshold:
+                    return self._ids[x][0]
+        return None
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "threshold": self.threshold,
+                "f": self.f,
+                # 只持久化显式指定的分段；自适应分段加载后按规模重新选择
+                "fixed_blocks": self.fixed_blocks,
+                "fingerprints": [str(x) for x in self.fingerprints],
+                "keys": self.keys,
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "SimhashIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(threshold=data["threshold"], f=data["f"], blocks=data.get("fixed_blocks"))
+        for fp, key in zip(data["fingerprints"], data["keys"]):
+            index.add(int(fp), key)
+        return index
+
+
+def near_dedup(items: List[dict], key: Callable[[dict], str], threshold: int = 8,
+               index: Optional[SimhashIndex] = None) -> List[dict]:
+    """近重复去重：基于Simhash的汉明距离阈值（分块索引，近线性复杂度）。
+    传入 index 时会与其中已有指纹（如历史运行）一并去重，并把新保留的指纹加入该索引。
+    保留的文档记录 simhash 字段，入库时（未经翻译改写正文的）直接复用。"""
+    if index is None:
+        index = SimhashIndex(threshold=threshold)
     kept = []
-    fingerprints = []
     for it in items:
         text = key(it) or ""
-        fp = Simhash(text)
-        is_dup = False
-        for prev_fp in fingerprints:
-            dist = fp.distance(prev_fp)
-            if dist <= threshold:
-                is_dup = True
-                break
-        if not is_dup:
+        fp = fingerprint(text)
+        if index.find(fp) is None:
             kept.append(it)
-            fingerprints.append(fp)
-    return kept
\ No newline at end of file
+            if isinstance(it, dict):
+                it["simhash"] = fp
+            index.add(fp, it.get("url") if isinstance(it, dict) else None)
+    return kept
@@ -0,0 +1,96 @@
+import re
+import threading
+import time
+from collections import deque
+
+from config import EVENT_HISTORY, EVENT_TTL_SECONDS, TIME_BUDGET_SECONDS
+
+_LOG_RE = re.compile(r"^\[(\w+)\]\s+(\w+)")
+_TERMINAL_STATES = ("done", "failed")
+
+
+class EventBus:
+    """进程内事件总线：按任务（ts）分频道，保留最近若干条事件供后来的订阅者回放。"""
+
+    def __init__(self, history: int = EVENT_HISTORY, ttl: float = EVENT_TTL_SECONDS):
+        self.history = history
+        self.ttl = ttl
+        self._cond = threading.Condition()
+        self._channels = {}
+        self._forward = None
+
+    def forward_to(self, queue):
+        """改为把事件转发到 queue（任务子进程中使用，由父进程统一发布）。"""
+        self._forward = queue
+
+    def publish(self, channel: str, event: dict) -> dict:
+        if self._forward is not None:
+            event = dict(event, t=time.time())
+            self._forward.put(("event", channel, event))
+            return event
+        with self._cond:
+            ch = self._channels.get(channel)
+            if ch is None:
+                ch = {"seq": 0, "events": deque(maxlen=self.history), "closed_at": None}
+                self._channels[channel] = ch
+                self._expire()
+            ch["seq"] += 1
+            event = dict(event, id=ch["seq"], t=event.get("t", time.time()))
+            ch["events"].append(event)
+            if event.get("type") == "state" and event.get("state") in _TERMINAL_STATES:
+                ch["closed_at"] = time.time()
+            self._cond.notify_all()
+        return event
+
+    def wait(self, channel: str, since: int = 0, timeout: float = 15.0):
+        """返回 id > since 的事件；暂无新事件时最多阻塞 timeout 秒。"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                ch = self._channels.get(channel)
+                if ch is not None and ch["seq"] > since:
+                    return [e for e in ch["events"] if e["id"] > since]
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+    def known(self, channel: str) -> bool:
+        with self._cond:
+            return channel in self._channels
+
+    def _expire(self):
+        now = time.time()
+        for name in [n for n, ch in self._channels.items() if ch["closed_at"] and now - ch["closed_at"] > self.ttl]:
+            del self._channels[name]
+
+
+bus = EventBus()
+
+
+def log_event(msg: str) -> dict:
+    """把 "[QueryEngine] FETCH_OK ..." 形式的日志行解析为结构化事件。"""
+    m = _LOG_RE.match(msg)
+    if not m:
+        return {"type": "log", "message": msg}
+    stage, action = m.group(1), m.group(2)
+    kind = "stage" if action in ("START", "DONE") else "log"
+    return {"type": kind, "stage": stage, "action": action, "message": msg}
+
+
+class EventLog(list):
+    """流水线日志列表：append 时同步发布到事件总线，供 SSE 实时推送；
+    事件附带已用时与按时间预算估算的剩余时间（ETA）。"""
+
+    def __init__(self, channel: str, expected_seconds: float = TIME_BUDGET_SECONDS + 5):
+        super().__init__()
+        self.channel = channel
+        self.started = time.time()
+        self.expected_seconds = expected_seconds
+
+    def append(self, msg):
+        super().append(msg)
+        elapsed = time.time() - self.started
+        event = dict(log_event(str(msg)), elapsed=round(elapsed, 1),
+                     eta=round(max(self.expected_seconds - elapsed, 0.0), 1))
+        bus.publish(self.channel, event)
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+
+def host_of(url: str) -> str:
+    try:
+        return (urlparse(url).hostname or "").lower()
+    except Exception:
+        return ""
+
+
+class FetchPool:
+    """按主机限流的并发抓取池。
+    - 全局并发上限：同时最多 concurrency 个请求在途
+    - 单主机并发上限：同一域名最多 per_host 个请求在途，其余 URL 留在队列中让位给其他主机
+    - 截止时间：超过 deadline 后不再派发新任务，join 只等待到 deadline 为止
+    """
+
+    def __init__(self, worker: Callable[[str], object], concurrency: int = 8, per_host: int = 2,
+                 deadline: Optional[float] = None):
+        self.worker = worker
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.deadline = deadline
+        self._queue = deque()
+        self._active = {}
+        self._running = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._results = []
+        self._threads = []
+        for i in range(self.concurrency):
+            t = threading.Thread(target=self._loop, name=f"fetch-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, url: str):
+        with self._cond:
+            self._queue.append(url)
+            self._cond.notify()
+
+    def close(self):
+        """不再接收新 URL；队列中剩余任务仍会被处理（直到截止时间）。"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue) + self._running
+
+    def _expired(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def _take(self):
+        # 取第一个所在主机尚有空闲额度的 URL
+        for i, url in enumerate(self._queue):
+            host = host_of(url)
+            if self._active.get(host, 0) < self.per_host:
+                del self._queue[i]
+                self._active[host] = self._active.get(host, 0) + 1
+                self._running += 1
+                return url, host
+        return None, None
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._expired():
+                        self._cond.notify_all()
+                        return
+                    url, host = self._take()
+                    if url is not None:
+                        break
+                    if self._closed and not self._queue:
+                        self._cond.notify_all()
+                        return
+                    timeout = None if self.deadline is None else max(0.0, self.deadline - time.time())
+                    self._cond.wait(timeout)
+            try:
+                res = self.worker(url)
+            except Exception:
+                res = None
+            with self._cond:
+                self._active[host] -= 1
+                self._running -= 1
+                if not self._expired():
+                    self._results.append((url, res))
+                self._cond.notify_all()
+
+    def join(self):
+        """等待全部任务完成或到达截止时间，返回 (url, result) 列表（按完成顺序）。"""
+        with self._cond:
+            while (self._queue or self._running) and not self._expired():
+                timeout = None if self.deadline is None else max(0.0, self.deadline - time.time())
+                self._cond.wait(timeout)
+            self._queue.clear()
+            return list(self._results)
@@ -0,0 +1,190 @@
+import re
+from typing import List, Optional
+
+from config import HTML_PARSER, HTML_MAIN_CONTENT
+
+# 解析前需要去除的标签
+_DROP_TAGS = ["script", "style", "noscript"]
+# 正文抽取时额外视为模板区块的标签
+_BOILERPLATE_TAGS = ["nav", "header", "footer", "aside", "form"]
+# 正文容器的最小长度与占全文比例，低于此值认为抽取不可靠，退回整页文本
+_MAIN_MIN_CHARS = 200
+_MAIN_MIN_RATIO = 0.2
+
+# meta refresh 在解析前用正则识别（中转页通常很短，只看页面开头）
+_META_REFRESH_RE = re.compile(
+    r"<meta[^>]+http-equiv\s*=\s*[\"']?refresh[\"']?[^>]*>", re.I
+)
+_META_CONTENT_RE = re.compile(r"content\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s>]+)", re.I)
+_REFRESH_URL_RE = re.compile(r"url\s*=?\s*([^;]+)", re.I)
+_REFRESH_SCAN_CHARS = 20000
+
+
+def find_meta_refresh(html: str) -> Optional[str]:
+    """返回 meta refresh 的跳转地址（无则 None），不需要完整解析页面。"""
+    m = _META_REFRESH_RE.search(html[:_REFRESH_SCAN_CHARS])
+    if not m:
+        return None
+    c = _META_CONTENT_RE.search(m.group(0))
+    if not c:
+        return None
+    # 形如: "0; URL='https://www.zhihu.com/...'"
+    u = _REFRESH_URL_RE.search(c.group(1).strip("'\""))
+    if not u:
+        return None
+    return u.group(1).strip().strip("'\"`") or None
+
+
+class _SelectolaxPage:
+    """selectolax（lexbor，C 实现）解析结果。"""
+
+    def __init__(self, html: str):
+        from selectolax.lexbor import LexborHTMLParser
+
+        self.tree = LexborHTMLParser(html)
+        self.tree.strip_tags(_DROP_TAGS)
+
+    def text(self) -> str:
+        root = self.tree.root
+        return root.text(separator="\n") if root is not None else ""
+
+    def select_texts(self, css: str) -> List[str]:
+        return [n.text(separator=" ", strip=True) for n in self.tree.css(css)]
+
+    def attr_values(self, css: str, attr: str) -> List[str]:
+        return [n.attributes.get(attr) for n in self.tree.css(css) if n.attributes.get(attr)]
+
+    def meta(self, key: str) -> Optional[str]:
+        for attr in ("property", "name", "itemprop"):
+            node = self.tree.css_first(f'meta[{attr}="{key}"]')
+            if node is not None and node.attributes.get("content"):
+                return node.attributes["content"].strip()
+        return None
+
+    def paragraphs(self):
+        self.tree.strip_tags(_BOILERPLATE_TAGS)
+        return [(p.parent.mem_id, p.text(separator=" ", strip=True)) for p in self.tree.css("p")]
+
+
+class _LxmlPage:
+    """lxml（libxml2）解析结果；CSS 选择器依赖 cssselect。"""
+
+    def __init__(self, html: str):
+        import lxml.html
+
+        self.doc = lxml.html.fromstring(html)
+        for el in list(self.doc.iter(*_DROP_TAGS)):
+            el.drop_tree()
+
+    def text(self) -> str:
+        return "\n".join(self.doc.itertext())
+
+    def select_texts(self, css: str) -> List[str]:
+        return [" ".join(t.strip() for t in el.itertext() if t.strip()) for el in self.doc.cssselect(css)]
+
+    def attr_values(self, css: str, attr: str) -> List[str]:
+        return [el.get(attr) for el in self.doc.cssselect(css) if el.get(attr)]
+
+    def meta(self, key: str) -> Optional[str]:
+        for attr in ("property", "name", "itemprop"):
+            for el in self.doc.iter("meta"):
+                if el.get(attr) == key and el.get("content"):
+                    return el.get("content").strip()
+        return None
+
+    def paragraphs(self):
+        for el in list(self.doc.iter(*_BOILERPLATE_TAGS)):
+            el.drop_tree()
+        # lxml 的元素代理对象按需创建，id() 不稳定，直接以父元素本身为键
+        return [(p.getparent(), " ".join(t.strip() for t in p.itertext() if t.strip()))
+                for p in self.doc.iter("p")]
+
+
+class _SoupPage:
+    """BeautifulSoup + html.parser（纯 Python，原有实现，作为兜底）。"""
+
+    def __init__(self, html: str):
+        from bs4 import BeautifulSoup
+
+        self.soup = BeautifulSoup(html, "html.parser")
+        for tag in self.soup(_DROP_TAGS):
+            tag.extract()
+
+    def text(self) -> str:
+        return self.soup.get_text("\n")
+
+    def select_texts(self, css: str) -> List[str]:
+        return [n.get_text(" ", strip=True) for n in self.soup.select(css)]
+
+    def attr_values(self, css: str, attr: str) -> List[str]:
+        return [n.get(attr) for n in self.soup.select(css) if n.get(attr)]
+
+    def meta(self, key: str) -> Optional[str]:
+        for attr in ("property", "name", "itemprop"):
+            node = self.soup.find("meta", attrs={attr: key})
+            if node and node.get("content"):
+                return node["content"].strip()
+        return None
+
+    def paragraphs(self):
+        for tag in self.soup(_BOILERPLATE_TAGS):
+            tag.extract()
+        return [(id(p.parent), p.get_text(" ", strip=True)) for p in self.soup.find_all("p")]
+
+
+def _available(backend: str) -> bool:
+    try:
+        if backend == "selectolax":
+            import selectolax.lexbor  # noqa: F401
+        elif backend == "lxml":
+            import lxml.html  # noqa: F401
+            import cssselect  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+_BACKENDS = {"selectolax": _SelectolaxPage, "lxml": _LxmlPage, "bs4": _SoupPage}
+_resolved = {}
+
+
+def _backend(name: Optional[str] = None):
+    """HTML_PARSER=auto 时按 selectolax -> lxml -> bs4 选择第一个可用的解析器。"""
+    name = (name or HTML_PARSER).lower()
+    if name not in _resolved:
+        order = ["selectolax", "lxml", "bs4"] if name == "auto" else [name, "bs4"]
+        _resolved[name] = next(b for b in order if b in _BACKENDS and _available(b))
+    return _BACKENDS[_resolved[name]]
+
+
+def parse(html: str, backend: Optional[str] = None):
+    """解析一次页面，返回统一接口的页面对象（text / select_texts / attr_values / meta / paragraphs）。"""
+    return _backend(backend)(html)
+
+
+def main_text(page) -> str:
+    """正文抽取：以 <p> 的父节点为候选容器，取段落文本最多的容器；
+    不可靠（过短或占比过低）时退回整页文本。会修改页面树，需在其他查询之后调用。"""
+    full = page.text()
+    groups = {}
+    order = []
+    for key, txt in page.paragraphs():
+        if not txt:
+            continue
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(txt)
+    if not groups:
+        return full
+    best = max(order, key=lambda k: sum(len(t) for t in groups[k]))
+    body = "\n".join(groups[best])
+    total = len(full.strip()) or 1
+    if len(body) < _MAIN_MIN_CHARS or len(body) / total < _MAIN_MIN_RATIO:
+        return full
+    return body
+
+
+def extract_text(page) -> str:
+    """按配置抽取正文（HTML_MAIN_CONTENT）或整页文本。"""
+    return main_text(page) if HTML_MAIN_CONTENT else page.text()
@@ -0,0 +1,55 @@
+import re
+import time
+
+from langdetect import DetectorFactory, detect
+
+from config import LANG_CJK_RATIO, LANG_SAMPLE_CHARS
+from src.utils import metrics
+
+# langdetect 内部带随机采样，固定种子使同一文本的结果稳定
+DetectorFactory.seed = 0
+
+_HAN_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+_KANA_RE = re.compile(r"[぀-ヿ]")
+_HANGUL_RE = re.compile(r"[가-힯ᄀ-ᇿ]")
+
+
+def detect_language(text: str) -> str:
+    """识别文本语言（langdetect 代码，如 zh-cn / en / ja）。
+    先按开头 LANG_SAMPLE_CHARS 个字符的汉字/假名/谚文比例直接判定，比例不明确时才调用 langdetect（同样只看开头）。"""
+    sample = (text or "")[:LANG_SAMPLE_CHARS]
+    letters = sum(1 for c in sample if c.isalpha())
+    if not letters:
+        return "unknown"
+    # 日文正文中假名比例很高，中文页面几乎没有假名，先于汉字比例判断
+    if len(_KANA_RE.findall(sample)) / letters > 0.1:
+        return "ja"
+    if len(_HANGUL_RE.findall(sample)) / letters > LANG_CJK_RATIO:
+        return "ko"
+    if len(_HAN_RE.findall(sample)) / letters >= LANG_CJK_RATIO:
+        return "zh-cn"
+    try:
+        return detect(sample)
+    except Exception:
+        return "unknown"
+
+
+def detect_languages(docs, logs=None):
+    """批量识别文档语言（原地写入 doc["language"]），已有语言标记的文档跳过。"""
+    t0 = time.time()
+    stats = {}
+    for d in docs:
+        if d.get("language"):
+            continue
+        lang = detect_language(d.get("text"))
+        d["language"] = lang
+        stats[lang] = stats.get(lang, 0) + 1
+    elapsed = time.time() - t0
+    metrics.observe("lang_detect_seconds", elapsed)
+    if stats:
+        summary = " ".join(f"{k}={v}" for k, v in sorted(stats.items(), key=lambda kv: -kv[1]))
+        msg = f"[LangDetect] DONE docs={sum(stats.values())} {summary} elapsed_ms={int(elapsed * 1000)}"
+        print(msg)
+        if isinstance(logs, list):
+            logs.append(msg)
+    return docs
@@ -0,0 +1,118 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# 默认直方图分桶：耗时（秒）与字节数
+_SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60)
+_BYTES_BUCKETS = (1024, 10 * 1024, 100 * 1024, 512 * 1024, 1024 * 1024, 5 * 1024 * 1024)
+
+
+def _label_key(labels: dict):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key, extra=None) -> str:
+    items = list(key) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in items)
+    return "{" + body + "}"
+
+
+class Registry:
+    """进程内指标注册表：计数器与直方图，按 Prometheus 文本格式导出。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._forward = None
+
+    def forward_to(self, queue):
+        """改为把指标更新转发到 queue（任务子进程中使用，由父进程计入注册表）。"""
+        self._forward = queue
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if self._forward is not None:
+            self._forward.put(("inc", name, value, labels))
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if self._forward is not None:
+            self._forward.put(("observe", name, value, labels))
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                buckets = _BYTES_BUCKETS if name.endswith("_bytes") else _SECONDS_BUCKETS
+                h = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+                self._histograms[key] = h
+            for i, b in enumerate(h["buckets"]):
+                if value <= b:
+                    h["counts"][i] += 1
+            h["sum"] += value
+            h["count"] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        typed = set()
+        for (name, key), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_fmt_labels(key)} {value}")
+        for (name, key), h in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for b, c in zip(h["buckets"], h["counts"]):
+                lines.append(f"{name}_bucket{_fmt_labels(key, [('le', b)])} {c}")
+            lines.append(f"{name}_bucket{_fmt_labels(key, [('le', '+Inf')])} {h['count']}")
+            lines.append(f"{name}_sum{_fmt_labels(key)} {h['sum']}")
+            lines.append(f"{name}_count{_fmt_labels(key)} {h['count']}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def inc(name: str, value: float = 1, **labels):
+    registry.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    registry.observe(name, value, **labels)
+
+
+@contextmanager
+def span(name: str, **labels):
+    """计时区间：结束时把耗时记入 <name>_seconds 直方图（异常同样计时）。"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(f"{name}_seconds", time.perf_counter() - start, **labels)
+
+
+class RunTimings:
+    """单次流水线运行的阶段耗时，用于在报告中展示耗时表；同时计入全局直方图。"""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages.append({"stage": name, "seconds": round(elapsed, 2)})
+            registry.observe("pipeline_stage_seconds", elapsed, stage=name)
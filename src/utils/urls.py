@@ -0,0 +1,171 @@
+import base64
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+
+from config import URL_STRIP_PARAMS, URL_RECENT_SIZE
+
+# 跟踪/分享参数：不影响页面内容，去掉后同一页面的不同分享链接归为同一 URL
+_STRIP_PARAMS = {
+    "spm", "spm_id_from", "from", "from_source", "vd_source", "unique_k", "fbclid", "gclid", "msclkid",
+    "ref", "ref_src", "isappinstalled", "scene", "clicktime", "enterid", "wfr", "tt_from", "_wb_client_",
+} | {p.strip().lower() for p in URL_STRIP_PARAMS.split(",") if p.strip()}
+_STRIP_PREFIXES = ("utm_", "share_")
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_ZHIHU_HOSTS = {"zhihu.com", "m.zhihu.com", "www.zhihu.com"}
+_ZHIHU_PATH_RE = re.compile(r"^/(question/\d+(?:/answer/\d+)?|answer/\d+|p/\d+|zvideo/\d+|pin/\d+)")
+# 无法离线解码的跳转链接（Baidu / Sogou 为加密参数，360 不带 url= 时同理），需请求后才能得知落地地址
+_OPAQUE_REDIRECTORS = (
+    ("baidu.com", "/link"),
+    ("sogou.com", "/link"),
+    ("so.com", "/link"),
+)
+
+
+def _decode_bing(query: dict) -> Optional[str]:
+    # www.bing.com/ck/a?...&u=a1<base64url(落地地址)>
+    u = query.get("u", "")
+    if not u.startswith("a1"):
+        return None
+    raw = u[2:]
+    try:
+        return base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)).decode("utf-8")
+    except Exception:
+        return None
+
+
+def unwrap(url: str) -> str:
+    """离线解开可解码的跳转链接：Bing ck/a（u=a1 + base64）、360 link?url=、DuckDuckGo l/?uddg=、知乎 link.zhihu.com/?target=。
+    其他链接原样返回。"""
+    for _ in range(3):
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return url
+        host = (parts.hostname or "").lower()
+        query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        target = None
+        if host.endswith("bing.com") and parts.path.startswith("/ck/"):
+            target = _decode_bing(query)
+        elif host.endswith("so.com") and parts.path.startswith("/link"):
+            target = query.get("url")
+        elif host.endswith("duckduckgo.com") and parts.path.startswith("/l/"):
+            target = query.get("uddg")
+        elif host == "link.zhihu.com":
+            target = query.get("target")
+        if not target or not target.startswith(("http://", "https://", "%")):
+            return url
+        url = unquote(target) if target.startswith("%") else target
+    return url
+
+
+def is_redirector(url: str) -> bool:
+    """Baidu / Sogou / 360 等只能通过请求解析的跳转链接。"""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    host = (parts.hostname or "").lower()
+    return any(host.endswith(h) and parts.path.startswith(p) for h, p in _OPAQUE_REDIRECTORS)
+
+
+def canonicalize(url: str) -> str:
+    """规范化 URL（用于去重与缓存键）：解开可解码的跳转链接，主机名小写、去默认端口与锚点，
+    删除跟踪/分享参数并对其余参数排序；知乎问题/回答/专栏链接统一为 www.zhihu.com（或 zhuanlan）无参数形式。"""
+    url = (url or "").strip().strip("'\"`")
+    if not url:
+        return url
+    url = unwrap(url)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if not scheme or not host:
+        return url
+    netloc = host if port is None or str(port) == _DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+    path = parts.path or "/"
+    if host in _ZHIHU_HOSTS or host == "zhuanlan.zhihu.com":
+        m = _ZHIHU_PATH_RE.match(path)
+        if m:
+            path = "/" + m.group(1)
+            if host != "zhuanlan.zhihu.com":
+                netloc = "www.zhihu.com"
+            return urlunsplit(("https", netloc, path, "", ""))
+    if is_redirector(url):
+        # 加密跳转参数本身就是唯一标识，保留全部参数
+        query = parts.query
+    else:
+        params = [
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if k.lower() not in _STRIP_PARAMS and not k.lower().startswith(_STRIP_PREFIXES)
+        ]
+        query = urlencode(sorted(params))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+# 跨任务记忆：跳转链接 -> 落地页（规范化后），用于识别不同检索结果指向同一页面
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def remember_landing(url: str, landing: str):
+    if not url or not landing or url == landing:
+        return
+    with _recent_lock:
+        _recent[url] = landing
+        _recent.move_to_end(url)
+        while len(_recent) > URL_RECENT_SIZE:
+            _recent.popitem(last=False)
+
+
+def known_landing(url: str) -> Optional[str]:
+    with _recent_lock:
+        return _recent.get(url)
+
+
+class URLFrontier:
+    """单次任务的抓取前沿：检索命中的链接先规范化并去重，再决定是否发起抓取。
+    - seen：本任务已入队/已抓取的规范化 URL（含跳转链接解析出的落地页）-> 占用它的入队链接
+    - known：外部提供的已处理 URL（如监控模式文档库中已有的链接），同样跳过
+    """
+
+    def __init__(self, known=None):
+        self.seen = {}
+        self.known = {canonicalize(u) for u in (known or ()) if u}
+        self.stats = {"admitted": 0, "duplicate": 0, "known": 0}
+
+    def admit(self, url: str) -> Optional[str]:
+        """返回应抓取的规范化 URL；已见过或已知（含已知跳转落地页）时返回 None。"""
+        key = canonicalize(url)
+        if not key:
+            return None
+        landing = known_landing(key)
+        if key in self.known or (landing and landing in self.known):
+            self.stats["known"] += 1
+            return None
+        if key in self.seen or (landing and landing in self.seen):
+            self.stats["duplicate"] += 1
+            return None
+        self.seen[key] = key
+        if landing:
+            self.seen[landing] = key
+        self.stats["admitted"] += 1
+        return key
+
+    def landed(self, key: str, final_url: str) -> bool:
+        """登记抓取结果的落地页；该落地页已由其他链接抓取过时返回 False（结果应丢弃）。
+        admit 时按已知落地页预先登记的，由同一链接抓取到时不算重复。"""
+        landing = canonicalize(final_url)
+        if not landing or landing == key:
+            return True
+        remember_landing(key, landing)
+        if landing in self.known or self.seen.get(landing, key) != key:
+            self.stats["duplicate"] += 1
+            return False
+        self.seen[landing] = key
+        return True